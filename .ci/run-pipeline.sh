@@ -44,18 +44,41 @@ else
   # Activate virtual environment and run the Lambda tests
   if [ -f "venv/bin/activate" ]; then
     source venv/bin/activate
-    if python test_lambda_local.py; then
+
+    # Only test lambdas changed since PIPELINE_BASE (default: the upstream
+    # branch); FULL_RUN=true tests every lambda
+    ONLY_ARGS=()
+    if [ "${FULL_RUN}" != "true" ]; then
+      SELECTED=$(python changed_lambdas.py --since "${PIPELINE_BASE:-@{upstream}}")
+      for name in $SELECTED; do
+        ONLY_ARGS+=(--only "$name")
+      done
+      echo "Testing changed lambdas: ${SELECTED:-none}"
+    fi
+
+    if [ "${FULL_RUN}" != "true" ] && [ -z "$SELECTED" ]; then
+      echo "✅ No lambda changes to test"
+      python results_store.py set-metric lambda_status SUCCESS
+    elif python test_lambda_local.py "${ONLY_ARGS[@]}"; then
       echo "✅ Lambda tests completed successfully"
-      echo "SUCCESS" > data/lambda_status.txt
+      python results_store.py set-metric lambda_status SUCCESS
     else
       echo "❌ Lambda tests failed"
-      echo "FAILED" > data/lambda_status.txt
+      python results_store.py set-metric lambda_status FAILED
       # Don't exit here, continue to generate the report
     fi
+
+    # Benchmark gate: handler overhead and import time against the baseline
+    if [ "${SKIP_BENCHMARK}" != "true" ] && { [ "${FULL_RUN}" = "true" ] || [ -n "$SELECTED" ]; }; then
+      if ! python lambda_benchmark.py --quick "${ONLY_ARGS[@]}"; then
+        echo "❌ Benchmark regression detected"
+        python results_store.py set-metric lambda_status FAILED
+      fi
+    fi
     deactivate
   else
     echo "❌ Virtual environment not found. Please run 'make setup' first."
-    echo "FAILED" > data/lambda_status.txt
+    python3 results_store.py set-metric lambda_status FAILED
     exit 1
   fi
   
@@ -72,13 +95,13 @@ if [ "${CI_TEST_MODE}" = "true" ]; then
   echo "CI Pipeline Test Run: $TIMESTAMP" > .ci/reports/last_run.txt
   echo "Status: Test Completed (Simulated)" >> .ci/reports/last_run.txt
 else
-  # Read Lambda status from file
-  LAMBDA_STATUS=$(cat data/lambda_status.txt 2>/dev/null || echo "UNKNOWN")
+  # Read Lambda status from the results store
+  LAMBDA_STATUS=$(python3 results_store.py get-metric lambda_status --default UNKNOWN 2>/dev/null || echo "UNKNOWN")
   
   echo "CI Pipeline Run: $TIMESTAMP" > .ci/reports/last_run.txt
   echo "Status: $LAMBDA_STATUS" >> .ci/reports/last_run.txt
   echo "Lambda Test Results:" >> .ci/reports/last_run.txt
-  cat data/lambda_results.txt >> .ci/reports/last_run.txt 2>/dev/null || echo "No Lambda test results found"
+  python3 results_store.py report >> .ci/reports/last_run.txt 2>/dev/null || echo "No Lambda test results found"
 fi
 
 # Add debug logging
@@ -4,6 +4,15 @@
 
 set -e  # Exit on error
 
+# Only lambdas touched by the staged diff are tested; pass --all or set
+# FULL_RUN=true to test every lambda
+FULL_RUN="${FULL_RUN:-false}"
+for arg in "$@"; do
+  if [ "$arg" = "--all" ]; then
+    FULL_RUN="true"
+  fi
+done
+
 # Check if we're in test mode
 if [ "${CI_TEST_MODE}" = "true" ]; then
   echo "⚠️ Running in TEST MODE - some steps will be simulated"
@@ -20,7 +29,7 @@ REPORT_DIR="$SCRIPT_DIR/reports"
 
 # Try to find the checker script in multiple locations
 CHECKER_SCRIPT=""
-for loc in "$SCRIPT_DIR/ds_test_workflow.py" "$REPO_ROOT/ds_test_workflow.py" "/Users/Chris-Folder/lambda_checker/ds_test_workflow.py"; do
+for loc in "$SCRIPT_DIR/ds_test_workflow.py" "$REPO_ROOT/ds_test_workflow.py" "$REPO_ROOT/ds_test_workflow_1.py" "/Users/Chris-Folder/lambda_checker/ds_test_workflow.py"; do
   if [ -f "$loc" ]; then
     CHECKER_SCRIPT="$loc"
     break
@@ -107,8 +116,27 @@ EOF
   fi
 fi
 
-# Stage 3: Run Structure Validation
-echo "🔍 Stage 3: Running structure validation"
+# Stage 3: Select the lambdas affected by this change
+echo "🎯 Stage 3: Selecting changed lambdas"
+ONLY_ARGS=()
+if [ "${CI_TEST_MODE}" = "true" ]; then
+  echo "Simulating change selection..."
+elif [ "$FULL_RUN" = "true" ]; then
+  echo "✅ Full run requested - testing every lambda"
+else
+  SELECTED=$(cd "$REPO_ROOT" && python3 changed_lambdas.py --staged)
+  if [ -z "$SELECTED" ]; then
+    echo "✅ No lambda changes staged - nothing to test"
+    exit 0
+  fi
+  for name in $SELECTED; do
+    ONLY_ARGS+=(--only "$name")
+  done
+  echo "✅ Testing: $(echo $SELECTED | tr '\n' ' ')"
+fi
+
+# Stage 4: Run Structure Validation
+echo "🔍 Stage 4: Running structure validation"
 TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
 LOG_FILE="$LOG_DIR/validation_$TIMESTAMP.log"
 
@@ -117,7 +145,7 @@ if [ "${CI_TEST_MODE}" = "true" ]; then
   echo "Test validation result: PASS" > "$LOG_FILE"
 else
   echo "Running validation checks..."
-  "$CHECKER_SCRIPT" "$LAMBDA_REPO_DIR" > "$LOG_FILE" 2>&1 || {
+  "$CHECKER_SCRIPT" "$LAMBDA_REPO_DIR" "${ONLY_ARGS[@]}" > "$LOG_FILE" 2>&1 || {
     echo "❌ Validation failed! See log for details: $LOG_FILE"
     cat "$LOG_FILE"
     echo ""
@@ -126,8 +154,35 @@ else
   }
 fi
 
-# Stage 4: Generate Reports
-echo "📊 Stage 4: Generating reports"
+# Stage 5: Run Execution Tests
+echo "🧪 Stage 5: Running execution tests"
+if [ "${CI_TEST_MODE}" = "true" ]; then
+  echo "Simulating execution tests..."
+else
+  if (cd "$REPO_ROOT" && python3 test_lambda_local.py "${ONLY_ARGS[@]}") >> "$LOG_FILE" 2>&1; then
+    echo "✅ Execution tests passed"
+  else
+    echo "⚠️ Execution tests reported failures - see $LOG_FILE"
+  fi
+fi
+
+# Stage 6: Benchmark Gate
+echo "⏱️  Stage 6: Running benchmark gate"
+if [ "${CI_TEST_MODE}" = "true" ] || [ "${SKIP_BENCHMARK}" = "true" ]; then
+  echo "Skipping benchmark gate..."
+else
+  (cd "$REPO_ROOT" && python3 lambda_benchmark.py --quick "${ONLY_ARGS[@]}") 2>&1 | tee -a "$LOG_FILE"
+  if [ "${PIPESTATUS[0]}" -eq 0 ]; then
+    echo "✅ No benchmark regressions"
+  else
+    echo "❌ Benchmark regression beyond ${BENCHMARK_THRESHOLD:-0.3} - see the table above"
+    echo "   Refresh the baseline with: python lambda_benchmark.py --save-baseline"
+    exit 1
+  fi
+fi
+
+# Stage 7: Generate Reports
+echo "📊 Stage 7: Generating reports"
 cp "$LOG_FILE" "$REPORT_DIR/latest_validation_report.txt"
 echo "✅ Report generated: $REPORT_DIR/latest_validation_report.txt"
 
@@ -136,7 +191,7 @@ echo "🧪 Running strict validation for CI/CD..."
 if [ "${CI_TEST_MODE}" = "true" ]; then
   echo "Simulating strict validation (PASS)"
 else
-  if "$CHECKER_SCRIPT" "$LAMBDA_REPO_DIR" --strict > /dev/null 2>&1; then
+  if "$CHECKER_SCRIPT" "$LAMBDA_REPO_DIR" "${ONLY_ARGS[@]}" --strict > /dev/null 2>&1; then
     echo "✅ Strict validation passed"
   else
     echo "⚠️ Strict validation failed - this would stop a real CI/CD pipeline"
@@ -153,6 +208,7 @@ if [ "${DEBUG}" = "true" ]; then
   echo "  Script directory: $SCRIPT_DIR"
   echo "  Lambda directory: $LAMBDA_REPO_DIR"
   echo "  Checker script: $CHECKER_SCRIPT"
+  echo "  Selected lambdas: ${ONLY_ARGS[*]:-all}"
   echo "  Log file: $LOG_FILE"
 fi
 
@@ -7,12 +7,8 @@ echo "Setting up development environment..."
 git config core.hooksPath .hooks
 chmod +x .hooks/*
 
-# Initialize dashboard data
-mkdir -p .dashboard/data
-echo "0" > .dashboard/data/commit_count.txt
-echo "None yet" > .dashboard/data/last_commit.txt
-echo "0" > .dashboard/data/todo_count.txt
-echo "Unknown" > .dashboard/data/lambda_status.txt
+# Initialize the results store (data/results.db)
+python3 results_store.py set-metric lambda_status Unknown
 
 # Make dashboard viewer executable
 chmod +x view-dashboard.sh
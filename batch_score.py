@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Offline batch scoring of a lambda over JSONL or .npy inputs, with resume.
+
+For backfills: every input item goes through the lambda's own code path,
+without lambda_handler and one event per item:
+
+    decode_record()   -> Preprocessing.process_input, in a pool of processes
+    predict_records() -> batched endpoint calls, convert_parsed_response_to_ndarray
+    Postprocessing.process_output
+
+Inputs are read as a stream:
+
+* a ``.jsonl`` file: one request body per line; its ``id`` field, or else the
+  line number, identifies it in the output.
+* a ``.npy`` file: an (N, ...) stack, memory-mapped, one item per row.
+* a directory of ``.npy`` files, in name order, one memory-mapped frame each.
+
+Workers read the items themselves (the parent only sends line bytes or file
+and row references) and return frames through a shared_frames arena, so pixels
+cross from the workers to the parent without being pickled (a frame that finds
+the arena full is pickled rather than waiting for room). Decoded items are
+grouped by the lambda's record key into batches of --batch-size, and at most
+--concurrency batches are in flight. A group that does not fill up within
+--window items is sent as it is.
+
+Results are appended to the output JSONL in input order, one
+``{"id": ..., "result": ...}`` or ``{"id": ..., "error": ...}`` line per item.
+Every --checkpoint-seconds the output is fsynced and ``<output>.checkpoint``
+records how many items are done, where in the input they end and how long the
+output is at that point. A job that is killed resumes from its checkpoint: the
+output is truncated to the checkpointed length and reading restarts right
+after the last checkpointed item. --restart starts over.
+"""
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from local_endpoint import load_lambda
+
+REPO_ROOT = Path(__file__).resolve().parent
+CHECKPOINT_SUFFIX = '.checkpoint'
+# A frame that does not fit in the worker's arena right away is pickled instead: the parent holds
+# frames until their group fills, so waiting for room would stall every frame once the arena is full
+SHARE_TIMEOUT = 0.0
+
+# Set in each worker process by _init_worker
+_module = None
+_init_error = None
+_arena = None
+# .npy stacks opened (memory-mapped) by this worker
+_stacks = {}
+
+
+def _init_worker(lambda_file: str, arena_bytes: int):
+    """Import the lambda once per worker and give the worker its frame arena"""
+    global _module, _init_error, _arena
+    # The parent decides when workers stop and checkpoints on Ctrl-C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        _module = load_lambda(lambda_file)
+        from lambda_common import shared_frames
+        _arena = shared_frames.FrameArena(arena_bytes)
+    except Exception as e:
+        _init_error = f"{type(e).__name__}: {e}"
+
+
+def source_kind(path: Path) -> str:
+    if path.is_dir():
+        return 'npy_dir'
+    if path.suffix == '.npy':
+        return 'npy'
+    return 'jsonl'
+
+
+def iter_inputs(path: Path, done: int = 0, position: int = 0):
+    """(index, payload, position) for every item after the first done; position resumes the stream"""
+    kind = source_kind(path)
+    if kind == 'jsonl':
+        with open(path, 'rb') as f:
+            f.seek(position)
+            index = done
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                if line.strip():
+                    yield index, line, f.tell()
+                    index += 1
+    elif kind == 'npy':
+        import numpy as np
+        rows = len(np.load(path, mmap_mode='r'))
+        for row in range(done, rows):
+            yield row, ('npy', str(path), row), row + 1
+    else:
+        names = sorted(entry.name for entry in os.scandir(path) if entry.name.endswith('.npy'))
+        for index in range(done, len(names)):
+            yield index, ('npy', str(path / names[index]), None), index + 1
+
+
+def _read(index: int, payload) -> tuple:
+    """(item id, request body) of an item, read in the worker"""
+    if isinstance(payload, bytes):
+        body = json.loads(payload)
+        item_id = body.get('id', index) if isinstance(body, dict) else index
+        return item_id, body
+    import numpy as np
+    _, file, row = payload
+    if row is None:
+        return Path(file).stem, {'data': np.load(file, mmap_mode='r')}
+    if file not in _stacks:
+        _stacks[file] = np.load(file, mmap_mode='r')
+    return row, {'data': _stacks[file][row]}
+
+
+def _preprocess(chunk: list) -> list:
+    """(index, item id, key, frame, error) per item; frame data goes to the worker's arena"""
+    from lambda_common import shared_frames
+    from lambda_common.frames import ArrayFrame
+
+    if _module is None:
+        raise RuntimeError(f"Lambda failed to load: {_init_error}")
+    decoded = []
+    for index, payload in chunk:
+        item_id = index
+        try:
+            item_id, body = _read(index, payload)
+            key, frame = _module.decode_record(body)
+        except Exception as e:
+            decoded.append((index, item_id, None, None, f"{type(e).__name__}: {e}"))
+            continue
+        if isinstance(frame, ArrayFrame):
+            try:
+                shared_frames.share(frame, _arena, SHARE_TIMEOUT)
+            except (TimeoutError, ValueError):
+                # Arena full of frames the parent has not scored yet, or too small
+                pass
+        decoded.append((index, item_id, key, frame, None))
+    return decoded
+
+
+def _result_line(item_id, result=None, error: str = None) -> tuple:
+    """(output line, whether it is an error)"""
+    record = {'id': item_id, 'error': error} if error is not None else {'id': item_id, 'result': result}
+    return (json.dumps(record) + '\n').encode(), error is not None
+
+
+def _output(item_id, response) -> tuple:
+    """Output line for a Postprocessing response: its parsed body, or its error"""
+    if not (isinstance(response, dict) and 'statusCode' in response):
+        return _result_line(item_id, response)
+    body = response.get('body')
+    body = json.loads(body) if isinstance(body, str) else body
+    if int(response['statusCode']) >= 400:
+        error = body.get('error', body) if isinstance(body, dict) else body
+        return _result_line(item_id, error=f"{response['statusCode']}: {error}")
+    return _result_line(item_id, body)
+
+
+def score_batch(module, members: list, retries: int = 2) -> list:
+    """(index, (output line, error)) per member: one predict_records() call, then Postprocessing"""
+    from lambda_common import shared_frames
+
+    frames = [frame for _, _, frame in members]
+    try:
+        for attempt in range(retries + 1):
+            try:
+                results = module.predict_records(frames)
+                if len(results) != len(members):
+                    raise ValueError(f"Expected {len(members)} results, got {len(results)}")
+                break
+            except Exception as e:
+                if attempt == retries:
+                    return [(index, _result_line(item_id, error=f"{type(e).__name__}: {e}"))
+                            for index, item_id, _ in members]
+                time.sleep(0.5 * 2 ** attempt)
+        lines = []
+        for (index, item_id, _), result in zip(members, results):
+            try:
+                lines.append((index, _output(item_id, module.Postprocessing.process_output(result))))
+            except Exception as e:
+                lines.append((index, _result_line(item_id, error=f"{type(e).__name__}: {e}")))
+        return lines
+    finally:
+        for frame in frames:
+            if getattr(getattr(frame, 'data', None), 'ref', None) is not None:
+                shared_frames.release(frame.data)
+
+
+def load_checkpoint(checkpoint: Path, lambda_file: Path, input_path: Path, restart: bool = False) -> dict:
+    """Progress to resume from; a fresh start without a checkpoint or with restart"""
+    fresh = {'lambda': str(lambda_file), 'input': str(input_path.resolve()), 'done': 0, 'position': 0,
+             'output_bytes': 0, 'errors': 0}
+    if restart or not checkpoint.exists():
+        return fresh
+    state = json.loads(checkpoint.read_text())
+    if state.get('lambda') != fresh['lambda'] or state.get('input') != fresh['input']:
+        raise ValueError(f"{checkpoint} is for {state.get('lambda')} over {state.get('input')}; "
+                         f"use --restart or another --output")
+    return state
+
+
+def save_checkpoint(checkpoint: Path, state: dict, out):
+    """Make the output durable, then record how far it goes"""
+    out.flush()
+    os.fsync(out.fileno())
+    state = dict(state, output_bytes=out.tell(), updated=time.time())
+    temp = checkpoint.with_name(checkpoint.name + '.tmp')
+    temp.write_text(json.dumps(state))
+    os.replace(temp, checkpoint)
+    return state
+
+
+def score(lambda_file: Path, input_path: Path, output_path: Path, workers: int = None, batch_size: int = 32,
+          concurrency: int = 4, chunk_size: int = 64, window: int = None, arena_mb: int = 64,
+          checkpoint_seconds: float = 5.0, retries: int = 2, local_endpoint: bool = False,
+          latency_ms: float = 0.0, restart: bool = False, limit: int = None, log=None) -> dict:
+    """Score every item of input_path into output_path, resuming from its checkpoint; a summary"""
+    workers = workers or os.cpu_count() or 1
+    window = window or batch_size * concurrency * 4
+    checkpoint = Path(str(output_path) + CHECKPOINT_SUFFIX)
+    state = load_checkpoint(checkpoint, lambda_file, input_path, restart)
+    if state['done'] and not output_path.exists():
+        raise ValueError(f"{checkpoint} has {state['done']} items done but {output_path} is gone; use --restart")
+    resumed_from = state['done']
+    module = load_lambda(lambda_file, local_endpoint, latency_ms=latency_ms)
+    if not (hasattr(module, 'decode_record') and hasattr(module, 'predict_records')):
+        raise ValueError(f"{lambda_file.parent.name} has no decode_record/predict_records to batch with")
+
+    source = iter_inputs(input_path, state['done'], state['position'])
+    if limit is not None:
+        source = itertools.islice(source, limit)
+    out = open(output_path, 'r+b' if state['done'] and output_path.exists() else 'wb')
+    out.truncate(state['output_bytes'])
+    out.seek(state['output_bytes'])
+
+    context = multiprocessing.get_context('spawn')
+    pool = context.Pool(workers, initializer=_init_worker, initargs=(str(lambda_file), arena_mb * 1024 * 1024))
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch_score')
+    chunks = collections.deque()    # (AsyncResult, {index: position}), in input order
+    groups = {}                     # record key -> [(index, item id, frame)]
+    batches = {}                    # future -> number of items
+    lines, positions = {}, {}       # index -> (output line, error) / input position, until written
+    next_write = state['done']
+    exhausted, newest = False, -1
+    begin = last_checkpoint = time.perf_counter()
+    scored = batch_count = 0
+
+    def submit(members):
+        nonlocal batch_count
+        batches[executor.submit(score_batch, module, members, retries)] = len(members)
+        batch_count += 1
+
+    try:
+        while True:
+            # Keep every worker busy, without reading further ahead than that
+            while not exhausted and len(chunks) < 2 * workers:
+                chunk = list(itertools.islice(source, chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                chunks.append((pool.apply_async(_preprocess, ([(index, payload) for index, payload, _ in chunk],)),
+                               {index: position for index, _, position in chunk}))
+            taking = bool(chunks) and len(batches) < 2 * concurrency
+            if taking:
+                result, chunk_positions = chunks.popleft()
+                positions.update(chunk_positions)
+                for index, item_id, key, frame, error in result.get():
+                    newest = index
+                    if error is not None:
+                        lines[index] = _result_line(item_id, error=error)
+                    elif key is None:
+                        submit([(index, item_id, frame)])
+                    else:
+                        groups.setdefault(key, []).append((index, item_id, frame))
+                        if len(groups[key]) >= batch_size:
+                            submit(groups.pop(key))
+            for key in [key for key, members in groups.items()
+                        if not chunks or members[0][0] < newest - window]:
+                submit(groups.pop(key))
+            if batches:
+                done, _ = wait(batches, timeout=0 if taking else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del batches[future]
+                    lines.update(future.result())
+
+            # Results go out in input order
+            while next_write in lines:
+                line, failed = lines.pop(next_write)
+                out.write(line)
+                state['errors'] += failed
+                state['position'] = positions.pop(next_write)
+                next_write += 1
+                scored += 1
+            state['done'] = next_write
+            finished = exhausted and not chunks and not groups and not batches
+            if finished or time.perf_counter() - last_checkpoint >= checkpoint_seconds:
+                state = save_checkpoint(checkpoint, state, out)
+                last_checkpoint = time.perf_counter()
+                if log is not None:
+                    elapsed = last_checkpoint - begin
+                    log(f"{next_write} done ({scored / elapsed:.0f} items/s this run), {state['errors']} errors")
+            if finished:
+                break
+    except BaseException:
+        # What is written and checkpointed stays; the rest is redone on resume
+        save_checkpoint(checkpoint, state, out)
+        pool.terminate()
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        out.close()
+    pool.close()
+    pool.join()
+    elapsed = time.perf_counter() - begin
+    return {'items': scored, 'resumed_from': resumed_from, 'done': state['done'], 'errors': state['errors'],
+            'batches': batch_count, 'seconds': elapsed, 'items_per_second': scored / elapsed if elapsed else 0.0,
+            'output': str(output_path), 'checkpoint': str(checkpoint)}
+
+
+def print_summary(lambda_name: str, summary: dict, console=None):
+    from rich.console import Console
+    from rich.table import Table
+
+    console = console or Console()
+    table = Table(title=f"Batch Scoring: {lambda_name}", show_header=True)
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Items scored this run", f"{summary['items']:,}")
+    table.add_row("Resumed from item", f"{summary['resumed_from']:,}")
+    table.add_row("Items done", f"{summary['done']:,}")
+    table.add_row("Errors", f"{summary['errors']:,}")
+    table.add_row("Endpoint batches", f"{summary['batches']:,}")
+    table.add_row("Items / second", f"{summary['items_per_second']:,.1f}")
+    table.add_row("Elapsed", f"{summary['seconds']:.1f} s")
+    table.add_row("Output", summary['output'])
+    console.print(table)
+
+
+def main(argv=None):
+    """Score a JSONL file, .npy stack or directory of .npy files with one lambda."""
+    from serve_lambda import resolve_lambda
+
+    parser = argparse.ArgumentParser(description="Batch-score inputs with a lambda's pre/postprocessing, resumably")
+    parser.add_argument('lambda_name', help="Lambda directory name under --root-dir, or a path to it")
+    parser.add_argument('input', type=Path, help="A .jsonl file, a .npy stack, or a directory of .npy files")
+    parser.add_argument('--output', type=Path, required=True, help="Results JSONL; its checkpoint sits next to it")
+    parser.add_argument('--root-dir', default='lambdas')
+    parser.add_argument('--workers', type=int, default=None, help="Preprocessing processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Items per endpoint call")
+    parser.add_argument('--concurrency', type=int, default=4, help="Endpoint calls in flight")
+    parser.add_argument('--chunk-size', type=int, default=64, help="Items per preprocessing task")
+    parser.add_argument('--window', type=int, default=None,
+                        help="Items a partial batch may wait for more of its shape (default: 4 x batch x concurrency)")
+    parser.add_argument('--arena-mb', type=int, default=64, help="Shared memory per worker for decoded frames")
+    parser.add_argument('--checkpoint-seconds', type=float, default=5.0)
+    parser.add_argument('--retries', type=int, default=2, help="Retries of a failed endpoint batch")
+    parser.add_argument('--limit', type=int, default=None, help="Stop after this many items (e.g. for a trial)")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start over")
+    parser.add_argument('--local-endpoint', action='store_true',
+                        help="Use the local SageMaker runtime stand-in instead of a real endpoint")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated endpoint latency with --local-endpoint")
+    args = parser.parse_args(argv)
+
+    try:
+        lambda_file = resolve_lambda(args.lambda_name, args.root_dir)
+        if not args.input.exists():
+            raise FileNotFoundError(f"No input at {args.input}")
+        summary = score(lambda_file, args.input, args.output, args.workers, args.batch_size, args.concurrency,
+                        args.chunk_size, args.window, args.arena_mb, args.checkpoint_seconds, args.retries,
+                        args.local_endpoint, args.latency_ms, args.restart, args.limit,
+                        log=lambda message: print(message, file=sys.stderr, flush=True))
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume", file=sys.stderr)
+        sys.exit(130)
+    print_summary(lambda_file.parent.name, summary)
+
+
+if __name__ == '__main__':
+    main()
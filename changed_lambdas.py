@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Work out which lambdas a diff affects, so the pipelines only test those.
+
+A lambda is selected when a file under lambdas/<name>/ changes, when a shared
+package under lambdas/ that it imports changes, or when a file every lambda
+depends on changes (lambdas/requirements.txt, lambdas/lambda_common/, the
+test harness and the tools it runs). Prints one lambda name per line; the
+hooks turn that into --only arguments.
+
+    python changed_lambdas.py --staged           # pre-commit
+    python changed_lambdas.py --since @{upstream}  # pre-push / CI
+    python changed_lambdas.py --all              # full run
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from lambda_index import LambdaIndex, DEFAULT_CACHE_FILE, find_lambda_files
+
+REPO_ROOT = Path(__file__).resolve().parent
+LAMBDA_DIR = 'lambdas'
+
+# Changes to any of these re-test every lambda
+SHARED_FILES = {
+    'lambdas/requirements.txt',
+    'requirements.txt',
+    'lambda_index.py',
+    'local_endpoint.py',
+    'test_lambda_local.py',
+    'ds_test_workflow_1.py',
+    # Imported by the harness or run by the pipeline
+    'lambda_benchmark.py',
+    'cold_start.py',
+    'memory_profile.py',
+    'results_store.py',
+    'perf_lint.py',
+    'dashboard_data.py',
+    'batch_score.py',
+    'serve_lambda.py',
+}
+# Changes to anything under these re-test every lambda too; every lambda imports lambda_common
+SHARED_DIRS = ('lambdas/lambda_common/',)
+
+
+def changed_files(staged: bool = False, since: str = None) -> list:
+    """Paths (relative to the repo root) changed in the index or since a ref"""
+    if staged:
+        command = ['git', 'diff', '--cached', '--name-only']
+    else:
+        command = ['git', 'diff', '--name-only', f'{since}...HEAD']
+    proc = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f'{" ".join(command)} failed')
+    return [line for line in proc.stdout.splitlines() if line]
+
+
+def select_lambdas(paths, lambda_files: dict, index: LambdaIndex = None) -> list:
+    """Map changed paths onto the lambdas that need re-testing"""
+    selected = set()
+    shared_packages = set()
+    for path in paths:
+        if path in SHARED_FILES or path.startswith(SHARED_DIRS):
+            return sorted(lambda_files)
+        parts = Path(path).parts
+        if len(parts) < 2 or parts[0] != LAMBDA_DIR:
+            continue
+        if len(parts) == 2:
+            # A loose file directly under lambdas/ is shared by all of them
+            return sorted(lambda_files)
+        if parts[1] in lambda_files:
+            selected.add(parts[1])
+        else:
+            shared_packages.add(parts[1])
+
+    if shared_packages:
+        index = index or LambdaIndex(DEFAULT_CACHE_FILE)
+        entries = index.build(lambda_files.values())
+        index.save()
+        for name, lambda_file in lambda_files.items():
+            imports = entries[str(lambda_file)]['imports']
+            if any(module.split('.')[0] in shared_packages for module in imports):
+                selected.add(name)
+    return sorted(selected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the lambdas affected by a change")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--staged', action='store_true', help="Use the staged diff (default)")
+    scope.add_argument('--since', help="Use the diff between this ref and HEAD")
+    scope.add_argument('--all', dest='select_all', action='store_true', help="Select every lambda")
+    parser.add_argument('--root-dir', default=LAMBDA_DIR)
+    parser.add_argument('--json', dest='json_output', action='store_true', help="Output in JSON format")
+    args = parser.parse_args(argv)
+
+    lambda_files = find_lambda_files(REPO_ROOT / args.root_dir)
+    selected = sorted(lambda_files)
+    if not args.select_all:
+        try:
+            selected = select_lambdas(changed_files(staged=not args.since, since=args.since), lambda_files)
+        except RuntimeError as e:
+            # No upstream or unknown ref: fall back to a full run rather than skipping tests
+            print(f"Could not diff ({e}); selecting every lambda", file=sys.stderr)
+
+    if args.json_output:
+        print(json.dumps(selected))
+    else:
+        for name in selected:
+            print(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Cold-start measurement harness for the lambdas under ./lambdas.
+
+Each lambda_function.py is loaded in a fresh interpreter started with
+``-X importtime``. The child reports the module import time, the time of the
+first lambda_handler call against the local endpoint stand-in
+(local_endpoint.py) and the RSS before import, after init and after the first
+call. The parent parses the importtime trace into a per-package breakdown and
+records the results per commit in the results store (results_store.py).
+"""
+import click
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from html import escape
+from pathlib import Path
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+
+from lambda_index import find_lambda_files
+from results_store import ResultsStore, current_commit
+
+REPO_ROOT = Path(__file__).resolve().parent
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+MARKER = 'cold_start:'
+
+# Runs inside the fresh interpreter; keep it standard-library only
+_CHILD_SOURCE = r'''
+import json, sys, time
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+lambda_file, tools_dir, latency_ms = sys.argv[1], sys.argv[2], float(sys.argv[3])
+# Loaded before the baseline so only the lambda's own import is measured
+sys.path.insert(0, tools_dir)
+import local_endpoint
+result = {'rss_start_mb': rss_mb()}
+try:
+    sys.stderr.write('cold_start:begin\n')
+    sys.stderr.flush()
+    start = time.perf_counter()
+    module = local_endpoint.load_lambda(lambda_file)
+    result['import_ms'] = (time.perf_counter() - start) * 1000
+    sys.stderr.write('cold_start:end\n')
+    sys.stderr.flush()
+    result['rss_init_mb'] = rss_mb()
+
+    local_endpoint.install(module, latency_ms=latency_ms)
+    event = local_endpoint.make_event(local_endpoint.detect_kind(module))
+    start = time.perf_counter()
+    response = module.lambda_handler(event, None)
+    result['first_call_ms'] = (time.perf_counter() - start) * 1000
+    result['rss_first_call_mb'] = rss_mb()
+    result['status_code'] = response.get('statusCode') if isinstance(response, dict) else None
+except Exception as e:
+    result['error'] = f'{type(e).__name__}: {e}'
+print('cold_start:' + json.dumps(result))
+'''
+
+NUMERIC_FIELDS = ('import_ms', 'first_call_ms', 'process_ms', 'rss_start_mb', 'rss_init_mb', 'rss_first_call_mb')
+
+
+def parse_importtime(stderr: str, top: int = 10) -> list:
+    """Sum importtime self-times per top-level package between the child markers"""
+    per_package = {}
+    inside = False
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            inside = line == f'{MARKER}begin'
+            continue
+        if not inside:
+            continue
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            package = match.group(4).split('.')[0]
+            per_package[package] = per_package.get(package, 0) + int(match.group(1))
+    ranked = sorted(per_package.items(), key=lambda item: item[1], reverse=True)
+    return [{'package': name, 'ms': round(us / 1000.0, 2)} for name, us in ranked[:top]]
+
+
+def measure_once(lambda_file: Path, latency_ms: float = 0.0) -> dict:
+    """Run one cold start of lambda_file in a fresh interpreter"""
+    lambda_file = Path(lambda_file).resolve()
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD_SOURCE,
+         str(lambda_file), str(REPO_ROOT), str(latency_ms)],
+        capture_output=True, text=True, env=env, cwd=str(lambda_file.parent)
+    )
+    process_ms = (time.perf_counter() - start) * 1000
+
+    result = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(MARKER):
+            result = json.loads(line[len(MARKER):])
+    if result is None:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['no output']
+        result = {'error': f'child exited with {proc.returncode}: {tail[0]}'}
+
+    result['process_ms'] = process_ms
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def measure(lambda_file: Path, runs: int = 1, latency_ms: float = 0.0) -> dict:
+    """Measure several cold starts and keep the median run"""
+    samples = [measure_once(lambda_file, latency_ms) for _ in range(runs)]
+    ok = [s for s in samples if 'error' not in s]
+    if not ok:
+        return samples[-1]
+
+    median_import = statistics.median_low([s['import_ms'] for s in ok])
+    result = dict(next(s for s in ok if s['import_ms'] == median_import))
+    for field in NUMERIC_FIELDS:
+        values = [s[field] for s in ok if field in s]
+        if values:
+            result[field] = round(statistics.median(values), 2)
+    result['runs'] = len(ok)
+    return result
+
+
+def save_results(store: ResultsStore, results: dict, commit: str):
+    """Record one commit's results in the results store"""
+    for name, result in results.items():
+        store.record_cold_start(name, dict(result, python=sys.version.split()[0]), commit=commit)
+
+
+def load_latest(store: ResultsStore) -> tuple:
+    """Return (commit, recorded_at, results) for the latest and previous commits"""
+    runs = []
+    for commit in store.commits('cold_starts', last=2):
+        rows = store.for_commit('cold_starts', commit)
+        results = {name: json.loads(row['data']) for name, row in rows.items()}
+        recorded_at = max(row['recorded_at'] for row in rows.values())
+        runs.append((commit, recorded_at, results))
+    return runs
+
+
+def render_html(runs: list) -> str:
+    """HTML fragment for the latest run, with deltas against the previous one"""
+    if not runs:
+        return '<p>No cold-start data yet. Run <code>python cold_start.py run</code>.</p>'
+    commit, recorded_at, latest = runs[0]
+    previous = runs[1][2] if len(runs) > 1 else {}
+
+    rows = []
+    for name, result in sorted(latest.items()):
+        if 'error' in result:
+            rows.append(f'<tr><td>{escape(name)}</td><td colspan="5" class="error">{escape(result["error"])}</td></tr>')
+            continue
+        delta = ''
+        before = previous.get(name, {}).get('import_ms')
+        if before:
+            change = result['import_ms'] - before
+            css = 'error' if change > 0 else 'success'
+            delta = f' <span class="{css}">({change:+.1f})</span>'
+        top = ', '.join(f"{escape(i['package'])} {i['ms']:.0f}" for i in result.get('imports', [])[:3])
+        rows.append(
+            f"<tr><td>{escape(name)}</td><td>{result['import_ms']:.1f}{delta}</td>"
+            f"<td>{result.get('first_call_ms', 0):.1f}</td><td>{result.get('rss_init_mb', 0):.1f}</td>"
+            f"<td>{result.get('rss_first_call_mb', 0):.1f}</td><td>{top}</td></tr>"
+        )
+
+    return (
+        f"<p>Commit {escape(commit)} at {escape(recorded_at)}</p>"
+        '<table><thead><tr><th>Lambda</th><th>Import (ms)</th><th>First call (ms)</th>'
+        '<th>RSS init (MB)</th><th>RSS first call (MB)</th><th>Slowest imports (ms)</th></tr></thead>'
+        f"<tbody>{''.join(rows)}</tbody></table>"
+    )
+
+
+@click.group()
+def cli():
+    """Measure and report lambda cold starts"""
+
+
+@cli.command()
+@click.argument('root_dir', type=click.Path(exists=True), default='lambdas')
+@click.option('--only', multiple=True, help='Only measure these lambdas (repeatable)')
+@click.option('--runs', type=int, default=3, show_default=True, help='Cold starts per lambda; the median is kept')
+@click.option('--latency-ms', type=float, default=0.0, help='Simulated endpoint latency per call')
+@click.option('--no-save', is_flag=True, default=False, help='Do not store results for this commit')
+def run(root_dir: str, only: tuple, runs: int, latency_ms: float, no_save: bool):
+    """Measure cold starts for every lambda in ROOT_DIR"""
+    console = Console()
+    console.print(Panel.fit("🧊 Measuring Lambda Cold Starts", style="bold blue"))
+
+    lambda_files = find_lambda_files(Path(root_dir))
+    if only:
+        lambda_files = {name: path for name, path in lambda_files.items() if name in only}
+    if not lambda_files:
+        console.print(f"[red]No lambda functions found in {root_dir}[/red]")
+        sys.exit(1)
+
+    table = Table(show_header=True)
+    table.add_column("Lambda Function", style="cyan")
+    table.add_column("Import (ms)", justify="right")
+    table.add_column("First Call (ms)", justify="right")
+    table.add_column("Process (ms)", justify="right")
+    table.add_column("RSS Init (MB)", justify="right")
+    table.add_column("RSS First Call (MB)", justify="right")
+    table.add_column("Slowest Imports", style="blue")
+
+    results = {}
+    for lambda_name, lambda_file in lambda_files.items():
+        result = measure(lambda_file, runs=runs, latency_ms=latency_ms)
+        results[lambda_name] = result
+        if 'error' in result:
+            table.add_row(lambda_name, f"[red]{result['error']}[/red]", '-', '-', '-', '-', '-')
+            continue
+        table.add_row(
+            lambda_name,
+            f"{result['import_ms']:.1f}",
+            f"{result.get('first_call_ms', 0):.1f}",
+            f"{result['process_ms']:.1f}",
+            f"{result.get('rss_init_mb', 0):.1f}",
+            f"{result.get('rss_first_call_mb', 0):.1f}",
+            '\n'.join(f"{i['package']} {i['ms']:.1f}" for i in result['imports'][:5]) or '-'
+        )
+
+    console.print(table)
+
+    if not no_save:
+        with ResultsStore() as store:
+            save_results(store, results, current_commit(dirty_paths=['lambdas']))
+            console.print(f"[green]✅ Results saved to {store.path}[/green]")
+
+
+@cli.command()
+@click.option('--html', 'html_output', is_flag=True, default=False, help='Print an HTML fragment for the dashboard')
+def show(html_output: bool):
+    """Show the most recent stored cold-start results"""
+    with ResultsStore() as store:
+        runs = load_latest(store)
+    if html_output:
+        click.echo(render_html(runs))
+        return
+    if not runs:
+        click.echo('No cold-start data yet.')
+        sys.exit(1)
+    commit, recorded_at, results = runs[0]
+    click.echo(json.dumps({'commit': commit, 'timestamp': recorded_at, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,177 @@
+// Client-side rendering of the lambda results exported by dashboard_data.py.
+// The summary is loaded up front; per-lambda details are loaded on demand.
+(function () {
+    var PAGE_SIZE = 50;
+    var LABELS = {
+        name: 'Lambda Function', status: 'Structure', moto: 'Moto Test', missing: 'Missing',
+        findings: 'Perf Findings', median_ms: 'Median (ms)', p95_ms: 'p95 (ms)',
+        import_ms: 'Import (ms)', import_delta_ms: 'Import Δ (ms)', commit: 'Commit'
+    };
+    var summary = window.DASHBOARD_SUMMARY;
+    var state = { sortColumn: 0, sortAscending: true, page: 0, filter: '' };
+
+    function escapeHtml(value) {
+        return String(value).replace(/[&<>"']/g, function (c) {
+            return { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c];
+        });
+    }
+
+    function formatCell(column, value) {
+        if (value === null || value === undefined) {
+            return '-';
+        }
+        if (column === 'status' || column === 'moto') {
+            var css = value === 'PASS' ? 'success' : (value === 'FAIL' ? 'error' : '');
+            return '<span class="' + css + '">' + escapeHtml(value) + '</span>';
+        }
+        if (column === 'import_delta_ms') {
+            return '<span class="' + (value > 0 ? 'error' : 'success') + '">' + (value > 0 ? '+' : '') + value + '</span>';
+        }
+        if (typeof value === 'number' && value % 1 !== 0) {
+            return value.toFixed(2);
+        }
+        return escapeHtml(value);
+    }
+
+    function visibleRows() {
+        var filter = state.filter.toLowerCase();
+        var rows = summary.rows.filter(function (row) {
+            return !filter || row[0].toLowerCase().indexOf(filter) !== -1;
+        });
+        var index = state.sortColumn;
+        var direction = state.sortAscending ? 1 : -1;
+        return rows.sort(function (a, b) {
+            var x = a[index], y = b[index];
+            if (x === y) { return 0; }
+            if (x === null || x === undefined) { return 1; }
+            if (y === null || y === undefined) { return -1; }
+            return (x < y ? -1 : 1) * direction;
+        });
+    }
+
+    function renderTable() {
+        var container = document.getElementById('lambda-results');
+        var rows = visibleRows();
+        var pages = Math.max(1, Math.ceil(rows.length / PAGE_SIZE));
+        state.page = Math.min(state.page, pages - 1);
+        var start = state.page * PAGE_SIZE;
+
+        var html = '<p><input id="lambda-filter" placeholder="Filter lambdas" value="' + escapeHtml(state.filter) + '"> '
+            + rows.length + ' lambda(s), generated ' + escapeHtml(summary.generated_at) + '</p>';
+        html += '<table><thead><tr>';
+        summary.columns.forEach(function (column, index) {
+            var arrow = index === state.sortColumn ? (state.sortAscending ? ' ▲' : ' ▼') : '';
+            html += '<th data-column="' + index + '" style="cursor:pointer">' + (LABELS[column] || column) + arrow + '</th>';
+        });
+        html += '</tr></thead><tbody>';
+        rows.slice(start, start + PAGE_SIZE).forEach(function (row) {
+            html += '<tr data-lambda="' + escapeHtml(row[0]) + '" style="cursor:pointer">';
+            row.forEach(function (value, index) {
+                html += '<td>' + formatCell(summary.columns[index], value) + '</td>';
+            });
+            html += '</tr>';
+        });
+        html += '</tbody></table>';
+        html += '<p><button id="page-prev"' + (state.page === 0 ? ' disabled' : '') + '>Previous</button> '
+            + 'Page ' + (state.page + 1) + ' of ' + pages
+            + ' <button id="page-next"' + (state.page >= pages - 1 ? ' disabled' : '') + '>Next</button></p>';
+        container.innerHTML = html;
+
+        container.querySelectorAll('th').forEach(function (th) {
+            th.onclick = function () {
+                var column = Number(th.getAttribute('data-column'));
+                state.sortAscending = column === state.sortColumn ? !state.sortAscending : true;
+                state.sortColumn = column;
+                renderTable();
+            };
+        });
+        container.querySelectorAll('tbody tr').forEach(function (tr) {
+            tr.onclick = function () { loadLambda(tr.getAttribute('data-lambda')); };
+        });
+        document.getElementById('page-prev').onclick = function () { state.page -= 1; renderTable(); };
+        document.getElementById('page-next').onclick = function () { state.page += 1; renderTable(); };
+        var filterInput = document.getElementById('lambda-filter');
+        filterInput.oninput = function () {
+            state.filter = filterInput.value;
+            state.page = 0;
+            renderTable();
+            var input = document.getElementById('lambda-filter');
+            input.focus();
+            input.setSelectionRange(input.value.length, input.value.length);
+        };
+    }
+
+    function trendChart(title, points) {
+        var values = points.map(function (p) { return p[1]; }).filter(function (v) { return v !== null; });
+        if (!values.length) {
+            return '<p>' + escapeHtml(title) + ': no data yet</p>';
+        }
+        var width = 480, height = 120, pad = 20;
+        var min = Math.min.apply(null, values), max = Math.max.apply(null, values);
+        var span = max - min || 1;
+        var step = points.length > 1 ? (width - 2 * pad) / (points.length - 1) : 0;
+        // Null points keep their x position but get no vertex; each vertex keeps its own point for the tooltip
+        var coords = points.map(function (p, i) {
+            if (p[1] === null) {
+                return null;
+            }
+            var y = height - pad - ((p[1] - min) / span) * (height - 2 * pad);
+            return { x: (pad + i * step).toFixed(1), y: y.toFixed(1), point: p };
+        }).filter(Boolean);
+        return '<div><strong>' + escapeHtml(title) + '</strong> (' + min.toFixed(1) + ' – ' + max.toFixed(1) + ')<br>'
+            + '<svg width="' + width + '" height="' + height + '" style="background:#f8f9fa">'
+            + '<polyline fill="none" stroke="#3498db" stroke-width="2" points="'
+            + coords.map(function (c) { return c.x + ',' + c.y; }).join(' ') + '"/>'
+            + coords.map(function (c) {
+                return '<circle cx="' + c.x + '" cy="' + c.y + '" r="3" fill="#2c3e50"><title>'
+                    + escapeHtml(c.point[0]) + ': ' + c.point[1] + '</title></circle>';
+            }).join('')
+            + '</svg></div>';
+    }
+
+    function renderDetail(detail) {
+        var html = '<h3>' + escapeHtml(detail.name) + '</h3>';
+        html += trendChart('p95 handler overhead (ms)', detail.trends['benchmarks.p95_ms'] || []);
+        html += trendChart('Median handler overhead (ms)', detail.trends['benchmarks.median_ms'] || []);
+        html += trendChart('Cold-start import (ms)', detail.trends['cold_starts.import_ms'] || []);
+        if (detail.missing.length) {
+            html += '<p class="error">Missing: ' + detail.missing.map(escapeHtml).join(', ') + '</p>';
+        }
+        if (detail.findings.length) {
+            html += '<ul>' + detail.findings.map(function (f) {
+                return '<li>' + escapeHtml(f.rule + ' [' + f.severity + '] line ' + f.line + ': ' + f.message) + '</li>';
+            }).join('') + '</ul>';
+        }
+        if (detail.output) {
+            html += '<pre>' + escapeHtml(detail.output) + '</pre>';
+        }
+        document.getElementById('lambda-detail').innerHTML = html;
+    }
+
+    window.dashboardLambdaLoaded = renderDetail;
+
+    function loadLambda(name) {
+        var script = document.createElement('script');
+        script.src = 'data/dashboard/lambdas/' + encodeURIComponent(name) + '.js?' + summary.generated_at;
+        script.onload = function () { script.remove(); };
+        document.body.appendChild(script);
+    }
+
+    function renderCounts() {
+        var passed = summary.rows.filter(function (row) { return row[1] === 'PASS'; }).length;
+        var counts = { 'total-count': summary.rows.length, 'passed-count': passed, 'failed-count': summary.rows.length - passed };
+        Object.keys(counts).forEach(function (id) {
+            var element = document.getElementById(id);
+            if (element) {
+                element.innerText = counts[id];
+            }
+        });
+    }
+
+    if (!summary) {
+        document.getElementById('lambda-results').innerText = 'No results yet. Run python dashboard_data.py.';
+        return;
+    }
+    renderCounts();
+    renderTable();
+})();
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Export the results store as compact data files for the dashboard.
+
+The dashboard page stays small: dashboard.js loads data/dashboard/summary.js
+(one row per lambda, columnar) and renders paginated, sortable tables in the
+browser. Per-lambda details and trend series live in
+data/dashboard/lambdas/<name>.js and are only fetched when a row is opened.
+Files are plain scripts rather than JSON so the page also works from file://.
+
+Regeneration is incremental: a per-lambda content hash is kept in
+manifest.json and only lambdas whose data changed are rewritten.
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from results_store import ResultsStore
+
+REPO_ROOT = Path(__file__).resolve().parent
+DATA_DIR = REPO_ROOT / 'data' / 'dashboard'
+TEMPLATE = REPO_ROOT / 'dashboard.template'
+PLACEHOLDER = '<!-- TEST_RESULTS -->'
+COLUMNS = ('name', 'status', 'moto', 'missing', 'findings', 'median_ms', 'p95_ms', 'import_ms',
+           'import_delta_ms', 'commit')
+TREND_SERIES = (('benchmarks', 'p95_ms'), ('benchmarks', 'median_ms'), ('cold_starts', 'import_ms'))
+METRICS = ('commit_count', 'last_commit', 'todo_count', 'lambda_status')
+
+RESULTS_MARKUP = """
+        <div class="test-results">
+            <h2>Lambda Test Results</h2>
+            <div id="lambda-results">Loading results...</div>
+            <div id="lambda-detail"></div>
+        </div>
+        <script src="data/dashboard/summary.js"></script>
+        <script src="dashboard.js"></script>
+"""
+
+
+def _write_script(path: Path, template: str, payload) -> None:
+    """Write payload into a one-line script template (`%s` marks the JSON), atomically"""
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        f.write(template % json.dumps(payload, separators=(',', ':'), sort_keys=True))
+    os.replace(tmp, path)
+
+
+def _load_manifest(out_dir: Path) -> dict:
+    try:
+        with open(out_dir / 'manifest.json', 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def collect(store: ResultsStore, trend_points: int = 50) -> tuple:
+    """Build (summary rows, per-lambda details) from the latest store contents"""
+    structure = {row['lambda_name']: row for row in store.latest('structure_checks')}
+    executions = {row['lambda_name']: row for row in store.latest('executions')}
+    benchmarks = {row['lambda_name']: row for row in store.latest('benchmarks')}
+
+    cold_commits = store.commits('cold_starts', last=2)
+    cold_latest = store.for_commit('cold_starts', cold_commits[0]) if cold_commits else {}
+    cold_previous = store.for_commit('cold_starts', cold_commits[1]) if len(cold_commits) > 1 else {}
+
+    rows, details = [], {}
+    for name in sorted(set(structure) | set(executions) | set(benchmarks) | set(cold_latest)):
+        check = structure.get(name, {})
+        execution = executions.get(name)
+        benchmark = benchmarks.get(name, {})
+        cold = cold_latest.get(name, {})
+        missing = json.loads(check.get('missing') or '[]')
+        findings = json.loads(check.get('findings') or '[]')
+
+        import_ms = cold.get('import_ms')
+        before = cold_previous.get(name, {}).get('import_ms')
+        delta = round(import_ms - before, 1) if import_ms is not None and before is not None else None
+        rows.append([
+            name,
+            check.get('status', '-'),
+            '-' if execution is None else ('PASS' if execution['passed'] else 'FAIL'),
+            len(missing),
+            len(findings),
+            benchmark.get('median_ms'),
+            benchmark.get('p95_ms'),
+            round(import_ms, 1) if import_ms is not None else None,
+            delta,
+            check.get('commit_sha') or (execution or {}).get('commit_sha', '-'),
+        ])
+        details[name] = {
+            'name': name,
+            'missing': missing,
+            'findings': findings,
+            'output': (execution or {}).get('output') or '',
+            'trends': {
+                f'{table}.{column}': [[commit, value] for commit, _, value
+                                      in store.trend(name, table, column, trend_points)]
+                for table, column in TREND_SERIES
+            },
+        }
+    return rows, details
+
+
+def export(store: ResultsStore, out_dir: Path = DATA_DIR, full: bool = False) -> dict:
+    """Write summary.js and the per-lambda files that changed since the last export"""
+    lambda_dir = out_dir / 'lambdas'
+    lambda_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if full else _load_manifest(out_dir)
+
+    rows, details = collect(store)
+    written, new_manifest = [], {}
+    for name, detail in details.items():
+        digest = hashlib.sha256(json.dumps(detail, sort_keys=True).encode()).hexdigest()
+        new_manifest[name] = digest
+        path = lambda_dir / f'{name}.js'
+        if manifest.get(name) != digest or not path.exists():
+            _write_script(path, 'window.dashboardLambdaLoaded(%s);\n', detail)
+            written.append(name)
+
+    for name in set(manifest) - set(new_manifest):
+        (lambda_dir / f'{name}.js').unlink(missing_ok=True)
+
+    _write_script(out_dir / 'summary.js', 'window.DASHBOARD_SUMMARY = %s;\n', {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'metrics': {metric: store.get_metric(metric) for metric in METRICS},
+        'columns': list(COLUMNS),
+        'rows': rows,
+    })
+    with open(out_dir / 'manifest.json', 'w') as f:
+        json.dump(new_manifest, f, indent=2, sort_keys=True)
+    return {'written': written, 'unchanged': len(details) - len(written)}
+
+
+def render(template: Path = TEMPLATE, output: Path = REPO_ROOT / 'dashboard.html') -> Path:
+    """Fill the template's results placeholder with the client-side table"""
+    with open(template, 'r') as f:
+        html = f.read()
+    with open(output, 'w') as f:
+        f.write(html.replace(PLACEHOLDER, RESULTS_MARKUP))
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export dashboard data from the results store")
+    parser.add_argument('--full', action='store_true', help="Rewrite every per-lambda file")
+    parser.add_argument('--out-dir', default=str(DATA_DIR))
+    args = parser.parse_args(argv)
+
+    with ResultsStore() as store:
+        stats = export(store, Path(args.out_dir), full=args.full)
+    print(f"Dashboard data: {len(stats['written'])} lambda(s) rewritten, {stats['unchanged']} unchanged")
+
+
+if __name__ == '__main__':
+    main()
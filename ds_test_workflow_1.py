@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 import click
-import ast
+import json
 import sys
 from pathlib import Path
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 
+from lambda_index import DEFAULT_CACHE_FILE, LambdaIndex, check_required, find_lambda_files
+
+SEVERITY_STYLES = {
+    'high': 'red',
+    'medium': 'yellow',
+    'low': 'dim'
+}
+
 class LambdaStructureChecker:
-    def __init__(self):
+    def __init__(self, index: LambdaIndex = None, perf: bool = False):
         self.console = Console()
+        self.index = index if index is not None else LambdaIndex()
+        self.perf = perf
         self.required_elements = [
             'config',
             'sagemaker_runtime',
@@ -23,6 +33,18 @@ class LambdaStructureChecker:
 
     def check_structure(self, lambda_file: Path) -> dict:
         """Check if lambda function follows required structure"""
+        return self._result_from_entry(self.index.get(lambda_file))
+
+    def check_all(self, lambda_files: dict) -> dict:
+        """Check every lambda in one pass over the shared symbol index"""
+        entries = self.index.build(lambda_files.values())
+        self.index.save()
+        return {
+            lambda_name: self._result_from_entry(entries[str(lambda_file)])
+            for lambda_name, lambda_file in lambda_files.items()
+        }
+
+    def _result_from_entry(self, entry: dict) -> dict:
         result = {
             'status': 'success',
             'missing': [],
@@ -30,63 +52,56 @@ class LambdaStructureChecker:
             'imports': set()
         }
 
-        try:
-            with open(lambda_file, 'r') as f:
-                tree = ast.parse(f.read())
-
-            found_elements = set()
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                    found_elements.add(node.name)
-                elif isinstance(node, ast.Assign):
-                    for target in node.targets:
-                        if isinstance(target, ast.Name):
-                            found_elements.add(target.id)
-                elif isinstance(node, ast.Import):
-                    for name in node.names:
-                        result['imports'].add(name.name)
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        result['imports'].add(node.module)
-
-            result['found'] = list(found_elements)
-            result['missing'] = list(set(self.required_elements) - found_elements)
-
-            if result['missing']:
-                result['status'] = 'warning'
-
-        except Exception as e:
+        if entry['error']:
             result['status'] = 'error'
-            result['missing'].append(f'Error: {str(e)}')
+            result['missing'].append(entry['error'])
+            return result
+
+        result['found'] = list(entry['bindings'])
+        result['imports'] = set(entry['imports'])
+        _, result['missing'] = check_required(entry, self.required_elements)
+
+        if result['missing']:
+            result['status'] = 'warning'
+
+        if self.perf:
+            result['findings'] = list(entry['findings'])
 
         return result
 
+def format_finding(finding: dict) -> str:
+    """Render a performance finding for the rich table"""
+    style = SEVERITY_STYLES.get(finding['severity'], '')
+    return f"[{style}]{finding['severity'].upper()}[/{style}] L{finding['line']} {finding['rule']}: {finding['message']}"
+
 def scan_lambda_directories(root_dir: Path) -> dict:
     """Scan for lambda functions in subdirectories"""
-    results = {}
-
-    for path in root_dir.iterdir():
-        if path.is_dir():
-            lambda_file = path.joinpath('lambda_function.py')
-            if lambda_file.exists():
-                results[path.name] = lambda_file
-
-    return results
+    return find_lambda_files(root_dir)
 
 @click.command()
 @click.argument('root_dir', type=click.Path(exists=True))
 @click.option('--strict', is_flag=True, default=False, help='Exit with error if checks fail')
 @click.option('--json', 'json_output', is_flag=True, default=False, help='Output in JSON format')
-def main(root_dir: str, strict: bool, json_output: bool):
+@click.option('--workers', type=int, default=None, help='Number of parallel parser workers')
+@click.option('--processes', is_flag=True, default=False, help='Parse in a process pool instead of threads')
+@click.option('--no-cache', is_flag=True, default=False, help='Ignore the on-disk symbol index cache')
+@click.option('--perf', is_flag=True, default=False, help='Also run the performance lint rules')
+@click.option('--only', multiple=True, help='Only check these lambdas (repeatable)')
+def main(root_dir: str, strict: bool, json_output: bool, workers: int, processes: bool, no_cache: bool, perf: bool,
+         only: tuple):
     """Check Lambda functions structure in the given directory"""
-    console = Console()
-    checker = LambdaStructureChecker()
+    console = Console(stderr=json_output)
+    index = LambdaIndex(None if no_cache else DEFAULT_CACHE_FILE, workers=workers, use_processes=processes)
+    checker = LambdaStructureChecker(index, perf=perf)
     root_path = Path(root_dir)
 
-    console.print(Panel.fit("🔍 Checking Lambda Functions Structure", style="bold blue"))
+    if not json_output:
+        console.print(Panel.fit("🔍 Checking Lambda Functions Structure", style="bold blue"))
 
     # Find all lambda functions
     lambda_files = scan_lambda_directories(root_path)
+    if only:
+        lambda_files = {name: path for name, path in lambda_files.items() if name in only}
 
     if not lambda_files:
         console.print(f"[red]No lambda functions found in {root_dir}[/red]")
@@ -99,12 +114,16 @@ def main(root_dir: str, strict: bool, json_output: bool):
     table.add_column("Missing Elements", style="yellow")
     table.add_column("Found Elements", style="green")
     table.add_column("Imports", style="blue")
+    if perf:
+        table.add_column("Performance")
 
     has_warnings = False
     has_errors = False
+    has_perf_issues = False
 
-    for lambda_name, lambda_file in lambda_files.items():
-        result = checker.check_structure(lambda_file)
+    results = checker.check_all(lambda_files)
+
+    for lambda_name, result in results.items():
 
         status_style = {
             'success': '[green]✓[/green]',
@@ -112,20 +131,31 @@ def main(root_dir: str, strict: bool, json_output: bool):
             'error': '[red]✗[/red]'
         }.get(result['status'], '')
 
-        table.add_row(
+        row = [
             lambda_name,
             status_style,
             '\n'.join(result['missing']) if result['missing'] else '-',
             '\n'.join(result['found']) if result['found'] else '-',
-            '\n'.join(result['imports']) if result['imports'] else '-'
-        )
+            '\n'.join(sorted(result['imports'])) if result['imports'] else '-'
+        ]
+        if perf:
+            row.append('\n'.join(format_finding(f) for f in result['findings']) if result['findings'] else '-')
+        table.add_row(*row)
 
         if result['status'] == 'warning':
             has_warnings = True
         elif result['status'] == 'error':
             has_errors = True
-
-    console.print(table)
+        if any(f['severity'] == 'high' for f in result.get('findings', [])):
+            has_perf_issues = True
+
+    if json_output:
+        click.echo(json.dumps({
+            lambda_name: dict(result, imports=sorted(result['imports']))
+            for lambda_name, result in results.items()
+        }, indent=2))
+    else:
+        console.print(table)
 
     if has_errors:
         console.print("[red]❌ Some lambdas have errors![/red]")
@@ -133,6 +163,9 @@ def main(root_dir: str, strict: bool, json_output: bool):
     elif has_warnings and strict:
         console.print("[yellow]⚠ Some lambdas are missing required elements![/yellow]")
         sys.exit(1)
+    elif has_perf_issues and strict:
+        console.print("[red]❌ Some lambdas have high-severity performance findings![/red]")
+        sys.exit(1)
     else:
         console.print("[green]✅ All checks completed![/green]")
         sys.exit(0)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Shared symbol index for lambda_function.py files.
+
+Both ds_test_workflow_1.py and test_lambda_local.py need to know which names a
+lambda binds at module level. This module answers that without importing the
+lambda: every file is parsed once, only top-level bindings are recorded (along
+with the perf_lint.py findings for the same tree), and the result is cached by
+mtime/size with a content hash as a fallback so that repeated runs only
+re-parse files that actually changed.
+"""
+import ast
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from perf_lint import lint_tree
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_FILE = Path(__file__).resolve().parent / '.lambda_index_cache.json'
+
+# Statements whose bodies still execute at module level
+_BLOCK_STATEMENTS = (ast.If, ast.Try, ast.With, ast.For, ast.While)
+if hasattr(ast, 'TryStar'):
+    _BLOCK_STATEMENTS += (ast.TryStar,)
+
+
+def _target_names(target) -> list:
+    """Return the names bound by an assignment target"""
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        names = []
+        for element in target.elts:
+            names.extend(_target_names(element))
+        return names
+    if isinstance(target, ast.Starred):
+        return _target_names(target.value)
+    return []
+
+
+def _collect_top_level(statements, bindings: set, imports: set):
+    """Collect bindings and imported modules from module-level statements"""
+    for node in statements:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bindings.add(node.name)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                bindings.update(_target_names(target))
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+            bindings.update(_target_names(node.target))
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.add(alias.name)
+                bindings.add(alias.asname or alias.name.split('.')[0])
+        elif isinstance(node, ast.ImportFrom):
+            module = '.' * node.level + (node.module or '')
+            if module:
+                imports.add(module)
+            for alias in node.names:
+                if alias.name != '*':
+                    bindings.add(alias.asname or alias.name)
+        elif isinstance(node, _BLOCK_STATEMENTS):
+            if isinstance(node, (ast.For, ast.With)):
+                targets = [node.target] if isinstance(node, ast.For) else [
+                    item.optional_vars for item in node.items if item.optional_vars]
+                for target in targets:
+                    bindings.update(_target_names(target))
+            _collect_top_level(node.body, bindings, imports)
+            _collect_top_level(getattr(node, 'orelse', []), bindings, imports)
+            _collect_top_level(getattr(node, 'finalbody', []), bindings, imports)
+            for handler in getattr(node, 'handlers', []):
+                _collect_top_level(handler.body, bindings, imports)
+
+
+def parse_source(source: bytes, filename: str = '<lambda>') -> dict:
+    """Build the index entry for one source buffer"""
+    entry = {
+        'hash': hashlib.sha256(source).hexdigest(),
+        'bindings': [],
+        'imports': [],
+        'findings': [],
+        'error': None
+    }
+    try:
+        tree = ast.parse(source, filename=filename)
+    except SyntaxError as e:
+        entry['error'] = f'SyntaxError: {e.msg} (line {e.lineno})'
+        return entry
+
+    bindings, imports = set(), set()
+    _collect_top_level(tree.body, bindings, imports)
+    entry['bindings'] = sorted(bindings)
+    entry['imports'] = sorted(imports)
+    entry['findings'] = lint_tree(tree)
+    return entry
+
+
+def index_file(path) -> dict:
+    """Parse a single lambda file and return its index entry"""
+    path = Path(path)
+    try:
+        stat = path.stat()
+        source = path.read_bytes()
+    except OSError as e:
+        return {'path': str(path), 'mtime_ns': 0, 'size': 0, 'hash': None,
+                'bindings': [], 'imports': [], 'findings': [], 'error': f'Error: {e}'}
+
+    entry = parse_source(source, filename=str(path))
+    entry.update({'path': str(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+    return entry
+
+
+class LambdaIndex:
+    """Cache of top-level symbol indexes keyed by file path"""
+
+    def __init__(self, cache_file=None, workers: int = None, use_processes: bool = False):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.workers = workers
+        self.use_processes = use_processes
+        self.entries = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """Persist the cache if anything changed since it was loaded"""
+        if not self.cache_file or not self._dirty:
+            return
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': self.entries}, f)
+        os.replace(tmp_file, self.cache_file)
+        self._dirty = False
+
+    def _cached(self, path: Path):
+        """Return the cached entry for path if the file is unchanged"""
+        entry = self.entries.get(str(path.resolve()))
+        if entry is None:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry
+        # mtime moved (checkout, touch) - fall back to the content hash
+        source = path.read_bytes()
+        if hashlib.sha256(source).hexdigest() == entry['hash']:
+            entry.update({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+            self._dirty = True
+            return entry
+        return None
+
+    def build(self, paths) -> dict:
+        """Index all paths, parsing only stale files in a worker pool
+
+        The returned dict is keyed by str(path) exactly as passed in.
+        """
+        paths = [Path(p) for p in paths]
+        results = {}
+        stale = []
+        for path in paths:
+            entry = self._cached(path)
+            if entry is None:
+                stale.append(path)
+            else:
+                results[str(path)] = entry
+
+        if stale:
+            if len(stale) == 1 or self.workers == 1:
+                parsed = [index_file(path) for path in stale]
+            else:
+                pool_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                with pool_cls(max_workers=self.workers) as pool:
+                    parsed = list(pool.map(index_file, stale, chunksize=32 if self.use_processes else 1))
+            for path, entry in zip(stale, parsed):
+                results[str(path)] = entry
+                if entry['hash'] is not None:
+                    self.entries[str(path.resolve())] = entry
+                    self._dirty = True
+
+        return results
+
+    def get(self, path) -> dict:
+        """Index a single file, using the cache when possible"""
+        return self.build([path])[str(Path(path))]
+
+
+def find_lambda_files(root_dir) -> dict:
+    """Map lambda directory names to their lambda_function.py"""
+    results = {}
+    for path in sorted(Path(root_dir).iterdir()):
+        if path.is_dir():
+            lambda_file = path.joinpath('lambda_function.py')
+            if lambda_file.exists():
+                results[path.name] = lambda_file
+    return results
+
+
+def check_required(entry: dict, required_elements) -> tuple:
+    """Split required element names into (found, missing) for an index entry"""
+    bindings = set(entry['bindings'])
+    found = [name for name in required_elements if name in bindings]
+    missing = [name for name in required_elements if name not in bindings]
+    return found, missing
+
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else 'lambdas'
+    index = LambdaIndex(DEFAULT_CACHE_FILE)
+    entries = index.build(find_lambda_files(root).values())
+    index.save()
+    print(json.dumps(entries, indent=2))
@@ -4,6 +4,10 @@ import numpy as np
 from typing import Dict, Any, List, Union
 import logging
 
+from lambda_common import async_inference, compression, precision, records
+from lambda_common.frames import ArrayFrame, stack_frames
+from lambda_common.profiling import profile_handler
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -11,30 +15,51 @@ logger.setLevel(logging.INFO)
 # Initialize AWS clients
 sagemaker_runtime = boto3.client('sagemaker-runtime')
 sagemaker_client = boto3.client('sagemaker')
+s3_client = boto3.client('s3')
 
 # Configuration dictionary - matching the expected test values
 config = {
     "model": {
         "name": "test-model",
         "container": "123456789012.dkr.ecr.us-east-1.amazonaws.com/test-image:latest",
-        "data_url": "s3://test-bucket/model.tar.gz"
+        "data_url": "s3://test-bucket/model.tar.gz",
+        "transfer_precision": "float32"
     },
     "endpoint": {
         "name": "test-endpoint",
         "config_name": "test-config",
         "variant_name": "test-variant",
         "instance_count": 1,
-        "instance_type": "ml.m5.xlarge"
+        "instance_type": "ml.m5.xlarge",
+        "compression": {
+            "codec": "gzip",
+            "threshold_bytes": 16384
+        },
+        "async": {
+            "s3_path": "s3://test-bucket/async-inference/test-endpoint",
+            "threshold_bytes": 5242880
+        }
+    },
+    # SQS / Kinesis events: records grouped into batched endpoint calls
+    "records": {
+        "batch_size": 8,
+        "max_workers": 4,
+        "deadline_margin_ms": 1000,
+        "output_path": "s3://test-bucket/records/test-endpoint"
     }
 }
 
-class VisionFrame:
+class VisionFrame(ArrayFrame):
     """Helper class for vision data processing"""
-    def __init__(self, data: np.ndarray):
+    __slots__ = ('transfer_precision',)
+
+    def __init__(self, data: np.ndarray, transfer_precision: str = None):
         self.data = data
+        # Per-model setting; float16 / uint8 need a model side that decodes them
+        self.transfer_precision = transfer_precision or config["model"].get("transfer_precision", precision.DEFAULT_PRECISION)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"data": self.data.tolist()}
+        return precision.encode(self.data, self.transfer_precision)
 
 class Preprocessing:
     """Handles input preprocessing"""
@@ -95,6 +120,28 @@ def convert_parsed_response_to_ndarray(response: Dict[str, Any]) -> np.ndarray:
         logger.error(f"Conversion error: {str(e)}")
         raise
 
+def predict_batch(data: np.ndarray) -> np.ndarray:
+    """Predictions for a stack of (n, ...) frames, in one endpoint call"""
+    payload = dict(VisionFrame(data).to_dict(), batch=len(data))
+    response = compression.invoke_endpoint(
+        sagemaker_runtime,
+        config["endpoint"].get("compression"),
+        EndpointName=config["endpoint"]["name"],
+        ContentType='application/json',
+        Body=json.dumps(payload)
+    )
+    return convert_parsed_response_to_ndarray(json.loads(compression.read_body(response)))
+
+def decode_record(body: Dict[str, Any]) -> tuple:
+    """(group key, frame) for an SQS / Kinesis record; frames of one shape share a call"""
+    vision_frame = Preprocessing.process_input(body)
+    return vision_frame.data.shape, vision_frame
+
+def predict_records(frames: List[VisionFrame], context: Any = None) -> List[Dict[str, Any]]:
+    """Predictions for a group of same-shape record frames"""
+    predictions = predict_batch(stack_frames(frames))
+    return [{"predictions": row.tolist()} for row in predictions]
+
 # WARP templates for different model types - required by the test script
 WARP_TEMPLATES = {
     "vision": {
@@ -115,6 +162,7 @@ WARP_TEMPLATES = {
     }
 }
 
+@profile_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda function handler for SageMaker model inference
@@ -134,6 +182,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     try:
         # Log the incoming event
         logger.info(f"Received event: {json.dumps(event)}")
+        
+        # SQS / Kinesis batches: grouped, concurrent endpoint calls and a partial batch response
+        if records.is_records_event(event):
+            return records.process(event, decode_record, predict_records, config.get("records"), context, s3_client)
 
         # Parse the input data with better error handling
         try:
@@ -142,6 +194,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             logger.warning("Failed to parse event body as JSON, using empty dictionary")
             body = {}
 
+        # A job token polls for the result of an earlier async request
+        if isinstance(body, dict) and async_inference.TOKEN_FIELD in body and "async" in config["endpoint"]:
+            return async_inference.fetch(s3_client, body[async_inference.TOKEN_FIELD],
+                                         config["endpoint"]["async"], Postprocessing.process_output)
+
         # Use default test data if input is empty or missing required fields
         if not body or ('data' not in body and 'image' not in body):
             # Use a small sample image representation for testing (3x3 RGB)
@@ -165,15 +222,23 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Log invocation attempt
         logger.info(f"Invoking SageMaker endpoint: {endpoint_name}")
 
+        # Large or long-running requests go through async inference
+        if async_inference.should_offload(payload, body, config["endpoint"].get("async")):
+            logger.info(f"Offloading {len(payload)} byte request to async inference")
+            return async_inference.submit(sagemaker_runtime, s3_client, config["endpoint"]["async"],
+                                          endpoint_name, payload)
+
         # Invoke the SageMaker endpoint
-        response = sagemaker_runtime.invoke_endpoint(
+        response = compression.invoke_endpoint(
+            sagemaker_runtime,
+            config["endpoint"].get("compression"),
             EndpointName=endpoint_name,
             ContentType='application/json',
             Body=payload
         )
 
         # Parse the response
-        response_body = json.loads(response['Body'].read().decode())
+        response_body = json.loads(compression.read_body(response))
         logger.info("Successfully received response from SageMaker endpoint")
 
         # Postprocess the response
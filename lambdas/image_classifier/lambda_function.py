@@ -10,6 +10,10 @@ import numpy as np
 from typing import Dict, Any, List, Union
 import logging
 
+from lambda_common import async_inference, compression, precision, records, sequence
+from lambda_common.frames import ArrayFrame, stack_frames
+from lambda_common.profiling import profile_handler
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -17,36 +21,74 @@ logger.setLevel(logging.INFO)
 # Initialize AWS clients
 sagemaker_runtime = boto3.client('sagemaker-runtime')
 sagemaker_client = boto3.client('sagemaker')
+s3_client = boto3.client('s3')
 
 # Configuration dictionary
 config = {
     "model": {
         "name": "image-classifier-model",
         "container": "123456789012.dkr.ecr.us-east-1.amazonaws.com/image-classifier:latest",
-        "data_url": "s3://test-bucket/model.tar.gz"
+        "data_url": "s3://test-bucket/model.tar.gz",
+        "transfer_precision": "float32",
+        # Frames of a sequence this close to the last sent frame reuse its prediction
+        "sequence": {
+            "max_distance": 4,
+            "max_gap": 30
+        }
     },
     "endpoint": {
         "name": "image-classifier-endpoint",
         "config_name": "image-classifier-config",
         "variant_name": "image-classifier-variant",
         "instance_count": 1,
-        "instance_type": "ml.m5.xlarge"
+        "instance_type": "ml.m5.xlarge",
+        "compression": {
+            "codec": "gzip",
+            "threshold_bytes": 16384
+        },
+        "async": {
+            "s3_path": "s3://test-bucket/async-inference/image-classifier-endpoint",
+            "threshold_bytes": 5242880
+        }
+    },
+    # SQS / Kinesis events: records grouped into batched endpoint calls
+    "records": {
+        "batch_size": 8,
+        "max_workers": 4,
+        "deadline_margin_ms": 1000,
+        "output_path": "s3://test-bucket/records/image-classifier-endpoint"
     }
 }
 
-class VisionFrame:
+class VisionFrame(ArrayFrame):
     """Helper class for vision data processing"""
-    def __init__(self, data: np.ndarray):
+    __slots__ = ('transfer_precision', 'frame_map')
+
+    def __init__(self, data: np.ndarray, transfer_precision: str = None, frame_map: np.ndarray = None):
         self.data = data
+        # Per-model setting; float16 / uint8 need a model side that decodes them
+        self.transfer_precision = transfer_precision or config["model"].get("transfer_precision", precision.DEFAULT_PRECISION)
+        # For sequences: which of the sent frames' predictions each input frame uses
+        self.frame_map = frame_map
     
     def to_dict(self) -> Dict[str, Any]:
-        return {"data": self.data.tolist()}
+        payload = precision.encode(self.data, self.transfer_precision)
+        if self.frame_map is not None:
+            payload["batch"] = len(self.data)
+        return payload
 
 class Preprocessing:
     """Handles input preprocessing"""
     @staticmethod
     def process_input(data: Dict[str, Any]) -> VisionFrame:
         try:
+            # Frame sequences: only frames that changed meaningfully are sent
+            if isinstance(data, dict) and "frames" in data:
+                frames = np.array(data["frames"])
+                settings = config["model"].get("sequence", {})
+                sent, frame_map = sequence.select_frames(frames, settings.get("max_distance", 4),
+                                                         settings.get("max_gap", 30))
+                return VisionFrame(frames[sent], frame_map=frame_map)
             # Convert input data to numpy array
             if isinstance(data, dict) and "data" in data:
                 array_data = np.array(data["data"])
@@ -63,12 +105,15 @@ class Postprocessing:
         try:
             # Process the model response
             if isinstance(response, dict) and "predictions" in response:
+                body = {
+                    "predictions": response["predictions"],
+                    "message": "Successfully processed predictions"
+                }
+                if "sequence" in response:
+                    body["sequence"] = response["sequence"]
                 return {
                     "statusCode": 200,
-                    "body": json.dumps({
-                        "predictions": response["predictions"],
-                        "message": "Successfully processed predictions"
-                    })
+                    "body": json.dumps(body)
                 }
             raise ValueError("Invalid response format")
         except Exception as e:
@@ -90,6 +135,34 @@ def convert_parsed_response_to_ndarray(response: Dict[str, Any]) -> np.ndarray:
         logger.error(f"Conversion error: {str(e)}")
         raise
 
+def predict_batch(data: np.ndarray) -> np.ndarray:
+    """Predictions for a stack of (n, ...) frames, in one endpoint call"""
+    payload = dict(VisionFrame(data).to_dict(), batch=len(data))
+    response = compression.invoke_endpoint(
+        sagemaker_runtime,
+        config["endpoint"].get("compression"),
+        EndpointName=config["endpoint"]["name"],
+        ContentType='application/json',
+        Body=json.dumps(payload)
+    )
+    return convert_parsed_response_to_ndarray(json.loads(compression.read_body(response)))
+
+def decode_record(body: Dict[str, Any]) -> tuple:
+    """(group key, frame) for an SQS / Kinesis record; frames of one shape share a call"""
+    vision_frame = Preprocessing.process_input(body)
+    # Sequences are already one batched call, so they are not grouped with other records
+    if vision_frame.frame_map is not None:
+        return None, vision_frame
+    return vision_frame.data.shape, vision_frame
+
+def predict_records(frames: List[VisionFrame], context: Any = None) -> List[Dict[str, Any]]:
+    """Predictions for a group of same-shape record frames, or for one sequence"""
+    if frames[0].frame_map is not None:
+        predictions = predict_batch(frames[0].data)[frames[0].frame_map]
+        return [{"predictions": predictions.tolist()}]
+    predictions = predict_batch(stack_frames(frames))
+    return [{"predictions": row.tolist()} for row in predictions]
+
 # WARP templates for different model types
 WARP_TEMPLATES = {
     "vision": {
@@ -102,6 +175,7 @@ WARP_TEMPLATES = {
     }
 }
 
+@profile_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda function handler for image classification model inference
@@ -110,14 +184,23 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Log the incoming event
         logger.info(f"Received event: {json.dumps(event)}")
         
+        # SQS / Kinesis batches: grouped, concurrent endpoint calls and a partial batch response
+        if records.is_records_event(event):
+            return records.process(event, decode_record, predict_records, config.get("records"), context, s3_client)
+        
         # Parse the input data with better error handling
         try:
             body = json.loads(event.get('body', '{}'))
         except json.JSONDecodeError:
             body = {}
             
+        # A job token polls for the result of an earlier async request
+        if isinstance(body, dict) and async_inference.TOKEN_FIELD in body and "async" in config["endpoint"]:
+            return async_inference.fetch(s3_client, body[async_inference.TOKEN_FIELD],
+                                         config["endpoint"]["async"], Postprocessing.process_output)
+
         # Use default test data if input is empty or missing 'data'
-        if not body or 'data' not in body:
+        if not body or ('data' not in body and 'frames' not in body):
             body = {"data": [[1, 2, 3], [4, 5, 6]]}
             logger.info(f"Using default test data: {body}")
         
@@ -131,15 +214,35 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Get the endpoint name from config
         endpoint_name = config["endpoint"]["name"]
         
+        # Large or long-running requests go through async inference; sequences
+        # stay realtime so their predictions can be expanded below
+        offload = async_inference.should_offload(payload, body, config["endpoint"].get("async"))
+        if offload and vision_frame.frame_map is None:
+            logger.info(f"Offloading {len(payload)} byte request to async inference")
+            return async_inference.submit(sagemaker_runtime, s3_client, config["endpoint"]["async"],
+                                          endpoint_name, payload)
+
         # Invoke the SageMaker endpoint
-        response = sagemaker_runtime.invoke_endpoint(
+        response = compression.invoke_endpoint(
+            sagemaker_runtime,
+            config["endpoint"].get("compression"),
             EndpointName=endpoint_name,
             ContentType='application/json',
             Body=payload
         )
         
         # Parse the response
-        response_body = json.loads(response['Body'].read().decode())
+        response_body = json.loads(compression.read_body(response))
+
+        # Skipped frames of a sequence reuse the prediction of the last sent frame
+        if vision_frame.frame_map is not None:
+            predictions = convert_parsed_response_to_ndarray(response_body)[vision_frame.frame_map]
+            frames, sent = len(vision_frame.frame_map), len(vision_frame.data)
+            logger.info(f"Sequence: sent {sent} of {frames} frames")
+            response_body = {
+                "predictions": predictions.tolist(),
+                "sequence": {"frames": frames, "sent": sent, "skip_ratio": round(1 - sent / frames, 4)}
+            }
         
         # Postprocess the response
         postprocessor = Postprocessing()
@@ -0,0 +1,8 @@
+"""Runtime helpers shared by the lambdas under lambdas/.
+
+Deployed alongside each lambda_function.py (as a layer or copied into the
+package). Only the standard library is imported here so that adding it does
+not cost cold-start time. The array modules also need numpy: precision, frames,
+tiling, sequence, columnar and shared_frames. The rest use the standard library
+only (compression picks up zstandard and lz4 when they are installed).
+"""
@@ -0,0 +1,138 @@
+"""Offload of large or long-running requests to SageMaker asynchronous inference.
+
+Realtime invoke_endpoint caps the payload at 6 MB and the call at 60 seconds.
+With ``config["endpoint"]["async"]`` set::
+
+    {"s3_path": "s3://bucket/async-inference/<endpoint>", "threshold_bytes": 5242880}
+
+payloads above ``threshold_bytes``, and requests with ``"long_running": true``,
+are written to ``<s3_path>/inputs/<job id>.json`` and sent with
+invoke_endpoint_async. The handler answers 202 with an opaque ``job_token``;
+sending ``{"job_token": ...}`` to the same handler polls for the result, which
+is then postprocessed like a realtime response. The endpoint's
+AsyncInferenceConfig must write its outputs (and failures) under ``s3_path``;
+tokens pointing anywhere else are rejected.
+
+Tokens are ``<base64 job>.<signature>``, the signature being
+HMAC-SHA256(LAMBDA_ASYNC_TOKEN_KEY, "<base64 job>"), so clients cannot make up
+tokens for other objects under ``s3_path``. Without LAMBDA_ASYNC_TOKEN_KEY,
+submit() raises ValueError and every token is rejected.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import uuid
+
+DEFAULT_THRESHOLD = 5 * 1024 * 1024
+TOKEN_FIELD = 'job_token'
+TOKEN_KEY_ENV = 'LAMBDA_ASYNC_TOKEN_KEY'
+LONG_RUNNING_FIELD = 'long_running'
+
+
+def split_s3_uri(uri: str) -> tuple:
+    if not uri.startswith('s3://'):
+        raise ValueError(f"Not an S3 URI: {uri}")
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+
+def should_offload(payload, body, settings: dict = None) -> bool:
+    """True when the request should go through async inference"""
+    if not settings:
+        return False
+    if isinstance(body, dict) and body.get(LONG_RUNNING_FIELD):
+        return True
+    return len(payload) > settings.get('threshold_bytes', DEFAULT_THRESHOLD)
+
+
+def _token_key() -> bytes:
+    key = os.environ.get(TOKEN_KEY_ENV)
+    if not key:
+        raise ValueError(f"{TOKEN_KEY_ENV} is not set; job tokens cannot be signed")
+    return key.encode()
+
+
+def sign(data: str) -> str:
+    """Signature of a token's job part"""
+    return hmac.new(_token_key(), data.encode(), hashlib.sha256).hexdigest()
+
+
+def encode_token(job: dict) -> str:
+    data = base64.urlsafe_b64encode(json.dumps(job, separators=(',', ':')).encode()).decode().rstrip('=')
+    return f'{data}.{sign(data)}'
+
+
+def decode_token(token: str, settings: dict) -> dict:
+    """Job from a token; ValueError unless it is signed and points under the configured s3_path"""
+    data, _, signature = str(token).partition('.')
+    if not hmac.compare_digest(sign(data), signature):
+        raise ValueError("Job token signature does not match")
+    try:
+        job = json.loads(base64.urlsafe_b64decode(data + '=' * (-len(data) % 4)))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Malformed job token: {e}")
+    if not isinstance(job, dict):
+        raise ValueError("Malformed job token")
+    root = settings['s3_path'].rstrip('/') + '/'
+    locations = [job.get('output')] + ([job['failure']] if job.get('failure') else [])
+    if not all(isinstance(location, str) and location.startswith(root) for location in locations):
+        raise ValueError("Job token does not belong to this endpoint")
+    return job
+
+
+def _response(status_code: int, body: dict) -> dict:
+    return {"statusCode": status_code, "body": json.dumps(body)}
+
+
+def submit(runtime, s3, settings: dict, endpoint_name: str, payload,
+           content_type: str = 'application/json') -> dict:
+    """Stage the payload in S3, start an async invocation and answer 202 with a job token"""
+    # Fails before anything is staged when tokens cannot be signed
+    _token_key()
+    job_id = uuid.uuid4().hex
+    bucket, prefix = split_s3_uri(settings['s3_path'].rstrip('/'))
+    key = f'{prefix}/inputs/{job_id}.json'
+    s3.put_object(Bucket=bucket, Key=key, Body=payload, ContentType=content_type)
+    response = runtime.invoke_endpoint_async(
+        EndpointName=endpoint_name,
+        ContentType=content_type,
+        InputLocation=f's3://{bucket}/{key}',
+        InferenceId=job_id
+    )
+    token = encode_token({
+        'id': job_id,
+        'output': response['OutputLocation'],
+        'failure': response.get('FailureLocation')
+    })
+    return _response(202, {TOKEN_FIELD: token, "status": "InProgress"})
+
+
+def _read(s3, uri: str):
+    """Object body, or None while it does not exist yet"""
+    bucket, key = split_s3_uri(uri)
+    try:
+        return s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    except Exception as e:
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if code in ('NoSuchKey', '404', 'NotFound'):
+            return None
+        raise
+
+
+def fetch(s3, token: str, settings: dict, process_output) -> dict:
+    """Poll a job: 202 while in progress, the postprocessed result once done"""
+    try:
+        job = decode_token(token, settings)
+    except ValueError as e:
+        return _response(400, {"error": str(e)})
+
+    output = _read(s3, job['output'])
+    if output is not None:
+        return process_output(json.loads(output))
+    failure = _read(s3, job['failure']) if job.get('failure') else None
+    if failure is not None:
+        return _response(500, {"error": f"Async inference failed: {failure.decode(errors='replace')[:1000]}",
+                               "status": "Failed"})
+    return _response(202, {TOKEN_FIELD: token, "status": "InProgress"})
@@ -0,0 +1,119 @@
+"""Map-reduce summarization of documents longer than the model's context.
+
+``config["model"]["chunking"]``::
+
+    {"max_tokens": 1024, "max_workers": 4, "deadline_margin_ms": 1000}
+
+split_text() packs paragraphs, then sentences, then words into chunks of at
+most ``max_tokens`` (estimated at four characters per token). map_reduce()
+summarizes the chunks concurrently on at most ``max_workers`` threads, joins the
+summaries and repeats until they fit in one chunk, then summarizes that.
+Every wait is bounded by the Lambda deadline minus ``deadline_margin_ms``;
+past it, DeadlineExceeded is raised so the handler can still answer.
+"""
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# max_workers -> executor, kept across warm invocations
+_executors = {}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The chunks could not be summarized before the Lambda deadline"""
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _units(text: str, max_tokens: int):
+    """Paragraphs, or their sentences or words when a paragraph is over budget"""
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph, '\n\n'
+            continue
+        for sentence in SENTENCE_END.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence, ' '
+            else:
+                for word in sentence.split():
+                    yield word[:max_tokens * CHARS_PER_TOKEN], ' '
+
+
+def split_text(text: str, max_tokens: int) -> list:
+    """Chunks of at most max_tokens, split on paragraph, sentence or word boundaries"""
+    budget = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], ''
+    for unit, separator in _units(text, max_tokens):
+        if current and len(current) + len(separator) + len(unit) > budget:
+            chunks.append(current)
+            current = ''
+        current = f'{current}{separator}{unit}' if current else unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def deadline(context, margin_ms: float = 1000) -> float:
+    """time.monotonic() value to finish by, or None without a Lambda context"""
+    remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if remaining is None:
+        return None
+    return time.monotonic() + (remaining() - margin_ms) / 1000.0
+
+
+def _remaining(finish_by):
+    if finish_by is None:
+        return None
+    seconds = finish_by - time.monotonic()
+    if seconds <= 0:
+        raise DeadlineExceeded("No time left before the Lambda deadline")
+    return seconds
+
+
+def _executor(max_workers: int) -> ThreadPoolExecutor:
+    if max_workers not in _executors:
+        _executors[max_workers] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summarize')
+    return _executors[max_workers]
+
+
+def summarize_all(chunks: list, summarize, max_workers: int = 4, finish_by: float = None) -> list:
+    """summarize() of every chunk, in order, with bounded parallelism"""
+    futures = [_executor(max_workers).submit(summarize, chunk) for chunk in chunks]
+    _, pending = wait(futures, timeout=_remaining(finish_by))
+    if pending:
+        for future in pending:
+            future.cancel()
+        raise DeadlineExceeded(f"{len(pending)} of {len(chunks)} chunks were not summarized before the deadline")
+    return [future.result() for future in futures]
+
+
+def map_reduce(text: str, summarize, settings: dict, context=None) -> str:
+    """Summarize text of any length through summarize(), which takes one chunk"""
+    max_tokens = settings.get('max_tokens', 1024)
+    max_workers = settings.get('max_workers', 4)
+    finish_by = deadline(context, settings.get('deadline_margin_ms', 1000))
+
+    chunks, rounds = split_text(text, max_tokens), 0
+    while len(chunks) > 1:
+        summaries = summarize_all(chunks, summarize, max_workers, finish_by)
+        rounds += 1
+        combined = '\n\n'.join(summaries)
+        if len(combined) >= sum(len(chunk) for chunk in chunks):
+            raise ValueError("Chunk summaries are not shorter than the chunks; cannot reduce")
+        logger.info(f"Map round {rounds}: {len(chunks)} chunks -> {len(combined)} characters")
+        chunks = split_text(combined, max_tokens)
+
+    # The reduce call waits on the pool too, so it is bounded by the deadline as well
+    return summarize_all(chunks, summarize, max_workers, finish_by)[0] if chunks else ''
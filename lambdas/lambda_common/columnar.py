@@ -0,0 +1,113 @@
+"""Bulk numeric bodies: JSON arrays, NDJSON and CSV to float64 arrays and back.
+
+The format comes from the request's Content-Type:
+
+* ``text/csv``: numbers separated by commas and/or newlines; a first line
+  with no numeric cell is taken as a header and skipped. Any other cell that
+  is not a number is an error.
+* ``application/x-ndjson`` (or ``application/jsonlines``): one number, or one
+  ``{"number": x}`` object, per line.
+* ``application/json`` with a ``numbers`` array.
+
+Values are parsed into one contiguous float64 array, processed in batches that
+are views of it, and written back in the request's format, one batch at a time
+so a streaming handler can send each as soon as it is ready. NaN and infinite
+inputs are rejected, since JSON has no literal for them; results that overflow
+to infinity are written as ``null`` in JSON and NDJSON. Like precision, this
+module needs numpy.
+"""
+import base64
+import json
+
+import numpy as np
+
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonlines': 'ndjson',
+    'application/json': 'json',
+}
+FORMAT_CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+NUMBERS_FIELD = 'numbers'
+
+
+def content_type(event) -> str:
+    headers = (event.get('headers') if isinstance(event, dict) else None) or {}
+    for name, value in headers.items():
+        if name.lower() == 'content-type' and isinstance(value, str):
+            return value.split(';')[0].strip().lower()
+    return ''
+
+
+def event_text(event) -> str:
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    return body.decode() if isinstance(body, bytes) else body
+
+
+def detect_format(event, body=None):
+    """'csv', 'ndjson' or 'json' for a bulk request, None for a single number"""
+    fmt = CONTENT_TYPES.get(content_type(event))
+    if fmt in ('csv', 'ndjson'):
+        return fmt
+    if isinstance(body, dict) and isinstance(body.get(NUMBERS_FIELD), list):
+        return 'json'
+    return None
+
+
+def _is_number(cell: str) -> bool:
+    try:
+        float(cell)
+    except ValueError:
+        return False
+    return True
+
+
+def _to_array(tokens) -> np.ndarray:
+    values = np.ascontiguousarray(np.array(tokens, dtype=np.float64))
+    if not np.isfinite(values).all():
+        raise ValueError("NaN and infinite values are not supported")
+    return values
+
+
+def parse(text: str, fmt: str) -> np.ndarray:
+    """Contiguous float64 array of every number in the body"""
+    if fmt == 'json':
+        return _to_array(json.loads(text)[NUMBERS_FIELD])
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if fmt == 'ndjson':
+        return _to_array([json.loads(line)['number'] if line.startswith('{') else line for line in lines])
+    if lines and not any(_is_number(cell) for cell in lines[0].split(',')):
+        lines = lines[1:]
+    return _to_array([cell for cell in ','.join(lines).split(',') if cell.strip()])
+
+
+def batches(values: np.ndarray, batch_size: int):
+    """Consecutive slices (views) of at most batch_size values"""
+    for start in range(0, len(values), batch_size):
+        yield values[start:start + batch_size]
+
+
+def format_stream(results, fmt: str, field: str = 'values'):
+    """Text chunks of the output, one per result batch, in the request's format
+
+    JSON output is ``{field: [...]}``.
+    """
+    first = True
+    if fmt == 'json':
+        yield '{' + json.dumps(field) + ': ['
+    for batch in results:
+        if not len(batch):
+            continue
+        values = np.asarray(batch, dtype=np.float64)
+        numbers = map(repr, values.tolist())
+        if fmt != 'csv' and not np.isfinite(values).all():
+            numbers = (repr(value) if np.isfinite(value) else 'null' for value in values.tolist())
+        if fmt == 'json':
+            yield ('' if first else ', ') + ', '.join(numbers)
+        else:
+            yield '\n'.join(numbers) + '\n'
+        first = False
+    if fmt == 'json':
+        yield ']}'
@@ -0,0 +1,155 @@
+"""Optional compression of invoke_endpoint request and response bodies.
+
+Settings come from ``config["endpoint"]["compression"]``::
+
+    {"codec": "zstd", "threshold_bytes": 16384, "accept": ["zstd", "gzip"]}
+
+Bodies below ``threshold_bytes`` (LAMBDA_COMPRESSION_THRESHOLD overrides it)
+are sent as-is. Larger ones are compressed with the codec (zstd and lz4 when
+their packages are installed, gzip otherwise) and only sent compressed when
+that saves at least MIN_SAVING. After an attempt that does not pay off, the
+next SKIP_AFTER_MISS bodies for that endpoint are sent raw, so incompressible
+payloads cost almost nothing.
+
+invoke_endpoint has no Content-Encoding parameter, so the encoding travels in
+CustomAttributes (``content-encoding=gzip;accept-encoding=zstd,gzip``), which
+SageMaker hands to the container as X-Amzn-SageMaker-Custom-Attributes.
+read_body() decodes responses from the returned CustomAttributes or, failing
+that, from the codec's magic bytes.
+
+Identical concurrent calls are coalesced into one before any encoding (see
+single_flight).
+"""
+import gzip
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional
+    lz4_frame = None
+
+from . import single_flight
+
+THRESHOLD_ENV = 'LAMBDA_COMPRESSION_THRESHOLD'
+DEFAULT_THRESHOLD = 16 * 1024
+MIN_SAVING = 0.1
+SKIP_AFTER_MISS = 16
+MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+    b'\x04\x22\x4d\x18': 'lz4',
+}
+
+# endpoint name -> bodies left to send raw after a compression miss
+_skip = {}
+
+
+def available_codecs() -> list:
+    codecs = []
+    if zstandard is not None:
+        codecs.append('zstd')
+    if lz4_frame is not None:
+        codecs.append('lz4')
+    return codecs + ['gzip']
+
+
+def _resolve(codec: str) -> str:
+    return codec if codec in available_codecs() else 'gzip'
+
+
+def compress(data: bytes, codec: str = 'gzip') -> bytes:
+    codec = _resolve(codec)
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == 'lz4':
+        return lz4_frame.compress(data)
+    return gzip.compress(data, compresslevel=1, mtime=0)
+
+
+def sniff(data: bytes):
+    """Codec name from a body's magic bytes, or None for uncompressed data"""
+    for magic, codec in MAGIC.items():
+        if data[:len(magic)] == magic:
+            return codec
+    return None
+
+
+def decompress(data: bytes, codec: str = None) -> bytes:
+    codec = codec or sniff(data)
+    if codec is None or codec == 'identity':
+        return data
+    if codec == 'gzip':
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("Response is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if codec == 'lz4':
+        if lz4_frame is None:
+            raise ValueError("Response is lz4-compressed but lz4 is not installed")
+        return lz4_frame.decompress(data)
+    raise ValueError(f"Unsupported content encoding: {codec}")
+
+
+def parse_attributes(value) -> dict:
+    """'a=1;b=2' -> {'a': '1', 'b': '2'}; anything but a string gives {}"""
+    if not isinstance(value, str):
+        return {}
+    pairs = (item.split('=', 1) for item in value.split(';') if '=' in item)
+    return {key.strip().lower(): val.strip() for key, val in pairs}
+
+
+def format_attributes(attributes: dict) -> str:
+    return ';'.join(f'{key}={value}' for key, value in attributes.items())
+
+
+def encode_request(body, settings: dict = None, endpoint_name: str = '') -> tuple:
+    """Return (body, content encoding or None) for a request body"""
+    data = body.encode() if isinstance(body, str) else bytes(body)
+    if not settings:
+        return data, None
+    threshold = int(os.environ.get(THRESHOLD_ENV) or settings.get('threshold_bytes', DEFAULT_THRESHOLD))
+    if len(data) < threshold:
+        return data, None
+    if _skip.get(endpoint_name, 0) > 0:
+        _skip[endpoint_name] -= 1
+        return data, None
+
+    codec = _resolve(settings.get('codec', 'gzip'))
+    compressed = compress(data, codec)
+    if len(compressed) > len(data) * (1 - MIN_SAVING):
+        _skip[endpoint_name] = SKIP_AFTER_MISS
+        return data, None
+    return compressed, codec
+
+
+def invoke_endpoint(runtime, settings: dict = None, **kwargs) -> dict:
+    """runtime.invoke_endpoint with the request body compressed per settings"""
+    return single_flight.invoke_endpoint(lambda: _invoke_endpoint(runtime, settings, dict(kwargs)),
+                                         id(runtime), settings, **kwargs)
+
+
+def _invoke_endpoint(runtime, settings: dict, kwargs: dict) -> dict:
+    if settings:
+        body, encoding = encode_request(kwargs['Body'], settings, kwargs.get('EndpointName', ''))
+        attributes = parse_attributes(kwargs.get('CustomAttributes'))
+        if encoding:
+            attributes['content-encoding'] = encoding
+        accept = settings.get('accept') or available_codecs()
+        attributes['accept-encoding'] = ','.join(codec for codec in accept if codec in available_codecs())
+        kwargs['Body'] = body
+        kwargs['CustomAttributes'] = format_attributes(attributes)
+    return runtime.invoke_endpoint(**kwargs)
+
+
+def read_body(response) -> bytes:
+    """Read an invoke_endpoint response body, decompressing it if needed"""
+    data = response['Body'].read()
+    codec = parse_attributes(response.get('CustomAttributes')).get('content-encoding')
+    return decompress(data, codec)
@@ -0,0 +1,189 @@
+"""Near-duplicate cache of summaries, kept across warm invocations.
+
+``config["model"]["dedup_cache"]``::
+
+    {"threshold": 0.9, "max_entries": 1024, "persist_path": "/tmp/summary-cache.json", "shadow": false}
+
+Text is normalized first: lowercased, tracking query parameters (utm_*,
+fbclid, ...) and timestamps removed, and reduced to its words. Each document
+is then represented by a bottom-k MinHash sketch of its 5-word shingles.
+Cached sketches are indexed by their hash values, so a lookup only compares
+against documents that share part of the sketch. A document whose estimated
+Jaccard similarity to a cached one is at least ``threshold`` reuses that
+summary. Text with no words left after normalization is never cached or
+served, and text shorter than one shingle only matches the same normalized
+text.
+
+stats() reports hits, hit rate and a histogram of the best similarity found
+per lookup, so the threshold can be tuned from real traffic. With ``shadow``
+set, lookups are scored and counted but never served, for tuning before the
+cache is switched on. With ``persist_path`` set, entries are written to /tmp
+every PERSIST_EVERY additions and reloaded on the next cold start in the same
+execution environment.
+"""
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SKETCH_SIZE = 128
+SHINGLE_WORDS = 5
+PERSIST_EVERY = 16
+# Lookups only score the cached documents sharing the most sketch values
+MAX_CANDIDATES = 5
+TRACKING_PARAMS = re.compile(r'[?&](?:utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src)=[^&\s]*', re.IGNORECASE)
+TIMESTAMPS = re.compile(
+    r'\b\d{4}-\d{2}-\d{2}(?:[ t]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?\b'
+    r'|\b\d{1,2}:\d{2}(?::\d{2})?\s*(?:am|pm)?\b',
+    re.IGNORECASE
+)
+WORDS = re.compile(r'\w+')
+
+
+def normalize(text: str) -> list:
+    """Words of the text without case, tracking parameters or timestamps"""
+    text = TIMESTAMPS.sub(' ', TRACKING_PARAMS.sub(' ', text.lower()))
+    return WORDS.findall(text)
+
+
+def sketch(words: list) -> list:
+    """Bottom-k MinHash sketch of normalized words: the SKETCH_SIZE smallest shingle hashes, sorted"""
+    shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = {int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+              for shingle in shingles}
+    return heapq.nsmallest(SKETCH_SIZE, hashes)
+
+
+def similarity(a: list, b: list) -> float:
+    """Estimated Jaccard similarity of the documents behind two sketches"""
+    if not a or not b:
+        return 0.0
+    set_a, set_b = set(a), set(b)
+    union = heapq.nsmallest(SKETCH_SIZE, set_a | set_b)
+    return sum(1 for value in union if value in set_a and value in set_b) / len(union)
+
+
+class SummaryCache:
+    """LRU of (sketch, summary) with an inverted index over sketch values"""
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 1024, persist_path: str = None,
+                 shadow: bool = False):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.shadow = shadow
+        self._entries = OrderedDict()
+        self._index = {}
+        self._next_id = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._histogram = [0] * 10
+        if persist_path:
+            self.load()
+
+    @classmethod
+    def from_settings(cls, settings: dict = None):
+        """A cache for config["model"]["dedup_cache"], or None when it is not set"""
+        if not settings:
+            return None
+        return cls(**settings)
+
+    def lookup(self, text: str):
+        """Summary of a near-duplicate cached document, or None"""
+        words = normalize(text)
+        if not words:
+            return None
+        query = sketch(words)
+        with self._lock:
+            self._stats['lookups'] += 1
+            best_id, best = None, 0.0
+            shared = Counter(entry_id for value in query for entry_id in self._index.get(value, ()))
+            for entry_id, _ in shared.most_common(MAX_CANDIDATES):
+                score = similarity(query, self._entries[entry_id][0])
+                if score > best:
+                    best_id, best = entry_id, score
+            self._histogram[min(int(best * 10), 9)] += 1
+            # Under SHINGLE_WORDS words the sketch is the whole text, so only the same text matches
+            if len(words) < SHINGLE_WORDS and best_id is not None and self._entries[best_id][0] != query:
+                best_id = None
+            if best_id is None or best < self.threshold:
+                if best >= self.threshold - 0.1:
+                    self._stats['near_misses'] += 1
+                return None
+            self._stats['shadow_hits' if self.shadow else 'hits'] += 1
+            if self.shadow:
+                return None
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id][1]
+
+    def add(self, text: str, summary: str):
+        words = normalize(text)
+        if not words:
+            return
+        with self._lock:
+            self._insert(sketch(words), summary)
+            self._unsaved += 1
+            save = self.persist_path and self._unsaved >= PERSIST_EVERY
+        if save:
+            self.save()
+
+    def _insert(self, values: list, summary: str):
+        entry_id, self._next_id = self._next_id, self._next_id + 1
+        self._entries[entry_id] = (values, summary)
+        for value in values:
+            self._index.setdefault(value, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            old_id, (old_values, _) = self._entries.popitem(last=False)
+            for value in old_values:
+                ids = self._index.get(value)
+                if ids is not None:
+                    ids.discard(old_id)
+                    if not ids:
+                        del self._index[value]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats['lookups']
+            return {
+                'entries': len(self._entries),
+                'lookups': lookups,
+                'hits': self._stats['hits'],
+                'shadow_hits': self._stats['shadow_hits'],
+                'hit_rate': round((self._stats['hits'] + self._stats['shadow_hits']) / lookups, 4) if lookups else 0.0,
+                'near_misses': self._stats['near_misses'],
+                'threshold': self.threshold,
+                'shadow': self.shadow,
+                # Lookups by best similarity found, in buckets of 0.1
+                'similarity_histogram': list(self._histogram)
+            }
+
+    def save(self):
+        with self._lock:
+            data = {'version': 1, 'entries': [[values, summary] for values, summary in self._entries.values()]}
+            self._unsaved = 0
+        tmp_path = f'{self.persist_path}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.warning(f"Could not persist summary cache: {e}")
+
+    def load(self):
+        try:
+            with open(self.persist_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != 1:
+            return
+        with self._lock:
+            for values, summary in data.get('entries', []):
+                self._insert(values, summary)
@@ -0,0 +1,111 @@
+"""Compact array-backed frames with view semantics.
+
+ArrayFrame is the base of the lambdas' VisionFrame. It has ``__slots__``
+instead of a ``__dict__``, since a frame is created on every request and for
+every record of a batch, and it carries no state beyond its ``data`` array and
+its subclass's own slots. Shape, dtype and size come from ``data``:
+
+* ``frame[i]`` and ``frame[a:b]`` are frames of the same type over a view of
+  the data, with the other slots copied; nothing is reallocated.
+* ``np.asarray(frame)`` is ``frame.data``, and ``memoryview(frame)`` (Python
+  3.12+, or frame.memoryview() on older versions) exposes the data's buffer to
+  serializers without a copy when it is C-contiguous.
+* stack_frames() batches frames. When they are evenly spaced views into one array,
+  e.g. rows sliced from an earlier batch, the result is a read-only view of
+  it. Otherwise the batch is allocated once and each frame is copied into it.
+
+Frames still pickle (protocol 2 and later handle slots), and a frame whose data
+is in a shared_frames arena still pickles as a descriptor. Like precision, this
+module needs numpy.
+"""
+import numpy as np
+
+
+class ArrayFrame:
+    """Frame over an ndarray; slices are views and the buffer is the array's"""
+    __slots__ = ('data',)
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+    @property
+    def shape(self) -> tuple:
+        return self.data.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.data.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def _slots(self):
+        for cls in type(self).__mro__:
+            yield from getattr(cls, '__slots__', ())
+
+    def with_data(self, data: np.ndarray) -> 'ArrayFrame':
+        """A frame of the same type and settings over other data"""
+        frame = object.__new__(type(self))
+        for name in self._slots():
+            object.__setattr__(frame, name, getattr(self, name, None))
+        frame.data = data
+        return frame
+
+    def __getitem__(self, key) -> 'ArrayFrame':
+        return self.with_data(self.data[key])
+
+    def __array__(self, dtype=None, copy=None):
+        return self.data if dtype is None else self.data.astype(dtype, copy=False)
+
+    def memoryview(self) -> memoryview:
+        """The data's buffer; C-contiguous data is not copied"""
+        return memoryview(np.ascontiguousarray(self.data))
+
+    def __buffer__(self, flags: int) -> memoryview:
+        return self.memoryview()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(shape={self.shape}, dtype={self.dtype})"
+
+
+def _arrays(items) -> list:
+    return [np.asarray(item.data if isinstance(item, ArrayFrame) else item) for item in items]
+
+
+def _consecutive_view(arrays: list):
+    """A read-only (n, ...) view over arrays, if they are evenly spaced in one buffer"""
+    first = arrays[0]
+    if len(arrays) == 1:
+        return first[np.newaxis]
+    if first.base is None:
+        return None
+    address = first.__array_interface__['data'][0]
+    step = arrays[1].__array_interface__['data'][0] - address
+    if step <= 0:
+        return None
+    for i, array in enumerate(arrays):
+        if (array.base is not first.base or array.strides != first.strides
+                or array.__array_interface__['data'][0] != address + i * step):
+            return None
+    return np.lib.stride_tricks.as_strided(first, (len(arrays),) + first.shape, (step,) + first.strides,
+                                           writeable=False)
+
+
+def stack_frames(items) -> np.ndarray:
+    """(n, ...) batch of frames or arrays; a view when they are evenly spaced in one array"""
+    arrays = _arrays(items)
+    if not arrays:
+        raise ValueError("Nothing to stack")
+    if any(array.shape != arrays[0].shape for array in arrays):
+        raise ValueError(f"Cannot stack frames of shapes {sorted({array.shape for array in arrays})}")
+    view = _consecutive_view(arrays)
+    if view is not None:
+        return view
+    batch = np.empty((len(arrays),) + arrays[0].shape, dtype=np.result_type(*arrays))
+    for row, array in zip(batch, arrays):
+        row[...] = array
+    return batch
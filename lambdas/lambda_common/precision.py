@@ -0,0 +1,66 @@
+"""Reduced-precision transfer encoding for VisionFrame payloads.
+
+``config["model"]["transfer_precision"]`` selects how a frame is sent to its
+endpoint:
+
+* ``float32`` (default): ``{"data": nested lists}``, as before.
+* ``float16``: ``{"data_b64": ..., "dtype": "float16", "shape": [...]}`` with the
+  little-endian half-precision values base64-encoded.
+* ``uint8``: the same with ``dtype: "uint8"`` plus ``scale`` and ``zero_point``;
+  the model side dequantizes with ``(q - zero_point) * scale``. The range
+  always includes 0, so raw 0-255 pixels and /255-normalized frames both
+  round-trip exactly.
+
+decode() is the model-side inverse and is what the report tool uses. Unlike the
+rest of lambda_common this module needs numpy; only the vision lambdas, which
+already import it, use it.
+"""
+import base64
+
+import numpy as np
+
+PRECISIONS = ('float32', 'float16', 'uint8')
+DEFAULT_PRECISION = 'float32'
+
+
+def quantize(array: np.ndarray) -> tuple:
+    """Affine uint8 quantization: (values, scale, zero_point)"""
+    low = min(float(array.min()), 0.0) if array.size else 0.0
+    high = max(float(array.max()), 0.0) if array.size else 0.0
+    scale = (high - low) / 255.0 or 1.0
+    zero_point = int(np.clip(round(-low / scale), 0, 255))
+    values = np.clip(np.rint(array / scale) + zero_point, 0, 255).astype(np.uint8)
+    return values, scale, zero_point
+
+
+def encode(array: np.ndarray, precision: str = DEFAULT_PRECISION) -> dict:
+    """Request payload for a frame at the given transfer precision"""
+    if precision == 'float32':
+        return {"data": array.tolist()}
+    if precision == 'float16':
+        values = np.ascontiguousarray(array, dtype='<f2')
+        payload = {"dtype": "float16"}
+    elif precision == 'uint8':
+        values, scale, zero_point = quantize(np.asarray(array, dtype=np.float32))
+        payload = {"dtype": "uint8", "scale": scale, "zero_point": zero_point}
+    else:
+        raise ValueError(f"Unsupported transfer precision: {precision}. Expected one of {PRECISIONS}")
+    payload["shape"] = list(values.shape)
+    # values is C-contiguous, so its buffer is encoded without a tobytes() copy
+    payload["data_b64"] = base64.b64encode(values).decode('ascii')
+    return payload
+
+
+def decode(payload: dict) -> np.ndarray:
+    """float32 frame from a payload produced by encode()"""
+    if "data" in payload:
+        return np.asarray(payload["data"], dtype=np.float32)
+    raw = base64.b64decode(payload["data_b64"])
+    if payload["dtype"] == 'float16':
+        values = np.frombuffer(raw, dtype='<f2').astype(np.float32)
+    elif payload["dtype"] == 'uint8':
+        quantized = np.frombuffer(raw, dtype=np.uint8).astype(np.float32)
+        values = (quantized - payload["zero_point"]) * np.float32(payload["scale"])
+    else:
+        raise ValueError(f"Unsupported transfer dtype: {payload['dtype']}")
+    return values.reshape(payload["shape"])
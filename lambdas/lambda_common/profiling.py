@@ -0,0 +1,222 @@
+"""Opt-in profiling of a single lambda_handler invocation.
+
+Off by default. An invocation is profiled when either
+
+* LAMBDA_PROFILE is set to 1/true (every invocation, e.g. on a debug alias), or
+* the event carries a signed flag, either as ``event["_profile"]`` or as an
+  ``X-Lambda-Profile`` header, of the form ``{"expires": <epoch>, "signature":
+  <hex>}`` / ``"<expires>:<signature>"``. The signature is
+  HMAC-SHA256(LAMBDA_PROFILE_KEY, "<function name>:<expires>"); flags are
+  ignored unless LAMBDA_PROFILE_KEY is configured.
+
+LAMBDA_PROFILE_MODE selects ``sample`` (default: a background thread samples
+the handler's stack every LAMBDA_PROFILE_INTERVAL_MS) or ``cprofile``
+(deterministic). Reports go to /tmp (LAMBDA_PROFILE_OUTPUT=tmp, default) as
+``profile-<request id>.collapsed`` (flamegraph.pl / speedscope input) and
+``.top.txt``, or to the log stream as one compact ``LAMBDA_PROFILE {json}`` line
+(LAMBDA_PROFILE_OUTPUT=log).
+
+Sign a flag with ``python -m lambda_common.profiling <function name>``.
+"""
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = 'LAMBDA_PROFILE'
+KEY_ENV = 'LAMBDA_PROFILE_KEY'
+MODE_ENV = 'LAMBDA_PROFILE_MODE'
+OUTPUT_ENV = 'LAMBDA_PROFILE_OUTPUT'
+INTERVAL_ENV = 'LAMBDA_PROFILE_INTERVAL_MS'
+EVENT_FLAG = '_profile'
+HEADER = 'x-lambda-profile'
+TOP_N = 20
+# Stacks kept in a log line; the /tmp file always has all of them
+LOG_STACKS = 50
+
+
+def sign(key: str, function_name: str, expires: int) -> str:
+    """Signature for a profile flag"""
+    message = f'{function_name}:{int(expires)}'.encode()
+    return hmac.new(key.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _flag_from_event(event) -> tuple:
+    if not isinstance(event, dict):
+        return None, None
+    flag = event.get(EVENT_FLAG)
+    if isinstance(flag, dict):
+        return flag.get('expires'), flag.get('signature')
+    headers = event.get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == HEADER and isinstance(value, str) and ':' in value:
+            expires, signature = value.split(':', 1)
+            return expires, signature
+    return None, None
+
+
+def should_profile(event, context) -> bool:
+    """True when the environment or a valid, unexpired signed flag asks for a profile"""
+    if os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'yes'):
+        return True
+    key = os.environ.get(KEY_ENV)
+    if not key:
+        return False
+    expires, signature = _flag_from_event(event)
+    if expires is None or not signature:
+        return False
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    function_name = getattr(context, 'function_name', '')
+    return hmac.compare_digest(sign(key, function_name, expires), str(signature))
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread"""
+
+    def __init__(self, interval: float = 0.005, root_code=None):
+        self.interval = interval
+        self.root_code = root_code
+        self.samples = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # The sampler only runs when the GIL changes hands; shorten the switch
+        # interval so pure-Python stretches are still sampled
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='lambda-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            sys.setswitchinterval(self._switch_interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.samples[self._stack(frame)] += 1
+
+    def _stack(self, frame) -> tuple:
+        stack = []
+        while frame is not None and frame.f_code is not self.root_code:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def collapsed(self) -> list:
+        """Folded stacks, heaviest first: 'outer;inner count'"""
+        return [f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common() if stack]
+
+    def top(self, n: int = TOP_N) -> list:
+        """Functions by cumulative share of samples"""
+        total = sum(self.samples.values()) or 1
+        cumulative = Counter()
+        for stack, count in self.samples.items():
+            for function in set(stack):
+                cumulative[function] += count
+        return [{'function': function, 'samples': count, 'share': round(count / total, 3)}
+                for function, count in cumulative.most_common(n)]
+
+
+def _cprofile_top(profiler, n: int = TOP_N) -> list:
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:n]
+    return [{'function': f'{name} ({os.path.basename(filename)}:{line})', 'calls': calls,
+             'cumulative_ms': round(cumulative * 1000, 3), 'own_ms': round(own * 1000, 3)}
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows]
+
+
+def _write_report(report: dict, collapsed: list, profiler=None):
+    output = os.environ.get(OUTPUT_ENV, 'tmp')
+    if output == 'log':
+        compact = dict(report, collapsed=collapsed[:LOG_STACKS])
+        logger.warning('LAMBDA_PROFILE %s', json.dumps(compact, separators=(',', ':')))
+        return
+
+    base = os.path.join('/tmp', f"profile-{report['request_id']}")
+    if collapsed:
+        with open(f'{base}.collapsed', 'w') as f:
+            f.write('\n'.join(collapsed) + '\n')
+    if profiler is not None:
+        profiler.dump_stats(f'{base}.prof')
+    with open(f'{base}.top.txt', 'w') as f:
+        f.write(json.dumps(report, indent=1))
+    logger.warning('LAMBDA_PROFILE written to %s.*', base)
+
+
+def _profiled_call(handler, event, context):
+    mode = os.environ.get(MODE_ENV, 'sample')
+    profiler = sampler = None
+    start = time.perf_counter()
+    if mode == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        interval = float(os.environ.get(INTERVAL_ENV, 5)) / 1000.0
+        sampler = StackSampler(interval, root_code=_profiled_call.__code__)
+        sampler.start()
+    try:
+        return handler(event, context)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        report = {
+            'request_id': getattr(context, 'aws_request_id', None) or f'local-{int(time.time() * 1000)}',
+            'function': getattr(context, 'function_name', None),
+            'mode': mode,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            'top': _cprofile_top(profiler) if profiler is not None else sampler.top(),
+        }
+        try:
+            _write_report(report, sampler.collapsed() if sampler is not None else [], profiler)
+        except Exception as e:
+            logger.error(f"Profile report failed: {e}")
+
+
+def profile_handler(handler):
+    """Decorate a lambda_handler so single invocations can be profiled on demand"""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not should_profile(event, context):
+            return handler(event, context)
+        return _profiled_call(handler, event, context)
+    return wrapper
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print a signed profile flag for one function")
+    parser.add_argument('function_name')
+    parser.add_argument('--ttl', type=int, default=300, help="Seconds the flag stays valid")
+    parser.add_argument('--key', default=os.environ.get(KEY_ENV), help=f"Signing key (default ${KEY_ENV})")
+    args = parser.parse_args()
+    if not args.key:
+        parser.error(f'--key or {KEY_ENV} is required')
+    expires = int(time.time()) + args.ttl
+    print(json.dumps({EVENT_FLAG: {'expires': expires, 'signature': sign(args.key, args.function_name, expires)}}))
@@ -0,0 +1,149 @@
+"""SQS and Kinesis event sources: batched, concurrent processing of Records.
+
+``config["records"]``::
+
+    {"batch_size": 8, "max_workers": 4, "deadline_margin_ms": 1000,
+     "output_path": "s3://bucket/records/<endpoint>"}
+
+Each record's body (the SQS message body, or the base64 Kinesis data) is the
+same JSON a synchronous request would send. process() decodes every record with
+the lambda's decode(), which returns ``(key, item)``; records with the same key
+(e.g. the same frame shape) are grouped up to ``batch_size`` and each group is
+one predict_batch(items, context) call, which returns one result per item and
+can use the Lambda context for deadlines of its own. A key of None
+keeps the record in a group of its own. Groups run concurrently on at most
+``max_workers`` threads, bounded by the Lambda deadline minus
+``deadline_margin_ms``. Records with identical bodies (a producer retrying, the
+same frame published twice) are decoded and predicted once; the duplicates
+share the first one's result, or its failure.
+
+Results are written to ``<output_path>/<record id>.json`` when an S3 client and
+``output_path`` are given. Records that fail to decode, belong to a failed
+group, or are not done before the deadline are returned as
+``batchItemFailures``, so with ReportBatchItemFailures enabled on the event
+source mapping only those are retried (for Kinesis, from the lowest failed
+sequence number).
+"""
+import base64
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from . import async_inference, chunking
+
+logger = logging.getLogger(__name__)
+
+EVENT_SOURCES = ('aws:sqs', 'aws:kinesis')
+
+# max_workers -> executor, kept across warm invocations
+_executors = {}
+
+
+def is_records_event(event) -> bool:
+    """True for an SQS or Kinesis event"""
+    records = event.get('Records') if isinstance(event, dict) else None
+    return bool(records) and isinstance(records, list) and all(
+        isinstance(record, dict) and record.get('eventSource') in EVENT_SOURCES for record in records)
+
+
+def record_id(record: dict) -> str:
+    """The itemIdentifier of a record: the SQS message id or Kinesis sequence number"""
+    if record.get('eventSource') == 'aws:kinesis':
+        return record['kinesis']['sequenceNumber']
+    return record['messageId']
+
+
+def record_data(record: dict) -> bytes:
+    """The record's raw body"""
+    if record.get('eventSource') == 'aws:kinesis':
+        return base64.b64decode(record['kinesis']['data'])
+    return record['body'].encode()
+
+
+def record_body(record: dict):
+    """The record's JSON body"""
+    return json.loads(record_data(record))
+
+
+def _executor(max_workers: int) -> ThreadPoolExecutor:
+    if max_workers not in _executors:
+        _executors[max_workers] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='records')
+    return _executors[max_workers]
+
+
+def group(decoded: list, batch_size: int) -> list:
+    """Lists of (record id, item) with the same key, at most batch_size long"""
+    groups, open_groups = [], {}
+    for rid, key, item in decoded:
+        if key is None:
+            groups.append([(rid, item)])
+            continue
+        current = open_groups.get(key)
+        if current is None or len(current) >= batch_size:
+            current = open_groups[key] = []
+            groups.append(current)
+        current.append((rid, item))
+    return groups
+
+
+def _run(members: list, predict_batch, context, s3, output_path: str, duplicates: dict):
+    results = predict_batch([item for _, item in members], context)
+    if len(results) != len(members):
+        raise ValueError(f"Expected {len(members)} results, got {len(results)}")
+    if s3 is not None and output_path:
+        bucket, prefix = async_inference.split_s3_uri(output_path.rstrip('/'))
+        for (rid, _), result in zip(members, results):
+            data = json.dumps(result).encode()
+            for target in [rid] + duplicates.get(rid, []):
+                s3.put_object(Bucket=bucket, Key=f'{prefix}/{target}.json', Body=data,
+                              ContentType='application/json')
+
+
+def process(event: dict, decode, predict_batch, settings: dict = None, context=None, s3=None) -> dict:
+    """Process every record of an SQS or Kinesis event; the partial batch response"""
+    settings = settings or {}
+    failures, decoded = [], []
+    # body -> id of the first record with it; that id -> ids of the later ones
+    first, duplicates = {}, {}
+    for record in event['Records']:
+        rid = record_id(record)
+        try:
+            data = record_data(record)
+        except Exception as e:
+            logger.error(f"Record {rid} could not be read: {e}")
+            failures.append(rid)
+            continue
+        if data in first:
+            duplicates.setdefault(first[data], []).append(rid)
+            continue
+        first[data] = rid
+        try:
+            key, item = decode(json.loads(data))
+        except Exception as e:
+            logger.error(f"Record {rid} could not be decoded: {e}")
+            failures.append(rid)
+            continue
+        decoded.append((rid, key, item))
+
+    groups = group(decoded, settings.get('batch_size', 8))
+    finish_by = chunking.deadline(context, settings.get('deadline_margin_ms', 1000))
+    executor = _executor(settings.get('max_workers', 4))
+    futures = {executor.submit(_run, members, predict_batch, context, s3, settings.get('output_path'), duplicates): members
+               for members in groups}
+    timeout = None if finish_by is None else max(0.0, finish_by - time.monotonic())
+    done, pending = wait(futures, timeout=timeout)
+    for future in pending:
+        future.cancel()
+        failures.extend(rid for rid, _ in futures[future])
+    for future in done:
+        if future.exception() is not None:
+            logger.error(f"Group of {len(futures[future])} records failed: {future.exception()}")
+            failures.extend(rid for rid, _ in futures[future])
+    failures.extend(rid for failed in list(failures) for rid in duplicates.get(failed, []))
+    if pending:
+        logger.warning(f"{len(pending)} of {len(groups)} groups were not done before the deadline")
+    coalesced = sum(map(len, duplicates.values()))
+    logger.info(f"Processed {len(event['Records'])} records ({coalesced} duplicates) in {len(groups)} groups, "
+                f"{len(failures)} failed")
+    return {"batchItemFailures": [{"itemIdentifier": rid} for rid in failures]}
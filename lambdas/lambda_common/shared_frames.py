@@ -0,0 +1,236 @@
+"""Shared-memory frame handoff between processes.
+
+A FrameArena is one block of shared memory (``multiprocessing.shared_memory``,
+or a memory-mapped file when a path is given) used as a ring buffer. The
+process that owns it, typically a preprocessing worker, copies each frame in
+once with put(). What it gets back pickles as a FrameRef, the descriptor
+``(name, offset, shape, dtype, generation)``, so sending a frame to another
+process never copies the pixels. share() moves a VisionFrame's data into an
+arena the same way. The receiver, typically the process calling the endpoint,
+gets a zero-copy array with view() (unpickling does that) and calls release()
+when it is done with the data.
+
+Every allocation starts with a 64-byte header holding its state and
+generation. Only the owner allocates, and releasing only clears the header's
+state word, so no lock is shared between processes. The owner reclaims space
+in allocation order, once the oldest blocks are released. When the arena is
+full, put() waits for releases for up to ``timeout`` seconds and then raises
+TimeoutError. A release whose generation no longer matches (a double release)
+is ignored.
+
+Arenas are attached by name once per process and stay attached until
+close_all(). The owner must keep the arena until every frame in it is
+released, then call close() and unlink(); unlink() also runs when the owner
+exits normally. Like precision, this module needs
+numpy.
+"""
+import atexit
+import collections
+import mmap
+import os
+import time
+import uuid
+from multiprocessing import shared_memory, util
+
+import numpy as np
+
+ALIGN = 64
+HEADER = 64
+FREE, ALLOCATED = 0, 1
+
+FrameRef = collections.namedtuple('FrameRef', 'name offset shape dtype generation')
+
+# name -> (bytes, closer) of the arenas this process has attached
+_attached = {}
+
+
+class SharedArray(np.ndarray):
+    """An array in an arena; pickles as its FrameRef instead of its data"""
+
+    def __array_finalize__(self, obj):
+        # Slices and results of arithmetic are not the allocation itself
+        self.ref = None
+
+    def __reduce__(self):
+        if self.ref is None:
+            return np.asarray(self).__reduce__()
+        return view, (self.ref,)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGN) * ALIGN
+
+
+def _header(buffer, offset: int) -> np.ndarray:
+    return np.ndarray((2,), dtype=np.uint64, buffer=buffer, offset=offset)
+
+
+def _bytes(buffer) -> np.ndarray:
+    # np.ndarray(buffer=...) does not keep the buffer exported, so the memory could be
+    # unmapped under a live view; views of a frombuffer() array keep it mapped
+    return np.frombuffer(buffer, dtype=np.uint8)
+
+
+def _open(name: str) -> tuple:
+    """(bytes, closer) for an arena's memory; names with a path separator are files"""
+    if os.sep in name:
+        with open(name, 'r+b') as f:
+            mapped = mmap.mmap(f.fileno(), 0)
+        return _bytes(mapped), mapped.close
+    memory = shared_memory.SharedMemory(name=name)
+    return _bytes(memory.buf), memory.close
+
+
+def attach(name: str):
+    """The memory of an arena, attached once per process"""
+    if name not in _attached:
+        _attached[name] = _open(name)
+    return _attached[name][0]
+
+
+def view(ref: FrameRef) -> SharedArray:
+    """Zero-copy array for a FrameRef"""
+    array = np.ndarray(ref.shape, dtype=np.dtype(ref.dtype), buffer=attach(ref.name),
+                       offset=ref.offset + HEADER).view(SharedArray)
+    array.ref = ref
+    return array
+
+
+def release(ref) -> bool:
+    """Free a FrameRef (or the SharedArray of one); False if it was already released"""
+    ref = getattr(ref, 'ref', ref)
+    header = _header(attach(ref.name), ref.offset)
+    if header[0] != ALLOCATED or int(header[1]) != ref.generation:
+        return False
+    header[0] = FREE
+    return True
+
+
+def share(frame, arena: 'FrameArena', timeout: float = 10.0):
+    """Move frame.data into arena; the frame then pickles without its pixels"""
+    frame.data = arena.put(frame.data, timeout)
+    return frame
+
+
+def close_all():
+    """Detach every arena this process attached to"""
+    while _attached:
+        closer = _attached.popitem()[1][1]
+        try:
+            closer()
+        except BufferError:
+            # Views into it are still alive; the memory goes away with them
+            pass
+
+
+atexit.register(close_all)
+
+
+class FrameArena:
+    """Ring-buffer allocator over shared memory, owned by the process that creates it"""
+
+    def __init__(self, size: int, path: str = None):
+        self.size = _aligned(size)
+        self.path = path
+        if path:
+            with open(path, 'w+b') as f:
+                f.truncate(self.size)
+                self._mmap = mmap.mmap(f.fileno(), self.size)
+            self.name, self._memory = os.path.abspath(path), None
+            self.buffer = _bytes(self._mmap)
+        else:
+            self._memory = shared_memory.SharedMemory(name=f'frames_{uuid.uuid4().hex[:16]}', create=True,
+                                                      size=self.size)
+            self.name, self.buffer = self._memory.name, _bytes(self._memory.buf)
+        # The owner reads its own arena through the same cache as everyone else
+        _attached[self.name] = (self.buffer, lambda: None)
+        # (offset, end, generation) of live blocks, oldest first
+        self._live = collections.deque()
+        self._generation = 0
+        # An owner that exits normally cleans up; multiprocessing's exit hook, unlike
+        # atexit, also runs in pool workers that are closed (not terminated)
+        self._unlinked = False
+        util.Finalize(self, self.__exit__, exitpriority=0)
+
+    def _reclaim(self):
+        while self._live:
+            offset, _, generation = self._live[0]
+            header = _header(self.buffer, offset)
+            if header[0] == ALLOCATED and int(header[1]) == generation:
+                break
+            self._live.popleft()
+
+    def _find(self, need: int):
+        if not self._live:
+            return 0 if need <= self.size else None
+        tail, head = self._live[0][0], self._live[-1][1]
+        if self._live[-1][0] >= tail:
+            # Not wrapped: [head, size) and [0, tail) are free
+            if head + need <= self.size:
+                return head
+            return 0 if need <= tail else None
+        return head if head + need <= tail else None
+
+    def allocate(self, nbytes: int, timeout: float = 10.0) -> tuple:
+        """(offset, generation) of a new block with room for nbytes"""
+        need = HEADER + _aligned(max(nbytes, 1))
+        if need > self.size:
+            raise ValueError(f"{nbytes} bytes do not fit in an arena of {self.size}")
+        give_up = time.monotonic() + timeout
+        while True:
+            self._reclaim()
+            offset = self._find(need)
+            if offset is not None:
+                break
+            if time.monotonic() >= give_up:
+                raise TimeoutError(f"Arena {self.name} full: {len(self._live)} frames not released")
+            time.sleep(0.001)
+        self._generation += 1
+        header = _header(self.buffer, offset)
+        header[1] = self._generation
+        header[0] = ALLOCATED
+        self._live.append((offset, offset + need, self._generation))
+        return offset, self._generation
+
+    def put(self, array: np.ndarray, timeout: float = 10.0) -> SharedArray:
+        """Copy array into the arena; the result pickles as a FrameRef"""
+        array = np.asarray(array)
+        offset, generation = self.allocate(array.nbytes, timeout)
+        ref = FrameRef(self.name, offset, tuple(array.shape), array.dtype.str, generation)
+        shared = view(ref)
+        shared[...] = array
+        return shared
+
+    def stats(self) -> dict:
+        self._reclaim()
+        used = sum(end - offset for offset, end, _ in self._live)
+        return {'name': self.name, 'size': self.size, 'live': len(self._live), 'used': used}
+
+    def close(self):
+        _attached.pop(self.name, None)
+        self.buffer = None
+        try:
+            if self._memory is not None:
+                self._memory.close()
+            else:
+                self._mmap.close()
+        except BufferError:
+            # Arrays from put() are still alive here; the memory goes away with them
+            pass
+
+    def unlink(self):
+        """Remove the arena's memory; processes still attached keep theirs until they detach"""
+        if self._unlinked:
+            return
+        self._unlinked = True
+        if self._memory is not None:
+            self._memory.unlink()
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
@@ -0,0 +1,125 @@
+"""Coalescing of identical in-flight calls ("single flight").
+
+When several callers make the same call at the same moment (the same frame
+fanned out to several consumers, a retried request racing the original), only
+the first one, the leader, runs it; the others wait for and share its result
+or exception. As soon as the call finishes its key is released, so nothing is
+cached: a call that starts later runs again.
+
+SingleFlight.call() is for threads and acall() for coroutines; both can share
+one flight, since the outcome is published through a concurrent.futures.Future
+that threads wait on and coroutines await with asyncio.wrap_future(). Shared
+results must be treated as read-only.
+
+compression.invoke_endpoint() goes through invoke_endpoint() here, so every
+lambda coalesces identical concurrent endpoint requests (same runtime,
+compression settings, endpoint, content type, attributes and uncompressed
+body). Each caller gets
+its own copy of the response with the body buffered in memory. Set
+LAMBDA_SINGLE_FLIGHT=0 to turn this off, e.g. for endpoints that sample and
+should answer identical requests differently.
+"""
+import concurrent.futures
+import hashlib
+import io
+import os
+import threading
+
+ENABLED_ENV = 'LAMBDA_SINGLE_FLIGHT'
+
+
+class SingleFlight:
+    """One call per key at a time; concurrent callers with the same key share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _join(self, key) -> tuple:
+        """(future, True) for the caller that must run the call, (future, False) for the others"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = self._calls[key] = concurrent.futures.Future()
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error: BaseException = None):
+        # Released before publishing, so callers arriving from now on start a new call
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def call(self, key, fn):
+        """fn(), or the outcome of an identical call already in flight"""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def acall(self, key, fn):
+        """await fn(), or the outcome of an identical call already in flight"""
+        # Imported here: asyncio adds tens of ms to every lambda's cold start
+        import asyncio
+
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'calls': self.leaders, 'coalesced': self.followers, 'in_flight': len(self._calls)}
+
+
+def enabled() -> bool:
+    return os.environ.get(ENABLED_ENV, '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def request_key(*parts, **kwargs) -> bytes:
+    """Digest of the positional parts and keyword arguments of a call"""
+    digest = hashlib.blake2b(digest_size=16)
+    for value in list(parts) + [item for name in sorted(kwargs) for item in (name, kwargs[name])]:
+        data = value if isinstance(value, (bytes, bytearray)) else str(value).encode()
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.digest()
+
+
+# Kept for the execution environment, like the boto3 clients
+endpoint_calls = SingleFlight()
+
+
+def _buffered(response: dict) -> dict:
+    return dict(response, Body=response['Body'].read())
+
+
+def invoke_endpoint(call, *parts, **kwargs) -> dict:
+    """call(), an invoke_endpoint with kwargs, coalesced with identical requests in flight
+
+    parts are whatever else makes requests differ, such as the runtime client.
+    """
+    if not enabled():
+        return call()
+    shared = endpoint_calls.call(request_key(*parts, **kwargs), lambda: _buffered(call()))
+    # Each caller reads its own body
+    return dict(shared, Body=io.BytesIO(shared['Body']))
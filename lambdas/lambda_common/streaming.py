@@ -0,0 +1,37 @@
+"""Reading SageMaker response streams (invoke_endpoint_with_response_stream).
+
+The endpoint streams its output as UTF-8 text in ``PayloadPart`` events. A part
+can end in the middle of a multi-byte character, so parts are decoded
+incrementally. ``ModelStreamError`` / ``InternalStreamFailure`` events end the
+stream with a StreamError.
+"""
+import codecs
+
+ERROR_EVENTS = ('ModelStreamError', 'InternalStreamFailure')
+
+
+class StreamError(RuntimeError):
+    """The endpoint reported an error in the middle of a response stream"""
+
+
+def iter_parts(response):
+    """Raw payload bytes of each PayloadPart event, in order"""
+    for event in response['Body']:
+        for name in ERROR_EVENTS:
+            if name in event:
+                raise StreamError(f"{name}: {event[name].get('Message', '')}")
+        part = event.get('PayloadPart')
+        if part and part.get('Bytes'):
+            yield part['Bytes']
+
+
+def iter_text(response):
+    """Text of the stream as it arrives, never splitting a character"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for data in iter_parts(response):
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
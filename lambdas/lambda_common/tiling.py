@@ -0,0 +1,102 @@
+"""Tiled inference for frames larger than the model input.
+
+``config["model"]["tiling"]``::
+
+    {"tile_size": 224, "overlap": 32, "batch_size": 8, "min_size": 448, "aggregate": "max"}
+
+Image frames with a side longer than ``min_size`` are cut into ``tile_size``
+squares that overlap by ``overlap`` pixels; the last row and column are aligned
+to the frame edge. A frame is an image when it is (H, W, C) with at most
+MAX_CHANNELS channels, or (H, W) with both sides at least ``tile_size``; other
+arrays, such as long feature rows, are never tiled. Tiles are sliding-window
+views into the frame, so only one batch of ``batch_size`` tiles is ever
+copied, when it is serialized. Each batch is one endpoint call.
+
+Per-tile prediction vectors (n, classes) are combined with ``aggregate`` (max
+or mean over tiles). Dense per-pixel maps (n, tile, tile, classes) are stitched
+back to the frame size, averaging where tiles overlap. Like precision, this
+module needs numpy.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+AGGREGATES = {'max': np.max, 'mean': np.mean}
+MAX_CHANNELS = 4
+
+
+def is_image(frame: np.ndarray, tile_size: int) -> bool:
+    """(H, W, C) with a channel axis, or (H, W) with both sides at least tile_size"""
+    if frame.ndim == 3:
+        return frame.shape[2] <= MAX_CHANNELS
+    return frame.ndim == 2 and min(frame.shape) >= tile_size
+
+
+def should_tile(frame: np.ndarray, settings: dict = None) -> bool:
+    if not settings or not is_image(frame, settings['tile_size']):
+        return False
+    return max(frame.shape[:2]) > settings.get('min_size', 2 * settings['tile_size'])
+
+
+def _origins(length: int, tile: int, stride: int) -> np.ndarray:
+    origins = np.arange(0, max(length - tile, 0) + 1, stride)
+    if origins[-1] + tile < length:
+        origins = np.append(origins, length - tile)
+    return origins
+
+
+def tile_frame(frame: np.ndarray, tile_size: int, overlap: int = 0) -> tuple:
+    """(windows, ys, xs): a (rows, cols, C, tile, tile) view and the tile origins
+
+    Tile i is windows[ys[i], xs[i]]; nothing is copied unless the frame is
+    smaller than a tile and has to be padded.
+    """
+    if overlap >= tile_size:
+        raise ValueError(f"overlap ({overlap}) must be smaller than tile_size ({tile_size})")
+    if frame.ndim == 2:
+        frame = frame[:, :, np.newaxis]
+    height, width = frame.shape[:2]
+    if height < tile_size or width < tile_size:
+        frame = np.pad(frame, ((0, max(tile_size - height, 0)), (0, max(tile_size - width, 0)), (0, 0)))
+    windows = sliding_window_view(frame, (tile_size, tile_size), axis=(0, 1))
+    stride = tile_size - overlap
+    rows = _origins(frame.shape[0], tile_size, stride)
+    cols = _origins(frame.shape[1], tile_size, stride)
+    ys, xs = (grid.ravel() for grid in np.meshgrid(rows, cols, indexing='ij'))
+    return windows, ys, xs
+
+
+def batches(windows: np.ndarray, ys: np.ndarray, xs: np.ndarray, batch_size: int):
+    """(start, tiles) with tiles as a (n, tile, tile, C) array, one batch at a time"""
+    for start in range(0, len(ys), batch_size):
+        selected = windows[ys[start:start + batch_size], xs[start:start + batch_size]]
+        yield start, np.moveaxis(selected, 1, -1)
+
+
+def stitch(predictions: np.ndarray, ys: np.ndarray, xs: np.ndarray, shape: tuple) -> np.ndarray:
+    """Dense (n, tile, tile, k) tile maps to one (height, width, k) map, averaging overlaps"""
+    tile = predictions.shape[1]
+    height, width = max(shape[0], tile), max(shape[1], tile)
+    offsets = np.arange(tile)
+    rows = (ys[:, None] + offsets)[:, :, None]
+    cols = (xs[:, None] + offsets)[:, None, :]
+    total = np.zeros((height, width, predictions.shape[-1]), dtype=np.float64)
+    counts = np.zeros((height, width, 1), dtype=np.float64)
+    np.add.at(total, (rows, cols), predictions)
+    np.add.at(counts, (rows, cols), 1.0)
+    return (total / np.maximum(counts, 1.0))[:shape[0], :shape[1]]
+
+
+def predict_tiled(frame: np.ndarray, predict_batch, settings: dict) -> np.ndarray:
+    """Run predict_batch over the frame's tiles and combine the predictions
+
+    predict_batch takes a (n, tile, tile, C) array and returns n predictions.
+    """
+    windows, ys, xs = tile_frame(frame, settings['tile_size'], settings.get('overlap', 0))
+    results = [np.asarray(predict_batch(tiles)) for _, tiles in batches(windows, ys, xs, settings.get('batch_size', 8))]
+    predictions = np.concatenate(results, axis=0)
+    if len(predictions) != len(ys):
+        raise ValueError(f"Expected {len(ys)} tile predictions, got {len(predictions)}")
+    if predictions.ndim == 4:
+        return stitch(predictions, ys, xs, frame.shape[:2])
+    aggregate = AGGREGATES[settings.get('aggregate', 'max')]
+    return aggregate(predictions.reshape(len(ys), -1), axis=0)
@@ -6,9 +6,13 @@ from sagemaker.model import Model
 from sagemaker.predictor import Predictor
 from sagemaker.serializers import JSONSerializer
 from sagemaker.deserializers import JSONDeserializer
+import numpy as np
 from typing import Dict, Any, List, Union
 import logging
 
+from lambda_common import columnar, compression, records
+from lambda_common.profiling import profile_handler
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -16,6 +20,7 @@ logger.setLevel(logging.INFO)
 # Initialize AWS clients
 sagemaker_runtime = boto3.client('sagemaker-runtime')
 sagemaker_client = boto3.client('sagemaker')
+s3_client = boto3.client('s3')
 
 # Configuration dictionary
 config = {
@@ -29,18 +34,47 @@ config = {
         "config_name": "number-doubler-config",
         "variant_name": "number-doubler-variant",
         "instance_count": 1,
-        "instance_type": "ml.m5.xlarge"
+        "instance_type": "ml.m5.xlarge",
+        "compression": {
+            "codec": "gzip",
+            "threshold_bytes": 16384
+        }
+    },
+    # Arrays, NDJSON and CSV bodies: one endpoint call per batch_size numbers,
+    # or doubled in the lambda with "mode": "local"
+    "bulk": {
+        "batch_size": 65536,
+        "mode": "endpoint"
+    },
+    # SQS / Kinesis events: records grouped into batched endpoint calls
+    "records": {
+        "batch_size": 8,
+        "max_workers": 4,
+        "deadline_margin_ms": 1000,
+        "output_path": "s3://test-bucket/records/number-doubler-endpoint"
     }
 }
 
 class NumberFrame:
     """Helper class for number data processing"""
+    __slots__ = ('number',)
+
     def __init__(self, number: float):
         self.number = number
     
     def to_dict(self) -> Dict[str, Any]:
         return {"number": self.number}
 
+class NumberColumn:
+    """Contiguous float64 array of numbers for bulk processing"""
+    __slots__ = ('values',)
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def batches(self, batch_size: int):
+        return columnar.batches(self.values, batch_size)
+
 class Preprocessing:
     """Handles input preprocessing"""
     @staticmethod
@@ -53,6 +87,14 @@ class Preprocessing:
             logger.error(f"Preprocessing error: {str(e)}")
             raise
 
+    @staticmethod
+    def process_bulk(event: Dict[str, Any], fmt: str) -> 'NumberColumn':
+        try:
+            return NumberColumn(columnar.parse(columnar.event_text(event), fmt))
+        except Exception as e:
+            logger.error(f"Preprocessing error: {str(e)}")
+            raise
+
 class Postprocessing:
     """Handles output postprocessing"""
     @staticmethod
@@ -86,6 +128,37 @@ def convert_parsed_response_to_ndarray(response: Dict[str, Any]) -> List[float]:
         logger.error(f"Conversion error: {str(e)}")
         raise
 
+def double_batch(values: np.ndarray) -> np.ndarray:
+    """Doubled values of one batch, from one endpoint call (or locally)"""
+    if config["bulk"].get("mode") == "local":
+        return values * 2.0
+    response = compression.invoke_endpoint(
+        sagemaker_runtime,
+        config["endpoint"].get("compression"),
+        EndpointName=config["endpoint"]["name"],
+        ContentType='application/json',
+        Body=json.dumps({"numbers": values.tolist()})
+    )
+    doubled = np.asarray(json.loads(compression.read_body(response))["doubled"], dtype=np.float64)
+    if doubled.shape != values.shape:
+        raise ValueError(f"Expected {len(values)} doubled values, got {doubled.size}")
+    return doubled
+
+def bulk_chunks(event: Dict[str, Any], fmt: str):
+    """Output text chunks for a bulk request, one per batch"""
+    column = Preprocessing.process_bulk(event, fmt)
+    results = (double_batch(batch) for batch in column.batches(config["bulk"]["batch_size"]))
+    return columnar.format_stream(results, fmt, field="doubled")
+
+def decode_record(body: Dict[str, Any]) -> tuple:
+    """(group key, frame) for an SQS / Kinesis record; all numbers share calls"""
+    return "number", Preprocessing.process_input(body)
+
+def predict_records(frames: List[NumberFrame], context: Any = None) -> List[Dict[str, Any]]:
+    """Doubled numbers for a group of records, from one endpoint call"""
+    doubled = double_batch(np.array([frame.number for frame in frames], dtype=np.float64))
+    return [{"doubled": value} for value in doubled.tolist()]
+
 # WARP templates for different model types
 WARP_TEMPLATES = {
     "number": {
@@ -98,6 +171,7 @@ WARP_TEMPLATES = {
     }
 }
 
+@profile_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda function handler for number doubling model inference
@@ -106,12 +180,25 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Log the incoming event
         logger.info(f"Received event: {json.dumps(event)}")
         
+        # SQS / Kinesis batches: grouped, concurrent endpoint calls and a partial batch response
+        if records.is_records_event(event):
+            return records.process(event, decode_record, predict_records, config.get("records"), context, s3_client)
+        
         # Parse the input data with better error handling
         try:
             body = json.loads(event.get('body', '{}'))
         except json.JSONDecodeError:
             body = {}
             
+        # Bulk mode: many numbers in, the same format out
+        bulk_format = columnar.detect_format(event, body)
+        if bulk_format:
+            return {
+                "statusCode": 200,
+                "headers": {"Content-Type": columnar.FORMAT_CONTENT_TYPES[bulk_format]},
+                "body": "".join(bulk_chunks(event, bulk_format))
+            }
+
         # Use default test data if input is empty or missing 'number'
         if not body or 'number' not in body:
             body = {"number": 21}
@@ -128,14 +215,16 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         endpoint_name = config["endpoint"]["name"]
         
         # Invoke the SageMaker endpoint
-        response = sagemaker_runtime.invoke_endpoint(
+        response = compression.invoke_endpoint(
+            sagemaker_runtime,
+            config["endpoint"].get("compression"),
             EndpointName=endpoint_name,
             ContentType='application/json',
             Body=payload
         )
         
         # Parse the response
-        response_body = json.loads(response['Body'].read().decode())
+        response_body = json.loads(compression.read_body(response))
         
         # Postprocess the response
         postprocessor = Postprocessing()
@@ -150,4 +239,17 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             "body": json.dumps({
                 "error": f"Internal server error: {str(e)}"
             })
-        } 
\ No newline at end of file
+        }
+
+def stream_handler(event: Dict[str, Any], context: Any):
+    """
+    Response-streaming entry point for bulk requests: yields each batch's
+    results as soon as they are ready
+    """
+    try:
+        body = json.loads(event.get('body', '{}'))
+    except (json.JSONDecodeError, TypeError):
+        body = {}
+    bulk_format = columnar.detect_format(event, body) or 'json'
+    for chunk in bulk_chunks(event, bulk_format):
+        yield chunk.encode()
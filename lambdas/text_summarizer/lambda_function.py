@@ -9,6 +9,9 @@ from sagemaker.deserializers import JSONDeserializer
 from typing import Dict, Any, List, Union
 import logging
 
+from lambda_common import async_inference, chunking, compression, dedup_cache, records, streaming
+from lambda_common.profiling import profile_handler
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -16,25 +19,61 @@ logger.setLevel(logging.INFO)
 # Initialize AWS clients
 sagemaker_runtime = boto3.client('sagemaker-runtime')
 sagemaker_client = boto3.client('sagemaker')
+s3_client = boto3.client('s3')
 
 # Configuration dictionary
 config = {
     "model": {
         "name": "text-summarizer-model",
         "container": "123456789012.dkr.ecr.us-east-1.amazonaws.com/text-summarizer:latest",
-        "data_url": "s3://test-bucket/model.tar.gz"
+        "data_url": "s3://test-bucket/model.tar.gz",
+        # Longer inputs are summarized chunk by chunk, then the summaries together
+        "chunking": {
+            "max_tokens": 1024,
+            "max_workers": 4,
+            "deadline_margin_ms": 1000
+        },
+        # Near-duplicates of recent documents reuse their summary
+        "dedup_cache": {
+            "threshold": 0.9,
+            "max_entries": 1024,
+            "persist_path": "/tmp/text-summarizer-cache.json",
+            "shadow": False
+        }
     },
     "endpoint": {
         "name": "text-summarizer-endpoint",
         "config_name": "text-summarizer-config",
         "variant_name": "text-summarizer-variant",
         "instance_count": 1,
-        "instance_type": "ml.m5.xlarge"
+        "instance_type": "ml.m5.xlarge",
+        "compression": {
+            "codec": "gzip",
+            "threshold_bytes": 16384
+        },
+        "async": {
+            "s3_path": "s3://test-bucket/async-inference/text-summarizer-endpoint",
+            "threshold_bytes": 5242880
+        },
+        # Set once the container streams; lambda_handler then assembles the stream
+        "response_stream": False
+    },
+    # SQS / Kinesis events: records grouped into batched endpoint calls
+    "records": {
+        "batch_size": 8,
+        "max_workers": 4,
+        "deadline_margin_ms": 1000,
+        "output_path": "s3://test-bucket/records/text-summarizer-endpoint"
     }
 }
 
+# Lives for the execution environment, like the clients above
+summary_cache = dedup_cache.SummaryCache.from_settings(config["model"].get("dedup_cache"))
+
 class TextFrame:
     """Helper class for text data processing"""
+    __slots__ = ('text',)
+
     def __init__(self, text: str):
         self.text = text
     
@@ -86,6 +125,27 @@ def convert_parsed_response_to_ndarray(response: Dict[str, Any]) -> List[str]:
         logger.error(f"Conversion error: {str(e)}")
         raise
 
+def decode_record(body: Dict[str, Any]) -> tuple:
+    """(group key, frame) for an SQS / Kinesis record; each text is summarized on its own"""
+    return None, Preprocessing.process_input(body)
+
+def predict_records(frames: List[TextFrame], context: Any = None) -> List[Dict[str, Any]]:
+    """Summaries of record texts, through the cache and map-reduce like realtime requests"""
+    results = []
+    for text_frame in frames:
+        summary = summary_cache.lookup(text_frame.text) if summary_cache else None
+        if summary is None:
+            chunking_settings = config["model"].get("chunking")
+            if chunking_settings and chunking.estimate_tokens(text_frame.text) > chunking_settings["max_tokens"]:
+                # Bounded by the Lambda deadline like realtime requests; running out fails the record
+                summary = chunking.map_reduce(text_frame.text, summarize_text, chunking_settings, context)
+            else:
+                summary = summarize_text(text_frame.text)
+            if summary_cache is not None:
+                summary_cache.add(text_frame.text, summary)
+        results.append({"summary": summary})
+    return results
+
 # WARP templates for different model types
 WARP_TEMPLATES = {
     "text": {
@@ -98,6 +158,7 @@ WARP_TEMPLATES = {
     }
 }
 
+@profile_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda function handler for text summarization model inference
@@ -106,12 +167,28 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Log the incoming event
         logger.info(f"Received event: {json.dumps(event)}")
         
+        # SQS / Kinesis batches: grouped, concurrent endpoint calls and a partial batch response
+        if records.is_records_event(event):
+            return records.process(event, decode_record, predict_records, config.get("records"), context, s3_client)
+        
         # Parse the input data with better error handling
         try:
             body = json.loads(event.get('body', '{}'))
         except json.JSONDecodeError:
             body = {}
             
+        # A job token polls for the result of an earlier async request
+        if isinstance(body, dict) and async_inference.TOKEN_FIELD in body and "async" in config["endpoint"]:
+            return async_inference.fetch(s3_client, body[async_inference.TOKEN_FIELD],
+                                         config["endpoint"]["async"], Postprocessing.process_output)
+
+        # Hit rate and similarity figures for tuning the near-duplicate cache
+        if isinstance(body, dict) and body.get("cache_stats"):
+            return {
+                "statusCode": 200,
+                "body": json.dumps(summary_cache.stats() if summary_cache else {"enabled": False})
+            }
+
         # Use default test data if input is empty or missing 'text'
         if not body or 'text' not in body:
             body = {"text": "This is a long text that needs to be summarized."}
@@ -127,15 +204,50 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Get the endpoint name from config
         endpoint_name = config["endpoint"]["name"]
         
-        # Invoke the SageMaker endpoint
-        response = sagemaker_runtime.invoke_endpoint(
-            EndpointName=endpoint_name,
-            ContentType='application/json',
-            Body=payload
-        )
-        
-        # Parse the response
-        response_body = json.loads(response['Body'].read().decode())
+        # Near-duplicates of recently summarized documents reuse their summary
+        cached_summary = summary_cache.lookup(text_frame.text) if summary_cache else None
+        if cached_summary is not None:
+            logger.info("Serving summary of a near-duplicate document from the cache")
+            return Postprocessing.process_output({"summary": cached_summary})
+
+        # Large or long-running requests go through async inference
+        if async_inference.should_offload(payload, body, config["endpoint"].get("async")):
+            logger.info(f"Offloading {len(payload)} byte request to async inference")
+            return async_inference.submit(sagemaker_runtime, s3_client, config["endpoint"]["async"],
+                                          endpoint_name, payload)
+
+        # Documents over the model's context are summarized with map-reduce
+        chunking_settings = config["model"].get("chunking")
+        if chunking_settings and chunking.estimate_tokens(text_frame.text) > chunking_settings["max_tokens"]:
+            try:
+                response_body = {"summary": chunking.map_reduce(text_frame.text, summarize_text,
+                                                                chunking_settings, context)}
+            except chunking.DeadlineExceeded as e:
+                logger.error(f"Map-reduce summarization timed out: {str(e)}")
+                return {
+                    "statusCode": 504,
+                    "body": json.dumps({
+                        "error": f"Summarization did not finish in time: {str(e)}"
+                    })
+                }
+        elif config["endpoint"].get("response_stream"):
+            # Streaming endpoint, assembled for clients that want the whole summary
+            response_body = {"summary": "".join(stream_summary(payload))}
+        else:
+            # Invoke the SageMaker endpoint
+            response = compression.invoke_endpoint(
+                sagemaker_runtime,
+                config["endpoint"].get("compression"),
+                EndpointName=endpoint_name,
+                ContentType='application/json',
+                Body=payload
+            )
+
+            # Parse the response
+            response_body = json.loads(compression.read_body(response))
+
+        if summary_cache is not None and isinstance(response_body, dict) and "summary" in response_body:
+            summary_cache.add(text_frame.text, response_body["summary"])
         
         # Postprocess the response
         postprocessor = Postprocessing()
@@ -150,4 +262,48 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             "body": json.dumps({
                 "error": f"Internal server error: {str(e)}"
             })
-        } 
\ No newline at end of file
+        }
+
+def summarize_text(text: str) -> str:
+    """Summarize one chunk with a realtime call"""
+    response = compression.invoke_endpoint(
+        sagemaker_runtime,
+        config["endpoint"].get("compression"),
+        EndpointName=config["endpoint"]["name"],
+        ContentType='application/json',
+        Body=json.dumps(TextFrame(text).to_dict())
+    )
+    response_body = json.loads(compression.read_body(response))
+    if not isinstance(response_body, dict) or "summary" not in response_body:
+        raise ValueError("Invalid response format")
+    return response_body["summary"]
+
+def stream_summary(payload: str):
+    """Yield the summary text as the endpoint generates it"""
+    response = sagemaker_runtime.invoke_endpoint_with_response_stream(
+        EndpointName=config["endpoint"]["name"],
+        ContentType='application/json',
+        Body=payload
+    )
+    yield from streaming.iter_text(response)
+
+def stream_handler(event: Dict[str, Any], context: Any):
+    """
+    Response-streaming entry point: yields the summary as UTF-8 chunks as soon
+    as the endpoint produces them, instead of one response at the end
+    """
+    try:
+        body = json.loads(event.get('body', '{}'))
+    except json.JSONDecodeError:
+        body = {}
+    if not body or 'text' not in body:
+        body = {"text": "This is a long text that needs to be summarized."}
+
+    payload = json.dumps(Preprocessing.process_input(body).to_dict())
+    try:
+        for text in stream_summary(payload):
+            yield text.encode()
+    except streaming.StreamError as e:
+        # Headers are already sent; all that is left is to end the stream
+        logger.error(f"Response stream failed: {str(e)}")
+        raise
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Local stand-in for the SageMaker runtime used by the measurement tools.
+
+Only the standard library is imported here so that the cold-start and
+benchmark harnesses can load it into a fresh interpreter without skewing
+import time or RSS. load_lambda is how every tool imports a lambda_function.py.
+"""
+import base64
+import gzip
+import importlib.util
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+DEFAULT_PREDICTIONS = [[0.1, 0.9], [0.8, 0.2]]
+# Responses at least this large are gzipped when the caller accepts it
+RESPONSE_COMPRESSION_BYTES = 1024
+
+
+class LocalStreamingBody(io.BytesIO):
+    """Minimal botocore StreamingBody replacement"""
+
+    def iter_chunks(self, chunk_size: int = 1024):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def model_response(request: dict) -> dict:
+    """Build a plausible model response for a request payload"""
+    if 'numbers' in request:
+        return {'doubled': [float(number) * 2 for number in request['numbers']]}
+    if 'number' in request:
+        return {'doubled': float(request['number']) * 2}
+    if 'text' in request:
+        text = str(request['text']).strip()
+        return {'summary': text.split('. ')[0][:200]}
+    if 'batch' in request:
+        # Batched frames (tiles, sequences, records) get one prediction row each
+        return {'predictions': [item_prediction(item) for item in _batch_items(request)]}
+    if 'data_b64' in request:
+        # One frame on its own gets the same row as in a batch
+        return {'predictions': item_prediction(base64.b64decode(request['data_b64']))}
+    if 'data' in request:
+        return {'predictions': item_prediction(json.dumps(request['data']).encode())}
+    return {'predictions': DEFAULT_PREDICTIONS}
+
+
+def _batch_items(request: dict) -> list:
+    """The bytes of each frame of a batched request"""
+    count = request['batch']
+    if 'data_b64' in request:
+        raw = base64.b64decode(request['data_b64'])
+        step = len(raw) // count if count else 0
+        return [raw[i * step:(i + 1) * step] for i in range(count)]
+    return [json.dumps(item).encode() for item in request.get('data', [])[:count]]
+
+
+def item_prediction(item: bytes) -> list:
+    """A two-class row that depends on the frame alone, not on its position or batch"""
+    score = zlib.crc32(item) % 1000 / 1000
+    return [round(score, 3), round(1 - score, 3)]
+
+
+class LocalEventStream:
+    """Iterable of PayloadPart events, like the Body of a response stream
+
+    Each chunk_bytes slice of the payload becomes one event, emitted after
+    delay_ms; slices may end inside a multi-byte character, as on the wire.
+    """
+
+    def __init__(self, payload: bytes, chunk_bytes: int = 8, delay_ms: float = 0.0):
+        self.payload = payload
+        self.chunk_bytes = max(1, chunk_bytes)
+        self.delay_ms = delay_ms
+
+    def __iter__(self):
+        for start in range(0, len(self.payload), self.chunk_bytes):
+            if self.delay_ms:
+                time.sleep(self.delay_ms / 1000.0)
+            yield {'PayloadPart': {'Bytes': self.payload[start:start + self.chunk_bytes]}}
+
+
+class LocalSageMakerRuntime:
+    """In-process replacement for boto3.client('sagemaker-runtime')
+
+    latency_ms adds a fixed sleep per call so handler overhead can be
+    separated from simulated model time. For invoke_endpoint_async, pass an S3
+    client (e.g. a Moto one) and the endpoint's async s3_path; outputs are
+    written under <s3_path>/outputs after async_delay_ms. Response streams emit
+    stream_chunk_bytes per event, stream_delay_ms apart.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, s3=None, async_s3_path: str = None,
+                 async_delay_ms: float = 0.0, stream_chunk_bytes: int = 8, stream_delay_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.stream_chunk_bytes = stream_chunk_bytes
+        self.stream_delay_ms = stream_delay_ms
+        self.s3 = s3
+        self.async_s3_path = async_s3_path
+        self.async_delay_ms = async_delay_ms
+        self.calls = 0
+
+    def invoke_endpoint(self, EndpointName: str, Body, ContentType: str = 'application/json', **kwargs) -> dict:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        attributes = _parse_attributes(kwargs.get('CustomAttributes'))
+        if isinstance(Body, (bytes, bytearray)):
+            if attributes.get('content-encoding'):
+                Body = _decompress(bytes(Body), attributes['content-encoding'])
+            Body = Body.decode()
+        request = json.loads(Body) if isinstance(Body, str) else Body
+        payload = json.dumps(model_response(request)).encode()
+        response = {
+            'ContentType': 'application/json',
+            'InvokedProductionVariant': 'local'
+        }
+        # Like a container that honours accept-encoding: gzip larger responses
+        accept = attributes.get('accept-encoding', '').split(',')
+        if 'gzip' in accept and len(payload) >= RESPONSE_COMPRESSION_BYTES:
+            payload = gzip.compress(payload, compresslevel=1, mtime=0)
+            response['CustomAttributes'] = 'content-encoding=gzip'
+        response['Body'] = LocalStreamingBody(payload)
+        return response
+
+    def invoke_endpoint_with_response_stream(self, EndpointName: str, Body, ContentType: str = 'application/json',
+                                             **kwargs) -> dict:
+        """Stream the model's output text (the summary, or the JSON response otherwise)"""
+        self.calls += 1
+        request = json.loads(Body) if isinstance(Body, (str, bytes, bytearray)) else Body
+        output = model_response(request)
+        text = output['summary'] if 'summary' in output else json.dumps(output)
+        return {
+            'Body': LocalEventStream(text.encode(), self.stream_chunk_bytes, self.stream_delay_ms),
+            'ContentType': 'text/plain',
+            'InvokedProductionVariant': 'local'
+        }
+
+    def invoke_endpoint_async(self, EndpointName: str, InputLocation: str,
+                              ContentType: str = 'application/json', InferenceId: str = None, **kwargs) -> dict:
+        if self.s3 is None or not self.async_s3_path:
+            raise RuntimeError("LocalSageMakerRuntime needs s3 and async_s3_path for async inference")
+        self.calls += 1
+        inference_id = InferenceId or uuid.uuid4().hex
+        root = self.async_s3_path.rstrip('/')
+        output, failure = f'{root}/outputs/{inference_id}.out', f'{root}/failures/{inference_id}-error.out'
+
+        def run():
+            try:
+                request = json.loads(self._get(InputLocation))
+                self._put(output, json.dumps(model_response(request)).encode())
+            except Exception as e:
+                self._put(failure, f'{type(e).__name__}: {e}'.encode())
+
+        if self.async_delay_ms:
+            threading.Timer(self.async_delay_ms / 1000.0, run).start()
+        else:
+            run()
+        return {'InferenceId': inference_id, 'OutputLocation': output, 'FailureLocation': failure}
+
+    def _get(self, uri: str) -> bytes:
+        bucket, _, key = uri[len('s3://'):].partition('/')
+        return self.s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+
+    def _put(self, uri: str, data: bytes):
+        bucket, _, key = uri[len('s3://'):].partition('/')
+        self.s3.put_object(Bucket=bucket, Key=key, Body=data)
+
+
+def _parse_attributes(value) -> dict:
+    if not isinstance(value, str):
+        return {}
+    pairs = (item.split('=', 1) for item in value.split(';') if '=' in item)
+    return {key.strip().lower(): val.strip() for key, val in pairs}
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    # zstd and lz4 need their optional packages; lambda_common knows how to load them
+    lambdas_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambdas')
+    if lambdas_dir not in sys.path:
+        sys.path.insert(0, lambdas_dir)
+    from lambda_common import compression
+    return compression.decompress(data, codec)
+
+
+class LocalContext:
+    """Stand-in for the Lambda context object"""
+
+    def __init__(self, memory_limit_in_mb: int = 128, timeout_ms: int = 30000,
+                 function_name: str = "test-function"):
+        self.function_name = function_name
+        self.memory_limit_in_mb = memory_limit_in_mb
+        self.invoked_function_arn = f"arn:aws:lambda:us-east-1:123456789012:function:{function_name}"
+        self.aws_request_id = "test-request-id"
+        self._deadline = time.monotonic() + timeout_ms / 1000.0
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+def add_shared_path(lambda_file) -> str:
+    """Make lambdas/lambda_common importable, as the deployment layer does"""
+    lambdas_dir = os.path.dirname(os.path.dirname(os.path.abspath(str(lambda_file))))
+    if lambdas_dir not in sys.path:
+        sys.path.insert(0, lambdas_dir)
+    return lambdas_dir
+
+
+def install(module, latency_ms: float = 0.0, s3=None, **options) -> LocalSageMakerRuntime:
+    """Point a loaded lambda module at a local runtime stand-in
+
+    With an S3 client the module's s3_client is replaced too and async
+    inference is served from the module's config["endpoint"]["async"]. Other
+    options (async_delay_ms, stream_chunk_bytes, ...) go to the runtime.
+    """
+    settings = (getattr(module, 'config', None) or {}).get('endpoint', {}).get('async') or {}
+    runtime = LocalSageMakerRuntime(latency_ms=latency_ms, s3=s3, async_s3_path=settings.get('s3_path'),
+                                    **options)
+    module.sagemaker_runtime = runtime
+    if s3 is not None:
+        module.s3_client = s3
+    return runtime
+
+
+def load_lambda(lambda_file, stand_in: bool = False, **options):
+    """Import lambda_function.py as ``lambda_function``, so its frames unpickle in any process
+
+    With stand_in the module is pointed at a local runtime; options go to install().
+    """
+    add_shared_path(lambda_file)
+    spec = importlib.util.spec_from_file_location('lambda_function', str(lambda_file))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['lambda_function'] = module
+    spec.loader.exec_module(module)
+    if stand_in:
+        install(module, **options)
+    return module
+
+
+def detect_kind(module) -> str:
+    """Guess the payload kind ('vision', 'text' or 'number') from WARP_TEMPLATES"""
+    templates = getattr(module, 'WARP_TEMPLATES', None) or {}
+    for kind in templates:
+        if kind in ('vision', 'text', 'number'):
+            return kind
+    return 'vision'
+
+
+def make_body(kind: str, size: int = 3, variant: int = 0) -> dict:
+    """Build a deterministic request body of roughly the given size
+
+    size is the frame edge in pixels for vision, the word count for text and
+    the value itself for number payloads. Bodies with different variants have
+    the same shape but different values.
+    """
+    if kind == 'number':
+        return {'number': size + variant}
+    if kind == 'text':
+        words = ['the', 'truck', 'entered', 'the', 'yard', 'at', 'noon.']
+        text = ' '.join(words[i % len(words)] for i in range(size))
+        return {'text': f'{text} (item {variant})' if variant else text}
+    return {'data': [[[(x * 37 + y * 11 + c * 5 + variant) % 256 for c in range(3)]
+                      for x in range(size)] for y in range(size)]}
+
+
+def make_event(kind: str, size: int = 3) -> dict:
+    """Wrap make_body() in an API Gateway style event"""
+    return {'body': json.dumps(make_body(kind, size))}
+
+
+def make_records_event(kind: str, count: int = 4, source: str = 'aws:sqs', size: int = 3) -> dict:
+    """Wrap count distinct make_body() payloads of one shape in an SQS or Kinesis event"""
+    records = []
+    for i in range(count):
+        body = json.dumps(make_body(kind, size, variant=i))
+        if source == 'aws:kinesis':
+            records.append({'eventSource': source, 'kinesis': {
+                'sequenceNumber': f'{i:056d}', 'data': base64.b64encode(body.encode()).decode()}})
+        else:
+            records.append({'eventSource': source, 'messageId': f'message-{i}', 'body': body})
+    return {'Records': records}
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Per-invocation memory profiling for lambda handlers.
+
+Each (lambda, payload size) pair runs in a fresh interpreter so that the RSS
+high-water mark matches what Lambda reports as "Max Memory Used". Inside the
+child, tracemalloc peaks are recorded per handler stage:
+
+    parse -> preprocess -> serialize -> invoke -> decode -> postprocess
+
+Stage boundaries come from wrapping Preprocessing.process_input, the runtime's
+invoke_endpoint and Postprocessing.process_output, so the handlers themselves
+need no changes. Only the standard library is imported at module level because
+this file is also the child entry point; rich is loaded by the CLI only.
+"""
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent
+STAGES = ('parse', 'preprocess', 'serialize', 'invoke', 'decode', 'postprocess')
+DEFAULT_SIZES = (8, 128, 512)
+# Memory sizes we deploy with; Lambda accepts any value in 1 MB steps
+MEMORY_TIERS = (128, 256, 512, 768, 1024, 1536, 2048, 3008, 4096, 6144, 8192, 10240)
+MARKER = 'memory_profile:'
+
+
+def rss_hwm_mb() -> float:
+    """Process RSS high-water mark in MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def recommend_memory(rss_mb: float, headroom: float = 0.25) -> int:
+    """Smallest memory tier that fits the RSS high-water mark plus headroom"""
+    needed = rss_mb * (1 + headroom)
+    for tier in MEMORY_TIERS:
+        if tier >= needed:
+            return tier
+    return MEMORY_TIERS[-1]
+
+
+class StageTracker:
+    """Records the tracemalloc peak (above the stage's starting level) per stage"""
+
+    def __init__(self):
+        self.peaks = {}
+        self.overall_peak = 0
+        self.stage = None
+        self._baseline = 0
+
+    def enter(self, stage: str):
+        self._close()
+        self.stage = stage
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+
+    def finish(self):
+        self._close()
+        self.stage = None
+
+    def _close(self):
+        if self.stage is None:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        self.overall_peak = max(self.overall_peak, peak)
+        self.peaks[self.stage] = max(self.peaks.get(self.stage, 0), peak - self._baseline)
+
+
+def _wrap(function, before=None, after=None):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if before:
+            before()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if after:
+                after()
+    return wrapper
+
+
+def _patch_static(cls, name: str, before=None, after=None):
+    """Wrap a staticmethod in place; returns a callable that restores it"""
+    if cls is None or name not in vars(cls):
+        return lambda: None
+    original = vars(cls)[name]
+    function = original.__func__ if isinstance(original, staticmethod) else original
+    wrapped = _wrap(function, before, after)
+    setattr(cls, name, staticmethod(wrapped) if isinstance(original, staticmethod) else wrapped)
+    return lambda: setattr(cls, name, original)
+
+
+def profile_invocation(module, event: dict, context) -> dict:
+    """Invoke module.lambda_handler once with per-stage tracemalloc peaks"""
+    tracker = StageTracker()
+    restores = [
+        _patch_static(getattr(module, 'Preprocessing', None), 'process_input',
+                      before=lambda: tracker.enter('preprocess'), after=lambda: tracker.enter('serialize')),
+        _patch_static(getattr(module, 'Postprocessing', None), 'process_output',
+                      before=lambda: tracker.enter('postprocess')),
+    ]
+    runtime = getattr(module, 'sagemaker_runtime', None)
+    original_invoke = getattr(runtime, 'invoke_endpoint', None)
+    if original_invoke is not None:
+        runtime.invoke_endpoint = _wrap(original_invoke, before=lambda: tracker.enter('invoke'),
+                                        after=lambda: tracker.enter('decode'))
+        restores.append(lambda: setattr(runtime, 'invoke_endpoint', original_invoke))
+
+    tracemalloc.start()
+    try:
+        tracker.enter('parse')
+        response = module.lambda_handler(event, context)
+        tracker.finish()
+    finally:
+        tracemalloc.stop()
+        for restore in restores:
+            restore()
+
+    return {
+        'stages_mb': {stage: round(tracker.peaks.get(stage, 0) / (1024.0 * 1024.0), 3) for stage in STAGES},
+        'tracemalloc_peak_mb': round(tracker.overall_peak / (1024.0 * 1024.0), 3),
+        'status_code': response.get('statusCode') if isinstance(response, dict) else None
+    }
+
+
+def _child(lambda_file: str, size: int, memory_limit: int):
+    """Entry point of the fresh interpreter: profile one payload size"""
+    import local_endpoint
+
+    result = {}
+    try:
+        module = local_endpoint.load_lambda(lambda_file, stand_in=True)
+        kind = local_endpoint.detect_kind(module)
+        event = local_endpoint.make_event(kind, size)
+        context = local_endpoint.LocalContext(memory_limit_in_mb=memory_limit)
+        result = profile_invocation(module, event, context)
+        result['payload_bytes'] = len(event['body'])
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['rss_hwm_mb'] = round(rss_hwm_mb(), 1)
+    print(MARKER + json.dumps(result))
+
+
+def profile_lambda(lambda_file, size: int, memory_limit: int = 128, headroom: float = 0.25) -> dict:
+    """Profile one lambda at one payload size in a fresh interpreter"""
+    lambda_file = Path(lambda_file).resolve()
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--child', str(lambda_file), str(size), str(memory_limit)],
+        capture_output=True, text=True, env=env, cwd=str(REPO_ROOT)
+    )
+    result = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(MARKER):
+            result = json.loads(line[len(MARKER):])
+    if result is None:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['no output']
+        return {'size': size, 'error': f'child exited with {proc.returncode}: {tail[0]}'}
+
+    result['size'] = size
+    result['memory_limit_mb'] = memory_limit
+    result['recommended_mb'] = recommend_memory(result['rss_hwm_mb'], headroom)
+    result['exceeds_limit'] = result['rss_hwm_mb'] > memory_limit
+    return result
+
+
+def profile_lambdas(lambda_files: dict, sizes=DEFAULT_SIZES, memory_limit: int = 128, headroom: float = 0.25) -> dict:
+    """Profile every lambda at every payload size"""
+    return {
+        name: [profile_lambda(path, size, memory_limit, headroom) for size in sizes]
+        for name, path in lambda_files.items()
+    }
+
+
+def print_report(results: dict, console=None):
+    """Render profile results as a rich table"""
+    from rich.console import Console
+    from rich.table import Table
+
+    console = console or Console()
+    table = Table(title="Lambda Memory Profile", show_header=True)
+    table.add_column("Lambda Function", style="cyan")
+    table.add_column("Size", justify="right")
+    for stage in STAGES:
+        table.add_column(f"{stage} (MB)", justify="right")
+    table.add_column("Peak (MB)", justify="right")
+    table.add_column("RSS HWM (MB)", justify="right")
+    table.add_column("Recommended", justify="right", style="green")
+
+    for name, runs in results.items():
+        for run in runs:
+            if 'error' in run:
+                table.add_row(name, str(run['size']), f"[red]{run['error']}[/red]", *[''] * (len(STAGES) + 2))
+                continue
+            rss = f"{run['rss_hwm_mb']:.1f}"
+            if run['exceeds_limit']:
+                rss = f"[red]{rss} > {run['memory_limit_mb']}[/red]"
+            table.add_row(
+                name,
+                str(run['size']),
+                *[f"{run['stages_mb'][stage]:.2f}" for stage in STAGES],
+                f"{run['tracemalloc_peak_mb']:.2f}",
+                rss,
+                f"{run['recommended_mb']} MB"
+            )
+    console.print(table)
+
+    if any(run.get('exceeds_limit') for runs in results.values() for run in runs):
+        console.print("[red]⚠ Some runs exceed the context's declared memory limit![/red]")
+
+
+def main(argv=None):
+    """Profile lambda memory usage at several payload sizes."""
+    if argv is None and len(sys.argv) > 1 and sys.argv[1] == '--child':
+        _child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        return
+
+    from lambda_index import find_lambda_files
+
+    parser = argparse.ArgumentParser(description="Profile lambda memory usage per stage and payload size")
+    parser.add_argument('root_dir', nargs='?', default='lambdas')
+    parser.add_argument('--only', action='append', default=[], help="Only profile these lambdas (repeatable)")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma separated payload sizes (frame edge, word count or number)")
+    parser.add_argument('--memory-limit', type=int, default=128, help="Context memory_limit_in_mb to check against")
+    parser.add_argument('--headroom', type=float, default=0.25, help="Headroom added before picking a memory size")
+    parser.add_argument('--json', dest='json_output', action='store_true', help="Output in JSON format")
+    args = parser.parse_args(argv)
+
+    lambda_files = find_lambda_files(args.root_dir)
+    if args.only:
+        lambda_files = {name: path for name, path in lambda_files.items() if name in args.only}
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    results = profile_lambdas(lambda_files, sizes, args.memory_limit, args.headroom)
+    if args.json_output:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if any(run.get('exceeds_limit') for runs in results.values() for run in runs):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Static performance lint rules for lambda handlers.
+
+The rules run over an already-parsed module tree (see lambda_index.py) and
+flag patterns that cost us cold-start time or per-request CPU/memory.
+Each finding is a plain dict: rule, severity, line and message.
+"""
+import ast
+
+SEVERITIES = ('high', 'medium', 'low')
+
+# Top-level packages that are expensive to import during a cold start
+HEAVY_MODULES = {
+    'sagemaker', 'pandas', 'scipy', 'sklearn', 'torch', 'tensorflow',
+    'matplotlib', 'transformers', 'cv2', 'PIL'
+}
+
+LOGGING_METHODS = {'debug', 'info', 'warning', 'warn', 'error', 'exception', 'critical', 'log'}
+CLIENT_FACTORIES = {('boto3', 'client'), ('boto3', 'resource'), ('boto3', 'Session'),
+                    ('sagemaker', 'Session'), ('sagemaker', 'Predictor')}
+
+RULES = {
+    'PERF001': ('high', 'Heavy import is never used'),
+    'PERF002': ('medium', 'json.dumps inside a logging call'),
+    'PERF003': ('medium', '.tolist() copies the array before serialization'),
+    'PERF004': ('high', 'Client created inside lambda_handler'),
+    'PERF005': ('low', 'Stateless helper instantiated inside lambda_handler'),
+    'PERF006': ('medium', 'Unbounded Body.read()'),
+}
+
+
+def _finding(rule: str, node, detail: str) -> dict:
+    severity, title = RULES[rule]
+    return {
+        'rule': rule,
+        'severity': severity,
+        'line': getattr(node, 'lineno', 0),
+        'message': f'{title}: {detail}'
+    }
+
+
+def _dotted_name(node) -> str:
+    """Return 'a.b.c' for a Name/Attribute chain, or '' for anything else"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return '.'.join(reversed(parts))
+    return ''
+
+
+def _is_logging_call(node: ast.Call) -> bool:
+    func = node.func
+    if not isinstance(func, ast.Attribute) or func.attr not in LOGGING_METHODS:
+        return False
+    receiver = _dotted_name(func.value)
+    return receiver in ('logging', 'logger', 'log', 'LOGGER') or receiver.endswith('.logger')
+
+
+def _unused_heavy_imports(tree: ast.Module) -> list:
+    imported = {}
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split('.')[0] in HEAVY_MODULES:
+                    imported[alias.asname or alias.name.split('.')[0]] = (node, alias.name)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            if node.module.split('.')[0] in HEAVY_MODULES:
+                for alias in node.names:
+                    if alias.name != '*':
+                        imported[alias.asname or alias.name] = (node, f'{node.module}.{alias.name}')
+
+    if not imported:
+        return []
+
+    used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    return [
+        _finding('PERF001', node, f'{name} ({source})')
+        for name, (node, source) in imported.items()
+        if name not in used
+    ]
+
+
+def _handler_findings(handler: ast.FunctionDef, stateless_classes: set) -> list:
+    findings = []
+    for node in ast.walk(handler):
+        if not isinstance(node, ast.Call):
+            continue
+        dotted = _dotted_name(node.func)
+        if tuple(dotted.rsplit('.', 1)) in CLIENT_FACTORIES:
+            findings.append(_finding('PERF004', node, f'{dotted}() runs on every invocation'))
+        elif isinstance(node.func, ast.Name) and node.func.id in stateless_classes:
+            findings.append(_finding('PERF005', node, f'{node.func.id}() has no state; use it directly'))
+    return findings
+
+
+def lint_tree(tree: ast.Module) -> list:
+    """Run every performance rule over a parsed module"""
+    findings = _unused_heavy_imports(tree)
+
+    stateless_classes = set()
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            methods = {item.name for item in node.body if isinstance(item, ast.FunctionDef)}
+            if '__init__' not in methods and not node.bases:
+                stateless_classes.add(node.name)
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == 'lambda_handler':
+            findings.extend(_handler_findings(node, stateless_classes))
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        if _is_logging_call(node):
+            for inner in ast.walk(node):
+                if inner is not node and isinstance(inner, ast.Call) and _dotted_name(inner.func) == 'json.dumps':
+                    argument = _dotted_name(inner.args[0]) if inner.args else ''
+                    findings.append(_finding('PERF002', inner, f'json.dumps({argument or "..."}) is built even when the level is disabled'))
+        elif isinstance(node.func, ast.Attribute) and node.func.attr == 'tolist' and not node.args:
+            findings.append(_finding('PERF003', node, f'{_dotted_name(node.func) or "tolist"}()'))
+        elif isinstance(node.func, ast.Attribute) and node.func.attr == 'read' and not node.args and not node.keywords:
+            receiver = node.func.value
+            is_body = (isinstance(receiver, ast.Subscript)
+                       and isinstance(receiver.slice, ast.Constant) and receiver.slice.value == 'Body') \
+                or (isinstance(receiver, ast.Attribute) and receiver.attr == 'Body')
+            if is_body:
+                findings.append(_finding('PERF006', node, 'read() without a size limit buffers the whole response'))
+
+    findings.sort(key=lambda finding: (SEVERITIES.index(finding['severity']), finding['line']))
+    return findings
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""SQLite-backed history of lambda test, benchmark and cold-start results.
+
+Replaces the loose data/*.txt files: every writer appends rows tagged with the
+lambda, commit and timestamp, so results are kept across runs and trends can
+be queried, e.g.
+
+    python results_store.py trend image_classifier --table benchmarks --column p95_ms --last 50
+
+Only the standard library is used so the git hooks can call this with any
+python3.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent
+DEFAULT_DB = Path(os.environ.get('RESULTS_DB', REPO_ROOT / 'data' / 'results.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS structure_checks (
+    id INTEGER PRIMARY KEY,
+    lambda_name TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    missing TEXT,
+    findings TEXT
+);
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY,
+    lambda_name TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    output TEXT
+);
+CREATE TABLE IF NOT EXISTS benchmarks (
+    id INTEGER PRIMARY KEY,
+    lambda_name TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    median_ms REAL,
+    p95_ms REAL,
+    samples INTEGER,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS cold_starts (
+    id INTEGER PRIMARY KEY,
+    lambda_name TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    import_ms REAL,
+    first_call_ms REAL,
+    process_ms REAL,
+    rss_init_mb REAL,
+    rss_first_call_mb REAL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    value TEXT,
+    commit_sha TEXT NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_structure_lambda ON structure_checks (lambda_name, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_structure_commit ON structure_checks (commit_sha);
+CREATE INDEX IF NOT EXISTS idx_executions_lambda ON executions (lambda_name, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_executions_commit ON executions (commit_sha);
+CREATE INDEX IF NOT EXISTS idx_benchmarks_lambda ON benchmarks (lambda_name, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_benchmarks_commit ON benchmarks (commit_sha);
+CREATE INDEX IF NOT EXISTS idx_cold_starts_lambda ON cold_starts (lambda_name, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_cold_starts_commit ON cold_starts (commit_sha);
+CREATE INDEX IF NOT EXISTS idx_metrics_name ON metrics (name, id);
+"""
+
+# Numeric columns that trend() may be asked for, per table
+TREND_COLUMNS = {
+    'benchmarks': ('median_ms', 'p95_ms'),
+    'cold_starts': ('import_ms', 'first_call_ms', 'process_ms', 'rss_init_mb', 'rss_first_call_mb'),
+    'executions': ('passed',),
+}
+LAMBDA_TABLES = ('structure_checks', 'executions', 'benchmarks', 'cold_starts')
+
+
+def current_commit(dirty_paths=None) -> str:
+    """Return the short HEAD commit, suffixed -dirty if dirty_paths have local changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    if dirty_paths:
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', *dirty_paths], cwd=REPO_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        if dirty:
+            return f'{commit}-dirty'
+    return commit
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class ResultsStore:
+    """Append-only results history in a local SQLite database"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else DEFAULT_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._commit = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def commit(self) -> str:
+        if self._commit is None:
+            self._commit = current_commit()
+        return self._commit
+
+    def _insert(self, table: str, values: dict):
+        values.setdefault('commit_sha', self.commit)
+        values.setdefault('recorded_at', _now())
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        with self.conn:
+            self.conn.execute(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', list(values.values()))
+
+    def record_structure(self, lambda_name: str, status: str, missing=(), findings=(), commit: str = None):
+        self._insert('structure_checks', {
+            'lambda_name': lambda_name, 'status': status,
+            'missing': json.dumps(list(missing)), 'findings': json.dumps(list(findings)),
+            **({'commit_sha': commit} if commit else {})
+        })
+
+    def record_execution(self, lambda_name: str, passed: bool, output: str = '', commit: str = None):
+        self._insert('executions', {
+            'lambda_name': lambda_name, 'passed': int(bool(passed)), 'output': output,
+            **({'commit_sha': commit} if commit else {})
+        })
+
+    def record_benchmark(self, lambda_name: str, median_ms: float, p95_ms: float, samples: int,
+                         data: dict = None, commit: str = None):
+        self._insert('benchmarks', {
+            'lambda_name': lambda_name, 'median_ms': median_ms, 'p95_ms': p95_ms, 'samples': samples,
+            'data': json.dumps(data or {}), **({'commit_sha': commit} if commit else {})
+        })
+
+    def record_cold_start(self, lambda_name: str, result: dict, commit: str = None):
+        self._insert('cold_starts', {
+            'lambda_name': lambda_name,
+            'import_ms': result.get('import_ms'),
+            'first_call_ms': result.get('first_call_ms'),
+            'process_ms': result.get('process_ms'),
+            'rss_init_mb': result.get('rss_init_mb'),
+            'rss_first_call_mb': result.get('rss_first_call_mb'),
+            'data': json.dumps(result),
+            **({'commit_sha': commit} if commit else {})
+        })
+
+    def set_metric(self, name: str, value, commit: str = None):
+        self._insert('metrics', {'name': name, 'value': str(value), **({'commit_sha': commit} if commit else {})})
+
+    def get_metric(self, name: str, default=None):
+        row = self.conn.execute('SELECT value FROM metrics WHERE name = ? ORDER BY id DESC LIMIT 1',
+                                (name,)).fetchone()
+        return row['value'] if row else default
+
+    def latest(self, table: str) -> list:
+        """Most recent row per lambda for one of the per-lambda tables"""
+        if table not in LAMBDA_TABLES:
+            raise ValueError(f'Unknown table: {table}')
+        return [dict(row) for row in self.conn.execute(
+            f'SELECT * FROM {table} WHERE id IN (SELECT MAX(id) FROM {table} GROUP BY lambda_name) '
+            'ORDER BY lambda_name'
+        )]
+
+    def commits(self, table: str, last: int = 2) -> list:
+        """Most recent distinct commits recorded in a table, newest first"""
+        if table not in LAMBDA_TABLES:
+            raise ValueError(f'Unknown table: {table}')
+        return [row['commit_sha'] for row in self.conn.execute(
+            f'SELECT commit_sha, MAX(id) AS last_id FROM {table} GROUP BY commit_sha ORDER BY last_id DESC LIMIT ?',
+            (last,)
+        )]
+
+    def for_commit(self, table: str, commit: str) -> dict:
+        """Latest row per lambda recorded for one commit"""
+        if table not in LAMBDA_TABLES:
+            raise ValueError(f'Unknown table: {table}')
+        return {row['lambda_name']: dict(row) for row in self.conn.execute(
+            f'SELECT * FROM {table} WHERE id IN '
+            f'(SELECT MAX(id) FROM {table} WHERE commit_sha = ? GROUP BY lambda_name)',
+            (commit,)
+        )}
+
+    def trend(self, lambda_name: str, table: str = 'benchmarks', column: str = 'p95_ms', last: int = 50) -> list:
+        """(commit, recorded_at, value) for the last N commits of one lambda, oldest first"""
+        if column not in TREND_COLUMNS.get(table, ()):
+            raise ValueError(f'Cannot trend {table}.{column}')
+        rows = self.conn.execute(
+            f'SELECT commit_sha, MAX(recorded_at) AS recorded_at, {column} AS value FROM {table} '
+            'WHERE lambda_name = ? GROUP BY commit_sha ORDER BY recorded_at DESC LIMIT ?',
+            (lambda_name, last)
+        ).fetchall()
+        return [(row['commit_sha'], row['recorded_at'], row['value']) for row in reversed(rows)]
+
+
+def format_report(store: ResultsStore) -> str:
+    """Plain-text summary of the latest structure and execution results"""
+    executions = {row['lambda_name']: row for row in store.latest('executions')}
+    lines = ['Lambda Test Results', '==================', '']
+    lines.append(f"{'Lambda Function':<25} {'Status':<8} {'Moto Test':<10} Missing Elements")
+    for row in store.latest('structure_checks'):
+        execution = executions.get(row['lambda_name'])
+        moto = '-' if execution is None else ('✓' if execution['passed'] else '✗')
+        missing = ', '.join(json.loads(row['missing'] or '[]')) or '-'
+        lines.append(f"{row['lambda_name']:<25} {row['status']:<8} {moto:<10} {missing}")
+
+    lines += ['', 'Moto Test Output', '===============']
+    for name, row in sorted(executions.items()):
+        lines.append(f"\nTesting {name}... ({row['commit_sha']} {row['recorded_at']})")
+        lines.append(row['output'] or '')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and update the lambda results store")
+    parser.add_argument('--db', default=None, help="Database path (default: data/results.db or $RESULTS_DB)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    set_metric = commands.add_parser('set-metric', help="Record a named metric, e.g. lambda_status SUCCESS")
+    set_metric.add_argument('name')
+    set_metric.add_argument('value')
+
+    get_metric = commands.add_parser('get-metric', help="Print the latest value of a metric")
+    get_metric.add_argument('name')
+    get_metric.add_argument('--default', default='')
+
+    commands.add_parser('report', help="Print the latest structure and execution results")
+
+    trend = commands.add_parser('trend', help="Print a per-commit trend for one lambda")
+    trend.add_argument('lambda_name')
+    trend.add_argument('--table', default='benchmarks', choices=sorted(TREND_COLUMNS))
+    trend.add_argument('--column', default='p95_ms')
+    trend.add_argument('--last', type=int, default=50)
+
+    args = parser.parse_args(argv)
+    with ResultsStore(args.db) as store:
+        if args.command == 'set-metric':
+            store.set_metric(args.name, args.value)
+        elif args.command == 'get-metric':
+            print(store.get_metric(args.name, args.default))
+        elif args.command == 'report':
+            print(format_report(store))
+        elif args.command == 'trend':
+            try:
+                rows = store.trend(args.lambda_name, args.table, args.column, args.last)
+            except ValueError as e:
+                print(str(e), file=sys.stderr)
+                sys.exit(2)
+            for commit, recorded_at, value in rows:
+                print(f'{commit}\t{recorded_at}\t{value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""Serve a lambda as a long-running, multi-worker HTTP service.
+
+Any lambdas/<name>/lambda_function.py can be hosted on-prem with the same code
+that runs on Lambda. Every HTTP request becomes an API Gateway style event
+(method, path, query string, headers and body, base64 encoded when it is not
+UTF-8) and the handler's ``statusCode``/``headers``/``body`` response becomes
+the HTTP response.
+
+Handlers run in a pool of worker processes, so CPU-heavy preprocessing does
+not contend for one interpreter. Each worker imports the lambda module once
+when it starts: ``config`` and the boto3 clients are created per worker, never
+shared across processes, and every request after that is a warm invocation.
+All workers are started and initialized before the port is opened.
+
+SIGTERM or SIGINT starts a graceful drain: the listening socket is closed, so
+new connections are refused, requests in flight are finished (up to
+--drain-timeout) and the workers exit. ``GET /healthz`` reports the worker
+count, requests in flight and whether the server is draining.
+
+With --max-batch-size above 1, concurrent requests are micro-batched. Plain
+model-input requests (a JSON body with only the WARP input fields, e.g.
+``{"data": ...}``) are queued on an asyncio loop. A batch goes to one worker
+when it is full or when its delay expires; the worker groups it with the
+lambda's decode_record() and makes one predict_records() endpoint call per
+group of stackable inputs. Every request is then still answered by
+lambda_handler, whose own model request (the payload of its single input) is
+answered with that input's predict_records() result instead of a separate
+endpoint call; any other call the handler makes goes to the endpoint as usual.
+So responses, profiling and async offload are the handler's, given a model
+that scores each input on its own; ``/healthz`` counts the requests answered
+from a shared call. At most one batch per worker is in flight; while all
+workers are busy, requests queue up and go out together as soon as one is
+free. With a worker free, the delay adapts to the arrival rate: it is the time
+the current rate needs to fill the batch, capped at --max-delay-ms, and zero
+when fewer than one more request is expected in that window, so light traffic
+is not slowed.
+
+Identical requests in flight at the same time (same method, path, query,
+Content-Type, Content-Encoding, Accept and body) are coalesced with
+lambda_common.single_flight: the first one is dispatched and the others get
+its response. --no-single-flight turns this off; ``/healthz`` reports how many
+requests were coalesced.
+
+Only the standard library is used. With --local-endpoint the workers talk to
+the in-process stand-in from local_endpoint.py instead of SageMaker.
+"""
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+REPO_ROOT = Path(__file__).resolve().parent
+HEALTH_PATH = '/healthz'
+# Headers that can change a response, besides the body
+KEY_HEADERS = ('content-type', 'content-encoding', 'accept')
+
+sys.path.insert(0, str(REPO_ROOT / 'lambdas'))
+from lambda_common import single_flight  # noqa: E402
+
+# Set in each worker process by _init_worker
+_module = None
+_init_error = None
+_timeout_ms = None
+_batch_fields = None
+
+
+class WorkerContext:
+    """Lambda context object for one request, with the server's timeout"""
+
+    def __init__(self, function_name: str, request_id: str, timeout_ms: int):
+        self.function_name = function_name
+        self.aws_request_id = request_id
+        self.memory_limit_in_mb = None
+        self._deadline = time.monotonic() + timeout_ms / 1000.0
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+def resolve_lambda(name_or_path: str, root_dir: str = 'lambdas') -> Path:
+    """lambda_function.py for a lambda directory name, directory or file path"""
+    path = Path(name_or_path)
+    if path.is_dir():
+        path = path / 'lambda_function.py'
+    if not path.exists():
+        path = Path(root_dir) / name_or_path / 'lambda_function.py'
+    if not path.exists():
+        raise FileNotFoundError(f"No lambda_function.py for {name_or_path}")
+    return path.resolve()
+
+
+def _init_worker(lambda_file: str, local_endpoint: bool, latency_ms: float, timeout_ms: int, started):
+    """Import the lambda once per worker; its clients and config live as long as the worker"""
+    global _module, _init_error, _timeout_ms, _batch_fields
+
+    # Ctrl-C (and systemd's stop) signal the whole process group; only the server
+    # decides when workers stop, since a worker killed mid-task can hang the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    _timeout_ms = timeout_ms
+    try:
+        sys.path.insert(0, str(REPO_ROOT))
+        import local_endpoint as stand_in
+        module = stand_in.load_lambda(lambda_file, local_endpoint, latency_ms=latency_ms)
+        _module = module
+        # Requests with only these fields can share endpoint calls (see _invoke_batch)
+        if hasattr(module, 'decode_record') and hasattr(module, 'predict_records'):
+            templates = getattr(module, 'WARP_TEMPLATES', None) or {}
+            _batch_fields = {field for template in templates.values()
+                             for field in template.get('input_template', {})}
+    except Exception as e:
+        # Raising here would make the pool restart the worker forever
+        _init_error = f"{type(e).__name__}: {e}"
+    finally:
+        started.release()
+
+
+def _worker_status(_=None) -> tuple:
+    return os.getpid(), _init_error, bool(_batch_fields)
+
+
+class BatchedRuntime:
+    """The worker's runtime, except that one request payload is answered with a result computed in a batch"""
+
+    def __init__(self, runtime, payload: bytes, result: dict):
+        self._runtime = runtime
+        self._payload = payload
+        self._result = result
+
+    @property
+    def used(self) -> bool:
+        return self._result is None
+
+    def invoke_endpoint(self, **kwargs):
+        if self._result is not None:
+            from lambda_common import compression
+
+            body = kwargs.get('Body', b'')
+            body = body.encode() if isinstance(body, str) else body
+            codec = compression.parse_attributes(kwargs.get('CustomAttributes')).get('content-encoding')
+            if isinstance(body, bytes) and compression.decompress(body, codec) == self._payload:
+                result, self._result = self._result, None
+                return {'Body': io.BytesIO(json.dumps(result).encode()), 'ContentType': 'application/json'}
+        return self._runtime.invoke_endpoint(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._runtime, name)
+
+
+def _invoke(event: dict, batched: BatchedRuntime = None) -> dict:
+    """Run the handler in a worker, with batched as its runtime if given; errors come back as a 500 response"""
+    if _module is None:
+        return {'statusCode': 500, 'body': json.dumps({'error': f"Lambda failed to load: {_init_error}"})}
+    context = WorkerContext(Path(_module.__file__).parent.name, event['requestContext']['requestId'], _timeout_ms)
+    runtime = _module.sagemaker_runtime
+    if batched is not None:
+        _module.sagemaker_runtime = batched
+    try:
+        return _module.lambda_handler(event, context)
+    except Exception as e:
+        return {'statusCode': 500, 'body': json.dumps({'error': f"Unhandled {type(e).__name__}: {e}"})}
+    finally:
+        _module.sagemaker_runtime = runtime
+
+
+def _invoke_batch(events: list) -> tuple:
+    """(handler responses, how many were answered from a shared call) for events sent together
+
+    Stackable inputs share predict_records() calls.
+    """
+    batched, groups = [None] * len(events), {}
+    for index, event in enumerate(events):
+        try:
+            body = json.loads(event['body'])
+            if _batch_fields and isinstance(body, dict) and body and set(body) <= _batch_fields:
+                key, item = _module.decode_record(body)
+                if key is not None:
+                    groups.setdefault(key, []).append((index, item))
+        except Exception:
+            # lambda_handler below reports the error the usual way
+            pass
+    for members in groups.values():
+        try:
+            results = _module.predict_records([item for _, item in members])
+            if len(results) != len(members):
+                raise ValueError(f"Expected {len(members)} results, got {len(results)}")
+        except Exception:
+            # Each handler makes its own endpoint call
+            continue
+        for (index, item), result in zip(members, results):
+            # What lambda_handler sends for this input on its own
+            batched[index] = BatchedRuntime(_module.sagemaker_runtime, json.dumps(item.to_dict()).encode(), result)
+    responses = [_invoke(event, runtime) for event, runtime in zip(events, batched)]
+    return responses, sum(1 for runtime in batched if runtime is not None and runtime.used)
+
+
+class MicroBatcher:
+    """Queues events on an asyncio loop and sends them to a worker in batches"""
+
+    # Weight of the newest gap in the arrival interval average
+    EWMA_WEIGHT = 0.2
+
+    def __init__(self, pool, workers: int, max_size: int, max_delay_ms: float, max_bytes: int):
+        self.pool = pool
+        self.workers = workers
+        self.max_size = max_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_bytes = max_bytes
+        self.loop = asyncio.new_event_loop()
+        self.batches = 0
+        self.batched = 0
+        self.answered = 0
+        self._pending = []
+        self._pending_bytes = 0
+        self._busy = 0
+        self._timer = None
+        self._interval = None
+        self._last_arrival = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name='micro_batcher', daemon=True)
+        self._thread.start()
+
+    def accepts(self, event: dict) -> bool:
+        """Cheap pre-check for one JSON object (not NDJSON); the worker decides whether it can be stacked"""
+        return (event['httpMethod'] == 'POST' and not event['isBase64Encoded']
+                and 0 < len(event['body']) <= self.max_bytes and event['body'].lstrip()[:1] == '{'
+                and '\n{' not in event['body'])
+
+    def submit(self, event: dict, timeout: float) -> dict:
+        """Response for the event, from whichever batch it joins (called from request threads)"""
+        return asyncio.run_coroutine_threadsafe(self._submit(event), self.loop).result(timeout)
+
+    async def _submit(self, event: dict) -> dict:
+        future = self.loop.create_future()
+        self._arrived()
+        self._pending.append((event, future))
+        self._pending_bytes += len(event['body'])
+        # With every worker busy, the event waits for _resolve() to flush it
+        if self._busy < self.workers:
+            if len(self._pending) >= self.max_size or self._pending_bytes >= self.max_bytes:
+                self._flush()
+            elif self._timer is None:
+                delay = self._delay()
+                if delay > 0:
+                    self._timer = self.loop.call_later(delay, self._flush)
+                else:
+                    self._flush()
+        return await future
+
+    def _arrived(self):
+        now = time.monotonic()
+        if self._last_arrival is not None:
+            gap = now - self._last_arrival
+            self._interval = gap if self._interval is None else (
+                (1 - self.EWMA_WEIGHT) * self._interval + self.EWMA_WEIGHT * gap)
+        self._last_arrival = now
+
+    def _delay(self) -> float:
+        """Time to wait for the batch to fill at the current arrival rate"""
+        if self._interval is None or self._interval >= self.max_delay:
+            return 0.0
+        return min(self.max_delay, self._interval * (self.max_size - len(self._pending)))
+
+    def _take(self) -> list:
+        """The oldest pending events, up to max_size and max_bytes (at least one)"""
+        size, total = 0, 0
+        for event, _ in self._pending[:self.max_size]:
+            if size and total + len(event['body']) > self.max_bytes:
+                break
+            size, total = size + 1, total + len(event['body'])
+        batch, self._pending = self._pending[:size], self._pending[size:]
+        self._pending_bytes -= total
+        return batch
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending and self._busy < self.workers:
+            batch = self._take()
+            self._busy += 1
+            self.batches += 1
+            self.batched += len(batch)
+            futures = [future for _, future in batch]
+            self.pool.apply_async(
+                _invoke_batch, ([event for event, _ in batch],),
+                callback=lambda responses, futures=futures: self.loop.call_soon_threadsafe(
+                    self._resolve, futures, responses),
+                error_callback=lambda error, futures=futures: self.loop.call_soon_threadsafe(
+                    self._resolve, futures, error))
+
+    def _resolve(self, futures: list, responses):
+        self._busy -= 1
+        if not isinstance(responses, BaseException):
+            responses, answered = responses
+            self.answered += answered
+        for index, future in enumerate(futures):
+            if future.done():
+                continue
+            if isinstance(responses, BaseException):
+                future.set_exception(responses)
+            else:
+                future.set_result(responses[index])
+        # Whatever queued up while the workers were busy has waited long enough
+        if self._pending:
+            self._flush()
+
+    def stats(self) -> dict:
+        return {'batches': self.batches, 'batched_requests': self.batched, 'answered_from_batch': self.answered,
+                'mean_batch_size': round(self.batched / self.batches, 2) if self.batches else 0.0}
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+def make_event(method: str, target: str, headers, body: bytes) -> dict:
+    """API Gateway (REST, proxy integration) style event for an HTTP request"""
+    url = urlsplit(target)
+    try:
+        text, encoded = body.decode('utf-8'), False
+    except UnicodeDecodeError:
+        text, encoded = base64.b64encode(body).decode(), True
+    return {
+        'httpMethod': method,
+        'path': url.path,
+        'queryStringParameters': dict(parse_qsl(url.query)) or None,
+        'headers': dict(headers.items()),
+        'body': text,
+        'isBase64Encoded': encoded,
+        'requestContext': {'requestId': uuid.uuid4().hex, 'httpMethod': method, 'path': url.path}
+    }
+
+
+def event_key(event: dict) -> bytes:
+    """Digest of everything in an event that can change the response"""
+    headers = {name.lower(): value for name, value in event['headers'].items() if name.lower() in KEY_HEADERS}
+    query = sorted((event['queryStringParameters'] or {}).items())
+    return single_flight.request_key(event['httpMethod'], event['path'], query, event['isBase64Encoded'],
+                                     event['body'], **headers)
+
+
+class LambdaServer(ThreadingHTTPServer):
+    """HTTP front end dispatching events to the worker pool"""
+
+    # Request threads are joined on server_close(), so in-flight requests drain
+    daemon_threads = False
+    block_on_close = True
+    # socketserver's default backlog of 5 drops connections under concurrent load
+    request_queue_size = 128
+
+    def __init__(self, address, pool, workers: int, request_timeout: float, keepalive: float,
+                 quiet: bool = False, batcher: MicroBatcher = None, coalesce: bool = True):
+        super().__init__(address, LambdaRequestHandler)
+        self.pool = pool
+        self.batcher = batcher
+        self.flights = single_flight.SingleFlight() if coalesce else None
+        self.workers = workers
+        self.request_timeout = request_timeout
+        self.keepalive = keepalive
+        self.quiet = quiet
+        self.draining = False
+        self.in_flight = 0
+        self.served = 0
+        self._lock = threading.Lock()
+
+    def dispatch(self, event: dict) -> dict:
+        with self._lock:
+            self.in_flight += 1
+        try:
+            if self.flights is not None:
+                return self.flights.call(event_key(event), lambda: self._dispatch(event))
+            return self._dispatch(event)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.served += 1
+
+    def _dispatch(self, event: dict) -> dict:
+        if self.batcher is not None and self.batcher.accepts(event):
+            return self.batcher.submit(event, self.request_timeout)
+        return self.pool.apply_async(_invoke, (event,)).get(self.request_timeout)
+
+    def health(self) -> dict:
+        with self._lock:
+            health = {'status': 'draining' if self.draining else 'ok', 'workers': self.workers,
+                      'in_flight': self.in_flight, 'served': self.served}
+        if self.batcher is not None:
+            health['batching'] = self.batcher.stats()
+        if self.flights is not None:
+            health['single_flight'] = self.flights.stats()
+        return health
+
+
+class LambdaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'serve_lambda'
+
+    def setup(self):
+        # Idle keep-alive connections are closed after this long, so a drain never waits on them for long
+        self.timeout = self.server.keepalive
+        super().setup()
+
+    def _send(self, status: int, body: bytes, headers: dict = None):
+        self.send_response(status)
+        headers = dict(headers or {})
+        headers.setdefault('Content-Type', 'application/json')
+        for name, value in headers.items():
+            if name.lower() not in ('content-length', 'connection'):
+                self.send_header(name, str(value))
+        self.send_header('Content-Length', str(len(body)))
+        if self.server.draining:
+            self.close_connection = True
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        if self.command == 'GET' and self.path == HEALTH_PATH:
+            health = self.server.health()
+            self._send(503 if self.server.draining else 200, json.dumps(health).encode())
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.server.draining:
+            self._send(503, json.dumps({'error': 'Server is shutting down'}).encode())
+            return
+        try:
+            response = self.server.dispatch(make_event(self.command, self.path, self.headers, body))
+        except (multiprocessing.TimeoutError, concurrent.futures.TimeoutError):
+            self._send(504, json.dumps({'error': 'Handler did not respond in time'}).encode())
+            return
+        if not isinstance(response, dict):
+            self._send(502, json.dumps({'error': f'Handler returned {type(response).__name__}'}).encode())
+            return
+        payload = response.get('body', '')
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        payload = base64.b64decode(payload) if response.get('isBase64Encoded') else payload.encode()
+        self._send(int(response.get('statusCode', 200)), payload, response.get('headers'))
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _handle
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def serve(lambda_file: Path, host: str = '127.0.0.1', port: int = 8080, workers: int = None,
+          timeout: float = 30.0, drain_timeout: float = 30.0, keepalive: float = 5.0,
+          local_endpoint: bool = False, latency_ms: float = 0.0, quiet: bool = False,
+          max_batch_size: int = 1, max_delay_ms: float = 5.0, max_batch_bytes: int = 5 * 1024 * 1024, coalesce: bool = True,
+          ready=None):
+    """Serve lambda_file until SIGTERM/SIGINT (or ready's stop event), then drain"""
+    workers = workers or os.cpu_count() or 1
+    # spawn: workers never inherit the server's threads, sockets or clients
+    context = multiprocessing.get_context('spawn')
+    started = context.Semaphore(0)
+    begin = time.perf_counter()
+    pool = context.Pool(workers, initializer=_init_worker,
+                        initargs=(str(lambda_file), local_endpoint, latency_ms, int(timeout * 1000), started))
+    # Wait for every worker's init (module import, clients) before taking traffic
+    for _ in range(workers):
+        started.acquire()
+    init_ms = (time.perf_counter() - begin) * 1000
+    statuses = pool.map(_worker_status, range(workers), chunksize=1)
+    errors = {error for _, error, _ in statuses if error}
+    if errors:
+        pool.close()
+        pool.join()
+        raise RuntimeError(f"{lambda_file.parent.name} failed to load: {errors.pop()}")
+
+    batcher = None
+    if max_batch_size > 1:
+        if all(batchable for _, _, batchable in statuses):
+            batcher = MicroBatcher(pool, workers, max_batch_size, max_delay_ms, max_batch_bytes)
+        else:
+            print(f"{lambda_file.parent.name} has no decode_record/predict_records; micro-batching is off",
+                  file=sys.stderr, flush=True)
+    server = LambdaServer((host, port), pool, workers, timeout, keepalive, quiet, batcher, coalesce)
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            signal.signal(signum, lambda *_: stop.set())
+        except ValueError:
+            # Not the main thread (e.g. embedded in a test); use ready's stop event
+            pass
+    thread = threading.Thread(target=server.serve_forever, name='serve_lambda', daemon=True)
+    thread.start()
+    print(f"Serving {lambda_file.parent.name} on http://{host}:{server.server_address[1]} "
+          f"with {workers} workers (init {init_ms:.0f} ms)", file=sys.stderr, flush=True)
+    if ready is not None:
+        ready(server, stop)
+
+    stop.wait()
+    print("Draining: no new connections, finishing requests in flight", file=sys.stderr, flush=True)
+    server.draining = True
+    server.shutdown()
+    # Refuse new connections now; server_close() only runs once requests have drained
+    server.socket.close()
+    deadline = time.monotonic() + drain_timeout
+    while server.in_flight and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if server.in_flight:
+        print(f"Drain timeout: abandoning {server.in_flight} requests", file=sys.stderr, flush=True)
+        # Workers ignore SIGTERM, and a pool whose worker was killed mid-task
+        # cannot be joined: kill them and exit without waiting on the pool
+        for child in multiprocessing.active_children():
+            child.kill()
+        os._exit(1)
+    server.server_close()
+    if batcher is not None:
+        batcher.close()
+    pool.close()
+    pool.join()
+    print(f"Stopped after {server.served} requests", file=sys.stderr, flush=True)
+    return server.served
+
+
+def main(argv=None):
+    """Serve one lambda over HTTP with warm worker processes."""
+    parser = argparse.ArgumentParser(description="Serve a lambda_handler as a long-running HTTP service")
+    parser.add_argument('lambda_name', help="Lambda directory name under --root-dir, or a path to it")
+    parser.add_argument('--root-dir', default='lambdas')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help="Seconds a handler may take; also the context's remaining time")
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help="Seconds to finish requests in flight on shutdown")
+    parser.add_argument('--keepalive', type=float, default=5.0, help="Seconds an idle connection is kept open")
+    parser.add_argument('--local-endpoint', action='store_true',
+                        help="Use the local SageMaker runtime stand-in instead of a real endpoint")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated endpoint latency with --local-endpoint")
+    parser.add_argument('--quiet', action='store_true', help="Do not log every request")
+    parser.add_argument('--max-batch-size', type=int, default=1,
+                        help="Micro-batch up to this many concurrent requests per endpoint call (1: off)")
+    parser.add_argument('--max-delay-ms', type=float, default=5.0,
+                        help="Longest a request waits for its micro-batch to fill")
+    parser.add_argument('--max-batch-bytes', type=int, default=5 * 1024 * 1024,
+                        help="Flush a micro-batch once its request bodies reach this size")
+    parser.add_argument('--no-single-flight', action='store_true',
+                        help="Dispatch identical concurrent requests separately instead of coalescing them")
+    args = parser.parse_args(argv)
+
+    try:
+        lambda_file = resolve_lambda(args.lambda_name, args.root_dir)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    try:
+        serve(lambda_file, args.host, args.port, args.workers, args.timeout, args.drain_timeout, args.keepalive,
+              args.local_endpoint, args.latency_ms, args.quiet, args.max_batch_size, args.max_delay_ms,
+              args.max_batch_bytes, not args.no_single_flight)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Accuracy-vs-bytes report for VisionFrame transfer precisions.
+
+For each vision lambda the frame produced by its own Preprocessing is encoded
+at every precision in lambda_common.precision, decoded the way the model side
+would, and compared with the full-precision frame. Payload size is reported
+both as sent and gzipped (what lambda_common.compression would send above its
+threshold). Use it to pick ``config["model"]["transfer_precision"]``.
+
+    python transfer_precision_report.py --size 224
+    python transfer_precision_report.py --only truck_classifier --input frame.npy
+"""
+import argparse
+import contextlib
+import json
+import math
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+
+def load_input(path: str) -> dict:
+    """Request body from a .npy frame or a JSON file holding {"data": ...}"""
+    if path.endswith('.npy'):
+        import numpy as np
+        return {'data': np.load(path).tolist()}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def measure(module, body: dict) -> list:
+    """One row per precision: bytes, gzipped bytes and reconstruction error"""
+    import numpy as np
+    from lambda_common import compression, precision
+
+    frame = module.Preprocessing.process_input(body)
+    reference = np.asarray(frame.data, dtype=np.float64)
+    value_range = float(reference.max() - reference.min()) or 1.0
+    rows, baseline = [], None
+    for name in precision.PRECISIONS:
+        payload = json.dumps(module.VisionFrame(frame.data, name).to_dict()).encode()
+        error = np.abs(precision.decode(json.loads(payload)).astype(np.float64) - reference)
+        mse = float(np.mean(error ** 2))
+        row = {
+            'precision': name,
+            'bytes': len(payload),
+            'gzip_bytes': len(compression.compress(payload, 'gzip')),
+            'max_abs_error': float(error.max()),
+            'mean_abs_error': float(error.mean()),
+            'psnr_db': round(10 * math.log10(value_range ** 2 / mse), 1) if mse else None,
+        }
+        baseline = baseline or row
+        row['reduction'] = round(baseline['bytes'] / row['bytes'], 2)
+        row['gzip_reduction'] = round(baseline['gzip_bytes'] / row['gzip_bytes'], 2)
+        rows.append(row)
+    return rows
+
+
+def print_report(results: dict, console=None):
+    """Render the per-lambda rows as a rich table"""
+    from rich.console import Console
+    from rich.table import Table
+
+    console = console or Console()
+    table = Table(title="VisionFrame Transfer Precision", show_header=True)
+    table.add_column("Lambda Function", style="cyan")
+    table.add_column("Precision")
+    table.add_column("Configured")
+    table.add_column("Bytes", justify="right")
+    table.add_column("Reduction", justify="right")
+    table.add_column("Gzip Bytes", justify="right")
+    table.add_column("Gzip Reduction", justify="right")
+    table.add_column("Max Abs Error", justify="right")
+    table.add_column("PSNR (dB)", justify="right")
+
+    for name, result in results.items():
+        if 'error' in result:
+            table.add_row(name, f"[red]{result['error']}[/red]", *[''] * 7)
+            continue
+        for row in result['rows']:
+            table.add_row(
+                name, row['precision'], "✓" if row['precision'] == result['configured'] else "",
+                f"{row['bytes']:,}", f"{row['reduction']:.2f}x",
+                f"{row['gzip_bytes']:,}", f"{row['gzip_reduction']:.2f}x",
+                f"{row['max_abs_error']:.3g}",
+                "lossless" if row['psnr_db'] is None else f"{row['psnr_db']:.1f}"
+            )
+    console.print(table)
+
+
+def main(argv=None):
+    """Report payload size and reconstruction error per transfer precision."""
+    import local_endpoint
+    from lambda_index import find_lambda_files
+
+    parser = argparse.ArgumentParser(description="Compare VisionFrame transfer precisions by size and accuracy")
+    parser.add_argument('root_dir', nargs='?', default=str(REPO_ROOT / 'lambdas'))
+    parser.add_argument('--only', action='append', default=[], help="Only report these lambdas (repeatable)")
+    parser.add_argument('--size', type=int, default=64, help="Edge of the synthetic frame in pixels")
+    parser.add_argument('--input', help="Use this frame (.npy, or JSON with a 'data' key) instead")
+    parser.add_argument('--json', dest='json_output', action='store_true', help="Output in JSON format")
+    args = parser.parse_args(argv)
+
+    body = load_input(args.input) if args.input else local_endpoint.make_body('vision', args.size)
+    lambda_files = find_lambda_files(args.root_dir)
+    if args.only:
+        lambda_files = {name: path for name, path in lambda_files.items() if name in args.only}
+
+    results = {}
+    for name, path in lambda_files.items():
+        try:
+            # Importing a lambda can print (sagemaker config notices); keep stdout clean for --json
+            with contextlib.redirect_stdout(sys.stderr):
+                module = local_endpoint.load_lambda(path)
+            if 'vision' not in (getattr(module, 'WARP_TEMPLATES', None) or {}):
+                continue
+            configured = module.config.get('model', {}).get('transfer_precision', 'float32')
+            results[name] = {'configured': configured, 'rows': measure(module, body)}
+        except Exception as e:
+            results[name] = {'error': f'{type(e).__name__}: {e}'}
+
+    if args.json_output:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    if any('error' in result for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
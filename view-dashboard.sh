@@ -11,12 +11,16 @@ REPORT_PATH="./.hooks/reports/latest_validation_report.txt"
 # Ensure data directory exists
 mkdir -p "$DATA_DIR"
 
-# Read data files or set defaults
-COMMIT_COUNT=$(cat "$DATA_DIR/commit_count.txt" 2>/dev/null || echo "0")
-LAST_COMMIT=$(cat "$DATA_DIR/last_commit.txt" 2>/dev/null || echo "No commits yet")
-TODO_COUNT=$(cat "$DATA_DIR/todo_count.txt" 2>/dev/null || echo "0")
-LAMBDA_STATUS=$(cat "$DATA_DIR/lambda_status.txt" 2>/dev/null || echo "SUCCESS")
-LAMBDA_RESULTS=$(cat "$DATA_DIR/lambda_results.txt" 2>/dev/null || echo "No test results found")
+# Read the latest values from the results store or set defaults
+STORE="python3 results_store.py"
+COMMIT_COUNT=$($STORE get-metric commit_count --default 0 2>/dev/null || echo "0")
+LAST_COMMIT=$($STORE get-metric last_commit --default "No commits yet" 2>/dev/null || echo "No commits yet")
+TODO_COUNT=$($STORE get-metric todo_count --default 0 2>/dev/null || echo "0")
+LAMBDA_STATUS=$($STORE get-metric lambda_status --default SUCCESS 2>/dev/null || echo "SUCCESS")
+LAMBDA_RESULTS=$($STORE report 2>/dev/null || echo "No test results found")
+
+# Export compact per-lambda data files; only lambdas whose results changed are rewritten
+python3 dashboard_data.py || echo "Could not export dashboard data"
 
 # Read validation report if it exists
 if [ -f "$REPORT_PATH" ]; then
@@ -30,7 +34,7 @@ else
     mkdir -p "./.hooks/reports"
 fi
 
-echo "Data read from files:"
+echo "Data read from the results store:"
 echo "- Commit count: $COMMIT_COUNT"
 echo "- Last commit: $LAST_COMMIT"
 echo "- TODO count: $TODO_COUNT"
@@ -40,25 +44,13 @@ echo "- Lambda status: $LAMBDA_STATUS"
 echo "=== Lambda Test Dashboard ==="
 echo ""
 
-# Read the status file
-if [ -f "$DATA_DIR/lambda_status.txt" ]; then
-    while IFS=: read -r lambda status; do
-        echo "Lambda: $lambda"
-        echo "Status: $status"
-        echo "------------------------"
-    done < "$DATA_DIR/lambda_status.txt"
-else
-    echo "No test results found."
-fi
+echo "Lambda status: $LAMBDA_STATUS"
+echo "------------------------"
 
 # Display the full Lambda test results
 echo ""
 echo "=== Full Lambda Test Results ==="
-if [ -f "$DATA_DIR/lambda_results.txt" ]; then
-    cat "$DATA_DIR/lambda_results.txt"
-else
-    echo "No full test results found."
-fi
+echo "$LAMBDA_RESULTS"
 
 # Create a new dashboard file with the current data
 cat > "$DASHBOARD" << EOF
@@ -138,6 +130,15 @@ cat > "$DASHBOARD" << EOF
             border-radius: 5px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
         }
+        .test-results table {
+            width: 100%;
+            border-collapse: collapse;
+        }
+        .test-results th, .test-results td {
+            text-align: left;
+            padding: 6px 10px;
+            border-bottom: 1px solid #e0e0e0;
+        }
         .test-results pre {
             white-space: pre-wrap;
             font-family: monospace;
@@ -177,9 +178,12 @@ cat > "$DASHBOARD" << EOF
         
         <div class="test-results">
             <h2>Lambda Test Results</h2>
-            <pre>$LAMBDA_RESULTS</pre>
+            <div id="lambda-results">Loading results...</div>
+            <div id="lambda-detail"></div>
         </div>
     </div>
+    <script src="data/dashboard/summary.js"></script>
+    <script src="dashboard.js"></script>
 </body>
 </html>
 EOF